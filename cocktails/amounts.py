@@ -0,0 +1,148 @@
+"""
+Ingredient amounts and cocktail strength.
+
+`parse_amount` turns the free-text amount of a CocktailIngredient ("1 1/2 oz", "30 ml", "dash")
+into millilitres; the result is stored in `CocktailIngredient.volume_ml` when the row is saved.
+`recompute_strength` then derives each cocktail's total volume and estimated ABV from those
+volumes and the ingredients' alcohol percentages in a single UPDATE, so listings can filter and
+sort on the stored values. Amounts that aren't volumes ("2 slices", "To taste", "Top up") are left
+out of the estimate.
+"""
+import re
+from collections import Counter
+
+from django.db.models import F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+OUNCE_ML = 29.57
+
+# Millilitres per unit, plurals are handled by the parser
+UNITS = {
+    "ml": 1, "milliliter": 1, "millilitre": 1,
+    "cl": 10, "centiliter": 10, "centilitre": 10,
+    "dl": 100, "l": 1000, "liter": 1000, "litre": 1000,
+    "oz": OUNCE_ML, "ounce": OUNCE_ML, "fl oz": OUNCE_ML, "fluid ounce": OUNCE_ML,
+    "shot": 44, "jigger": 44, "pony": 30,
+    "tbsp": 15, "tablespoon": 15, "tsp": 5, "teaspoon": 5, "bar spoon": 5, "barspoon": 5,
+    "cup": 240, "pint": 473,
+    "splash": 5, "dash": 0.9, "drop": 0.05,
+}
+NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "half": 0.5}
+FRACTIONS = {"¼": " 1/4", "½": " 1/2", "¾": " 3/4", "⅓": " 1/3", "⅔": " 2/3", "⅛": " 1/8"}
+
+_NUMBER = r"\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?"
+_AMOUNT_RE = re.compile(
+    rf"^(?:(?P<low>{_NUMBER}|(?:{'|'.join(NUMBER_WORDS)})\b)\s*(?:(?:-|to\b)\s*(?P<high>{_NUMBER})\s*)?)?"
+    rf"(?P<unit>.*)$"
+)
+
+
+def _number(text):
+    """Value of "1", "1.5", "3/4" or "1 1/2"."""
+    if text in NUMBER_WORDS:
+        return NUMBER_WORDS[text]
+    total = 0.0
+    for part in text.split():
+        if "/" in part:
+            numerator, denominator = part.split("/")
+            if float(denominator) == 0:
+                raise ValueError(text)
+            total += float(numerator) / float(denominator)
+        else:
+            total += float(part)
+    return total
+
+
+def _unit_ml(text):
+    """Millilitres of the unit at the start of `text`, or None."""
+    words = re.sub(r"[^a-z ]", " ", text).split()
+    # Longest match first: "fl oz", "bar spoons" before "oz", "bar"
+    for length in (2, 1):
+        if len(words) < length:
+            continue
+        unit = " ".join(words[:length])
+        singulars = (unit[:-1] if unit.endswith("s") else None, unit[:-2] if unit.endswith("es") else None)
+        for candidate in (unit, *singulars):
+            if candidate in UNITS:
+                return UNITS[candidate]
+    return None
+
+
+def parse_amount(amount):
+    """
+    Volume of a free-text ingredient amount.
+    A range ("1-2 oz") gives its middle, a unit without a number ("dash") counts once.
+    :param amount: text such as "1 1/2 oz", "30ml", "2 dashes", "½ cup"
+    :return: millilitres, or None if the amount is not a known volume
+    """
+    if not amount:
+        return None
+    text = amount.strip().lower().replace(",", ".")
+    for fraction, replacement in FRACTIONS.items():
+        text = text.replace(fraction, replacement)
+    text = text.strip()
+
+    match = _AMOUNT_RE.match(text)
+    if not match:
+        return None
+    unit_ml = _unit_ml(match.group("unit"))
+    if unit_ml is None:
+        return None
+    try:
+        quantity = _number(match.group("low")) if match.group("low") else 1
+        if match.group("high"):
+            quantity = (quantity + _number(match.group("high"))) / 2
+    except ValueError:
+        return None
+    return round(quantity * unit_ml, 2)
+
+
+def update_volumes(cocktail_ingredients, batch_size=2000):
+    """
+    Re-parse the amounts of a CocktailIngredient queryset and save the volumes that changed.
+    :return: (number of updated rows, Counter of the amounts that could not be parsed)
+    """
+    model = cocktail_ingredients.model
+    updated, unparsed, changed = 0, Counter(), []
+    rows = cocktail_ingredients.only("id", "amount", "volume_ml").order_by()
+    for entry in rows.iterator(chunk_size=batch_size):
+        volume = parse_amount(entry.amount)
+        if volume is None:
+            unparsed[entry.amount] += 1
+        if volume != entry.volume_ml:
+            entry.volume_ml = volume
+            changed.append(entry)
+        if len(changed) >= batch_size:
+            model.objects.bulk_update(changed, ["volume_ml"])
+            updated += len(changed)
+            changed = []
+    if changed:
+        model.objects.bulk_update(changed, ["volume_ml"])
+        updated += len(changed)
+    return updated, unparsed
+
+
+def recompute_strength(cocktails):
+    """
+    Store total_volume_ml and estimated_abv of the given cocktails, computed in the database.
+    Also works with historical models in migrations.
+    :param cocktails: Cocktail queryset
+    :return: number of updated cocktails
+    """
+    ingredient_model = cocktails.model._meta.get_field("cocktailingredient").related_model
+    rows = (
+        ingredient_model.objects.filter(cocktail=OuterRef("pk"), volume_ml__isnull=False)
+        .order_by().values("cocktail")
+    )
+    volume = rows.annotate(total=Sum("volume_ml")).values("total")
+    alcohol = rows.annotate(total=Sum(
+        F("volume_ml") * Coalesce(Cast("ingredient__alcohol_percentage", FloatField()), Value(0.0))
+    )).values("total")
+
+    volume_sql = Subquery(volume, output_field=FloatField())
+    return cocktails.update(
+        total_volume_ml=Coalesce(volume_sql, Value(0.0)),
+        estimated_abv=Coalesce(
+            Subquery(alcohol, output_field=FloatField()) / NullIf(volume_sql, Value(0.0)), Value(0.0)
+        ),
+    )
@@ -0,0 +1,292 @@
+"""
+Read-only JSON API for the catalogue.
+
+Every resource declares its fields as functions of a model instance; clients pick a subset with
+`?fields=name,category` and only the relations those fields need are joined or prefetched, so a
+response costs a fixed number of queries whatever its size. Lists are paged with cursors.
+
+Responses carry a strong ETag derived from the catalogue generation (see caching.py) and the
+request URL, so `If-None-Match` revalidations are answered with a 304 without touching the
+database.
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Prefetch
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import condition, require_safe
+
+from .caching import catalogue_generation
+from .models import Cocktail, CocktailIngredient, Ingredient, CocktailCategory, BartenderCocktailList, \
+    BartenderCocktailListCocktail
+from .pagination import KeysetPaginator
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class Resource:
+    """
+    Serializable view of a model.
+    :param name: singular name, used as the response key of detail responses
+    :param plural: plural name, used as the response key of list responses
+    :param fields: field name -> function returning the value for an instance
+    :param list_fields: fields returned by list endpoints when `fields` is not given
+    :param queryset: function returning the base queryset for a set of requested fields
+    """
+
+    def __init__(self, name, plural, fields, list_fields, queryset):
+        self.name = name
+        self.plural = plural
+        self.fields = fields
+        self.list_fields = list_fields
+        self.queryset = queryset
+
+    def parse_fields(self, request, default):
+        """
+        :return: tuple of requested field names
+        :raises ValueError: if an unknown field is requested
+        """
+        value = request.GET.get("fields")
+        if not value:
+            return tuple(default)
+        fields = tuple(dict.fromkeys(field.strip() for field in value.split(",") if field.strip()))
+        unknown = [field for field in fields if field not in self.fields]
+        if unknown or not fields:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+        return fields
+
+    def serialize(self, obj, fields):
+        return {field: self.fields[field](obj) for field in fields}
+
+
+def _image_url(field_file):
+    return field_file.url if field_file else None
+
+
+def _cocktail_queryset(fields):
+    queryset = Cocktail.objects.select_related("category")
+    if "ingredients" in fields:
+        ingredients = CocktailIngredient.objects.select_related("ingredient").order_by("id")
+        queryset = queryset.prefetch_related(
+            Prefetch("cocktailingredient_set", queryset=ingredients, to_attr="api_ingredients")
+        )
+    return queryset
+
+
+cocktails = Resource("cocktail", "cocktails", {
+    "id": lambda cocktail: cocktail.id,
+    "name": lambda cocktail: cocktail.name,
+    "url": lambda cocktail: reverse("api-cocktail-detail", args=[cocktail.id]),
+    "category": lambda cocktail: {"id": cocktail.category.id, "name": cocktail.category.name},
+    "glass_type": lambda cocktail: cocktail.glass_type,
+    "alcoholic_strength": lambda cocktail: cocktail.alcoholic_strength,
+    "is_alcoholic": lambda cocktail: cocktail.is_alcoholic,
+    "is_classic": lambda cocktail: cocktail.is_classic,
+    "estimated_abv": lambda cocktail: round(cocktail.estimated_abv, 2),
+    "total_volume_ml": lambda cocktail: round(cocktail.total_volume_ml, 1),
+    "original_cocktail": lambda cocktail: cocktail.original_cocktail_id,
+    "image": lambda cocktail: _image_url(cocktail.image),
+    "instructions": lambda cocktail: cocktail.instructions,
+    "ingredients": lambda cocktail: [
+        {"id": entry.ingredient.id, "name": entry.ingredient.name, "amount": entry.amount}
+        for entry in cocktail.api_ingredients
+    ],
+}, ("id", "name", "url", "category", "glass_type", "is_classic", "image"), _cocktail_queryset)
+
+ingredients = Resource("ingredient", "ingredients", {
+    "id": lambda ingredient: ingredient.id,
+    "name": lambda ingredient: ingredient.name,
+    "url": lambda ingredient: reverse("api-ingredient-detail", args=[ingredient.id]),
+    "type": lambda ingredient: ingredient.type,
+    "is_spirit": lambda ingredient: ingredient.is_spirit,
+    "alcohol_percentage": lambda ingredient: (
+        float(ingredient.alcohol_percentage) if ingredient.alcohol_percentage is not None else None
+    ),
+}, ("id", "name", "url", "type"), lambda fields: Ingredient.objects.all())
+
+categories = Resource("category", "categories", {
+    "id": lambda category: category.id,
+    "name": lambda category: category.name,
+    "url": lambda category: reverse("api-category-detail", args=[category.id]),
+    "is_alcoholic": lambda category: category.is_alcoholic,
+}, ("id", "name", "url", "is_alcoholic"), lambda fields: CocktailCategory.objects.all())
+
+
+def _public_list_queryset(fields):
+    queryset = BartenderCocktailList.objects.filter(is_public=True).select_related("owner__user")
+    if "cocktail_count" in fields:
+        queryset = queryset.annotate(cocktail_count=Count("bartendercocktaillistcocktail"))
+    if "cocktails" in fields:
+        entries = BartenderCocktailListCocktail.objects.select_related("cocktail").order_by("id")
+        queryset = queryset.prefetch_related(
+            Prefetch("bartendercocktaillistcocktail_set", queryset=entries, to_attr="api_entries")
+        )
+    return queryset
+
+
+public_lists = Resource("list", "lists", {
+    "id": lambda bartender_list: bartender_list.id,
+    "name": lambda bartender_list: bartender_list.name,
+    "url": lambda bartender_list: reverse("api-public-list-detail", args=[bartender_list.id]),
+    "owner": lambda bartender_list: bartender_list.owner.user.username,
+    "cocktail_count": lambda bartender_list: bartender_list.cocktail_count,
+    "cocktails": lambda bartender_list: [
+        {
+            "id": entry.cocktail.id,
+            "name": entry.cocktail.name,
+            "url": reverse("api-cocktail-detail", args=[entry.cocktail.id]),
+        }
+        for entry in bartender_list.api_entries
+    ],
+}, ("id", "name", "url", "owner", "cocktail_count"), _public_list_queryset)
+
+
+def catalogue_etag(request, *args, **kwargs):
+    """Strong ETag of an API response: changes with the catalogue generation and the URL."""
+    key = f"{catalogue_generation()}:{request.get_full_path()}"
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def catalogue_conditional(view):
+    """
+    `condition` with the catalogue ETag, only sent with successful responses: error responses
+    must not be cached against the generation by clients.
+    """
+    conditional_view = condition(etag_func=catalogue_etag)(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        if response.status_code not in (200, 304) and response.has_header("ETag"):
+            del response["ETag"]
+        return response
+
+    return wrapper
+
+
+def _page_url(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params["cursor"] = cursor
+    return f"{request.path}?{params.urlencode()}"
+
+
+def _list_response(request, resource, queryset=None):
+    """
+    Cursor-paged list of a resource. Takes `fields`, `limit` and `cursor` query parameters.
+    :param queryset: optional function filtering the resource queryset
+    """
+    try:
+        fields = resource.parse_fields(request, resource.list_fields)
+        limit = request.GET.get("limit", str(DEFAULT_LIMIT))
+        if not limit.isdigit():
+            raise ValueError("limit must be a number")
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        objects = resource.queryset(fields)
+        if queryset is not None:
+            objects = queryset(objects)
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+
+    page = KeysetPaginator(objects, limit, ordering=("name", "id")).get_page(request.GET.get("cursor"))
+
+    return JsonResponse({
+        "success": True,
+        resource.plural: [resource.serialize(obj, fields) for obj in page],
+        "next": _page_url(request, page.next_cursor),
+        "previous": _page_url(request, page.previous_cursor),
+    })
+
+
+def _detail_response(request, resource, pk):
+    try:
+        fields = resource.parse_fields(request, resource.fields)
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+
+    obj = get_object_or_404(resource.queryset(fields), pk=pk)
+    return JsonResponse({"success": True, resource.name: resource.serialize(obj, fields)})
+
+
+def _filter_cocktails(request):
+    """Apply the `category`, `classic`, `min_abv` and `max_abv` filters of the cocktail list."""
+    def apply(queryset):
+        category = request.GET.get("category")
+        if category:
+            if not category.isdigit():
+                raise ValueError("category must be a category id")
+            queryset = queryset.filter(category_id=category)
+        classic = request.GET.get("classic")
+        if classic:
+            queryset = queryset.filter(is_classic=classic.lower() in ("1", "true", "yes"))
+        for name, lookup in (("min_abv", "estimated_abv__gte"), ("max_abv", "estimated_abv__lte")):
+            value = request.GET.get(name)
+            if value:
+                try:
+                    queryset = queryset.filter(**{lookup: float(value)})
+                except ValueError:
+                    raise ValueError(f"{name} must be a number") from None
+        return queryset
+    return apply
+
+
+@require_safe
+@catalogue_conditional
+def cocktail_list(request):
+    """
+    List cocktails ordered by name.
+    Optional filters: `category` (category id), `classic` (true/false) and `min_abv`/`max_abv`
+    (estimated ABV in percent).
+    """
+    return _list_response(request, cocktails, _filter_cocktails(request))
+
+
+@require_safe
+@catalogue_conditional
+def cocktail_detail(request, cocktail_id):
+    """A single cocktail, by default with all of its fields including the ingredients."""
+    return _detail_response(request, cocktails, cocktail_id)
+
+
+@require_safe
+@catalogue_conditional
+def ingredient_list(request):
+    """List ingredients ordered by name."""
+    return _list_response(request, ingredients)
+
+
+@require_safe
+@catalogue_conditional
+def ingredient_detail(request, ingredient_id):
+    return _detail_response(request, ingredients, ingredient_id)
+
+
+@require_safe
+@catalogue_conditional
+def category_list(request):
+    """List cocktail categories ordered by name."""
+    return _list_response(request, categories)
+
+
+@require_safe
+@catalogue_conditional
+def category_detail(request, category_id):
+    return _detail_response(request, categories, category_id)
+
+
+@require_safe
+@catalogue_conditional
+def public_list_list(request):
+    """List the public bartender lists ordered by name."""
+    return _list_response(request, public_lists)
+
+
+@require_safe
+@catalogue_conditional
+def public_list_detail(request, list_id):
+    """A single public bartender list, by default with all of its cocktails."""
+    return _detail_response(request, public_lists, list_id)
@@ -0,0 +1,78 @@
+"""
+Ingredient autocomplete.
+
+The ingredient names are kept in memory as a sorted list of lowercased keys, one per word of every
+name ("lime juice" is found under "lime juice" and "juice"), so the suggestions for a prefix are a
+binary search and a short slice instead of a LIKE scan of the table. Matches at the start of the
+name come first. The index is built lazily with one query. Each process keeps its own copy, tagged
+with a version token in the shared cache: the signal receivers and import_cocktails replace the
+token whenever ingredients are added, renamed or deleted, and every process rebuilds its copy when
+it sees the token changed.
+"""
+import bisect
+import threading
+
+from .caching import bump_version, version
+from .models import Ingredient
+
+VERSION_KEY = "cocktails:ingredient-index-version"
+
+SUGGESTION_LIMIT = 10
+MAX_SUGGESTION_LIMIT = 50
+
+
+class IngredientIndex:
+    """Sorted word prefixes of the ingredient names."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._version = None
+        self._keys = []  # sorted (lowercased name from a word on, word position, ingredient id)
+        self._names = {}  # ingredient id -> name
+
+    def _ensure_loaded(self):
+        current = version(VERSION_KEY)
+        if self._loaded and self._version == current:
+            return
+        keys = []
+        names = dict(Ingredient.objects.values_list("id", "name").order_by())
+        for ingredient_id, name in names.items():
+            words = name.casefold().split()
+            keys += [(" ".join(words[position:]), position, ingredient_id) for position in range(len(words))]
+        keys.sort()
+        self._keys, self._names = keys, names
+        self._version = current
+        self._loaded = True
+
+    def clear(self):
+        """Forget everything, the index is rebuilt on next use in every process."""
+        with self._lock:
+            self._loaded = False
+            self._keys, self._names = [], {}
+            bump_version(VERSION_KEY)
+
+    def suggest(self, prefix, limit=SUGGESTION_LIMIT):
+        """
+        Ingredients with a word starting with `prefix`, case-insensitively.
+        :return: list of (ingredient id, name), names starting with the prefix first, then by name
+        """
+        prefix = " ".join(prefix.casefold().split())
+        if not prefix:
+            return []
+        with self._lock:
+            self._ensure_loaded()
+            keys = self._keys
+            matches = {}
+            for entry in range(bisect.bisect_left(keys, (prefix,)), len(keys)):
+                key, position, ingredient_id = keys[entry]
+                if not key.startswith(prefix):
+                    break
+                matches[ingredient_id] = min(position, matches.get(ingredient_id, position))
+            ranked = sorted(matches, key=lambda ingredient_id: (
+                matches[ingredient_id] > 0, self._names[ingredient_id].casefold(), ingredient_id,
+            ))
+            return [(ingredient_id, self._names[ingredient_id]) for ingredient_id in ranked[:limit]]
+
+
+index = IngredientIndex()
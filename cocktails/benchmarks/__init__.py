@@ -0,0 +1,10 @@
+"""
+Benchmarks for the cocktail views.
+
+`generate_benchmark_data` fills the database with a large, reproducible synthetic catalogue
+(see data.py) and `run_benchmarks` requests every view against it, recording wall time, SQL
+query count and peak memory as JSON (see suite.py). Keep the JSON of a run around to compare
+later commits against it with `run_benchmarks --compare`.
+
+Generate the data in a scratch copy of the database, the rows are not meant to be removed again.
+"""
@@ -0,0 +1,168 @@
+"""
+Seeded generator of a large synthetic catalogue.
+
+Rows are inserted with bulk_create, so the model signals don't run; cocktail strength is computed
+per batch and the search index, similar cocktails, pantry index, ingredient suggestions and page
+cache are refreshed once at the end instead. The same seed and sizes always produce the same data.
+"""
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.db import transaction
+
+from cocktails import autocomplete, search, pantry, similarity
+from cocktails.amounts import parse_amount, recompute_strength
+from cocktails.caching import bump_catalogue_generation
+from cocktails.models import User, Profile, Ingredient, CocktailCategory, Cocktail, CocktailIngredient, \
+    UserFavoriteList, UserCocktailList, BartenderCocktailList, BartenderCocktailListCocktail
+from cocktails.roles import BARTENDER, USER
+
+BATCH_SIZE = 5000
+USERNAME_PREFIX = "bench-user-"
+PASSWORD = "benchmark-password"
+
+DEFAULT_SIZES = {
+    "cocktails": 100_000,
+    "ingredients": 2_000,
+    "categories": 20,
+    "users": 50_000,
+    "bartenders": 2_000,
+    "lists": 10_000,
+    "favorites_per_user": 5,
+}
+
+INGREDIENT_BASES = [
+    ("Vodka", "Spirit", 40), ("Gin", "Spirit", 40), ("Rum", "Spirit", 40), ("Tequila", "Spirit", 38),
+    ("Whiskey", "Spirit", 43), ("Brandy", "Spirit", 40), ("Triple sec", "Liqueur", 30),
+    ("Vermouth", "Wine", 16), ("Prosecco", "Wine", 11), ("Bitters", "Bitters", 45),
+    ("Lime juice", "Juice", None), ("Lemon juice", "Juice", None), ("Orange juice", "Juice", None),
+    ("Pineapple juice", "Juice", None), ("Simple syrup", "Syrup", None), ("Grenadine", "Syrup", None),
+    ("Soda water", "Soft Drink", None), ("Tonic water", "Soft Drink", None), ("Cola", "Soft Drink", None),
+    ("Mint", "Herb", None), ("Egg white", "Other", None), ("Cream", "Dairy", None),
+]
+AMOUNTS = ["15 ml", "20 ml", "30 ml", "45 ml", "60 ml", "1 oz", "1.5 oz", "2 oz", "2 dashes", "1 tsp",
+           "1 bar spoon", "Top up", "To taste"]
+ADJECTIVES = ["Golden", "Smoky", "Midnight", "Tropical", "Bitter", "Velvet", "Spiced", "Frozen", "Royal",
+              "Wild", "Crimson", "Silver", "Dusty", "Electric", "Sunset", "Garden"]
+NOUNS = ["Sour", "Fizz", "Mule", "Spritz", "Martini", "Punch", "Smash", "Collins", "Julep", "Highball",
+         "Flip", "Cobbler", "Daisy", "Rickey", "Sling", "Swizzle"]
+GLASSES = ["Coupe", "Highball", "Rocks", "Martini", "Collins", "Hurricane", "Wine glass", "Copper mug"]
+STRENGTHS = [value for value, _ in Cocktail.ALCOHOLIC_STRENGTH]
+
+
+def _bulk_create(model, objects, log):
+    """Insert in batches, one transaction per batch. :return: the created objects with their ids"""
+    created = []
+    for start in range(0, len(objects), BATCH_SIZE):
+        with transaction.atomic():
+            created += model.objects.bulk_create(objects[start:start + BATCH_SIZE])
+    log(f"{len(created)} {model._meta.verbose_name_plural}")
+    return created
+
+
+def generate(seed=0, log=print, **sizes):
+    """
+    Generate a synthetic catalogue.
+    :param seed: random seed
+    :param log: function taking progress messages
+    :param sizes: overrides of DEFAULT_SIZES
+    :return: dict of the numbers of created rows
+    """
+    sizes = {**DEFAULT_SIZES, **sizes}
+    rng = random.Random(seed)
+
+    categories = _bulk_create(CocktailCategory, [
+        CocktailCategory(name=f"Category {i}", is_alcoholic=rng.random() < 0.85)
+        for i in range(sizes["categories"])
+    ], log)
+
+    ingredients = []
+    for i in range(sizes["ingredients"]):
+        base, ingredient_type, abv = INGREDIENT_BASES[i % len(INGREDIENT_BASES)]
+        ingredients.append(Ingredient(
+            name=f"{base} {i // len(INGREDIENT_BASES) + 1}", type=ingredient_type,
+            is_spirit=ingredient_type == "Spirit", alcohol_percentage=abv,
+        ))
+    ingredients = _bulk_create(Ingredient, ingredients, log)
+
+    # Cocktails and their ingredients go in together batch by batch, to keep memory bounded
+    cocktail_ids, classic_ids = [], []
+    cocktail_ingredients = 0
+    for start in range(0, sizes["cocktails"], BATCH_SIZE):
+        with transaction.atomic():
+            batch = Cocktail.objects.bulk_create([
+                Cocktail(
+                    name=f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}",
+                    category=rng.choice(categories),
+                    instructions="Shake all ingredients with ice and strain into a chilled glass.",
+                    glass_type=rng.choice(GLASSES),
+                    alcoholic_strength=rng.choice(STRENGTHS),
+                    is_classic=rng.random() < 0.7,
+                )
+                for i in range(start, min(start + BATCH_SIZE, sizes["cocktails"]))
+            ])
+            cocktail_ingredients += len(CocktailIngredient.objects.bulk_create([
+                CocktailIngredient(cocktail_id=cocktail.id, ingredient=ingredient, amount=amount,
+                                   volume_ml=parse_amount(amount))
+                for cocktail in batch
+                for ingredient in rng.sample(ingredients, rng.randint(2, min(7, len(ingredients))))
+                for amount in [rng.choice(AMOUNTS)]
+            ]))
+            recompute_strength(Cocktail.objects.filter(id__in=[cocktail.id for cocktail in batch]))
+        cocktail_ids += [cocktail.id for cocktail in batch]
+        classic_ids += [cocktail.id for cocktail in batch if cocktail.is_classic]
+        log(f"{len(cocktail_ids)} cocktails, {cocktail_ingredients} cocktail ingredients")
+
+    # One password hash for everybody, hashing 50k passwords would take ages
+    password = make_password(PASSWORD)
+    users = _bulk_create(User, [
+        User(username=f"{USERNAME_PREFIX}{i}", email=f"{USERNAME_PREFIX}{i}@example.com", password=password)
+        for i in range(sizes["users"])
+    ], log)
+    profiles = _bulk_create(Profile, [
+        Profile(user=user, preferred_drink_type=rng.choice(["Alcoholic", "Non-Alcoholic", "Both"]))
+        for user in users
+    ], log)
+
+    bartender_group, _ = Group.objects.get_or_create(name=BARTENDER)
+    user_group, _ = Group.objects.get_or_create(name=USER)
+    bartenders = profiles[:sizes["bartenders"]]
+    regulars = profiles[sizes["bartenders"]:]
+    _bulk_create(User.groups.through, [
+        User.groups.through(user_id=profile.user_id, group_id=bartender_group.id) for profile in bartenders
+    ] + [
+        User.groups.through(user_id=profile.user_id, group_id=user_group.id) for profile in regulars
+    ], log)
+
+    lists = _bulk_create(BartenderCocktailList, [
+        BartenderCocktailList(name=f"{rng.choice(ADJECTIVES)} menu {i}", owner=rng.choice(bartenders),
+                              is_public=rng.random() < 0.5)
+        for i in range(sizes["lists"])
+    ], log) if bartenders else []
+    _bulk_create(BartenderCocktailListCocktail, [
+        BartenderCocktailListCocktail(bartender_list=bartender_list, cocktail_id=cocktail_id)
+        for bartender_list in lists
+        for cocktail_id in rng.sample(cocktail_ids, min(rng.randint(5, 30), len(cocktail_ids)))
+    ], log)
+
+    favorite_lists = _bulk_create(UserFavoriteList, [UserFavoriteList(owner=profile) for profile in regulars], log)
+    max_favorites = min(2 * sizes["favorites_per_user"], len(classic_ids))
+    favorites = _bulk_create(UserCocktailList, [
+        UserCocktailList(user_list=favorite_list, cocktail_id=cocktail_id)
+        for favorite_list in favorite_lists
+        for cocktail_id in rng.sample(classic_ids, rng.randint(0, max_favorites))
+    ], log)
+
+    log("Rebuilding the search index")
+    search.rebuild_index()
+    log("Rebuilding the similar cocktails")
+    similarity.rebuild()
+    pantry.index.clear()
+    autocomplete.index.clear()
+    bump_catalogue_generation()
+
+    return {
+        "categories": len(categories), "ingredients": len(ingredients), "cocktails": len(cocktail_ids),
+        "users": len(users), "lists": len(lists), "favorites": len(favorites),
+    }
@@ -0,0 +1,278 @@
+"""
+Benchmarks of every view in cocktails/views.py.
+
+Each benchmark requests one URL through the Django test client, as an anonymous user, a regular
+user, a bartender or staff. The cache is cleared first, so the first ("cold") request pays for
+filling it; then the request is repeated and the minimum and median times are kept. Query
+counts come from the last repetition and peak memory from one extra request run under
+tracemalloc (tracing slows things down, so it is not timed). Requests that write are rolled back.
+"""
+import datetime
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, reset_queries, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from cocktails.models import User, Cocktail, Ingredient, BartenderCocktailList, BartenderCocktailListCocktail, \
+    UserCocktailList
+from cocktails.pagination import encode_cursor
+from cocktails.roles import BARTENDER, USER
+
+
+class Benchmark:
+    """
+    One view request.
+    :param name: benchmark name, the key in the results
+    :param path: function taking the fixtures dict and returning the URL
+    :param user: fixture key of the user to log in as, None for anonymous
+    :param method: HTTP method
+    :param data: function taking the fixtures dict and returning the request data
+    :param writes: roll the request back, so repetitions see the same database
+    """
+
+    def __init__(self, name, path, user=None, method="get", data=None, writes=False):
+        self.name = name
+        self.path = path
+        self.user = user
+        self.method = method
+        self.data = data
+        self.writes = writes
+
+
+BENCHMARKS = [
+    Benchmark("index", lambda f: reverse("index")),
+    Benchmark("index (user)", lambda f: reverse("index"), user="regular"),
+    Benchmark("carousel_slides", lambda f: reverse("carousel-slides") + "?after=0"),
+    Benchmark("carousel_slides (random)", lambda f: reverse("carousel-slides") + "?random=1"),
+    Benchmark("search", lambda f: reverse("search") + "?q=sour"),
+    Benchmark("cocktail_list", lambda f: reverse("cocktail-list")),
+    Benchmark("cocktail_list (deep page)", lambda f: reverse("cocktail-list") + f"?cursor={f['deep_cursor']}"),
+    Benchmark("cocktail_list (user)", lambda f: reverse("cocktail-list"), user="regular"),
+    Benchmark("cocktail_detail", lambda f: reverse("cocktail-detail", args=[f["cocktail"].id])),
+    Benchmark("cocktail_detail (user)", lambda f: reverse("cocktail-detail", args=[f["cocktail"].id]),
+              user="regular"),
+    Benchmark("cocktail_variants", lambda f: reverse("cocktail-variants", args=[f["cocktail"].id])),
+    Benchmark("public_lists", lambda f: reverse("public-lists")),
+    Benchmark("public_list_cocktails", lambda f: reverse("public-list-cocktails", args=[f["public_list"].id])),
+    Benchmark("bartender_lists", lambda f: reverse("bartender-lists"), user="bartender"),
+    Benchmark("create_bartender_list (form)", lambda f: reverse("create-bartender-list"), user="bartender"),
+    Benchmark("create_bartender_list", lambda f: reverse("create-bartender-list"), user="bartender",
+              method="post", data=lambda f: {"name": "Benchmark list"}, writes=True),
+    Benchmark("add_cocktail_to_list (form)",
+              lambda f: reverse("add-cocktail-to-list", args=[f["bartender_list"].id]), user="bartender"),
+    Benchmark("add_cocktail_to_list",
+              lambda f: reverse("add-cocktail-to-list", args=[f["bartender_list"].id]), user="bartender",
+              method="post", data=lambda f: {"cocktail": f["cocktail"].id}, writes=True),
+    Benchmark("remove_cocktail_from_list",
+              lambda f: reverse("remove-cocktail-from-list", args=[f["bartender_list"].id, f["list_cocktail"].id]),
+              user="bartender", method="post", writes=True),
+    Benchmark("customize_cocktail (form)", lambda f: reverse("customize-cocktail", args=[f["cocktail"].id]),
+              user="bartender"),
+    Benchmark("create_cocktail (form)", lambda f: reverse("create-cocktail"), user="bartender"),
+    Benchmark("ingredient_autocomplete", lambda f: reverse("ingredient-autocomplete") + "?q=li"),
+    Benchmark("toggle_list_visibility",
+              lambda f: reverse("toggle-list-visibility", args=[f["bartender_list"].id]),
+              user="bartender", method="post", writes=True),
+    Benchmark("delete_list", lambda f: reverse("delete-list", args=[f["bartender_list"].id]),
+              user="bartender", method="post", writes=True),
+    Benchmark("user_favorite_list", lambda f: reverse("user-favorite-list"), user="regular"),
+    Benchmark("recommended_cocktails", lambda f: reverse("recommendations"), user="regular"),
+    Benchmark("add_to_favorites", lambda f: reverse("add-to-favorites", args=[f["cocktail"].id]),
+              user="regular", writes=True),
+    Benchmark("remove_from_favorites", lambda f: reverse("remove-from-favorites", args=[f["favorite_cocktail"].id]),
+              user="regular", writes=True),
+    Benchmark("register_user (form)", lambda f: reverse("register")),
+    Benchmark("get_user_profile", lambda f: reverse("user-profile"), user="regular"),
+    Benchmark("export_cocktail_pdf", lambda f: reverse("export-cocktail-pdf", args=[f["cocktail"].id]),
+              user="regular"),
+    Benchmark("export_list_pdf", lambda f: reverse("export-list-pdf", args=[f["public_list"].id])),
+    Benchmark("export_favorites_pdf", lambda f: reverse("export-favorites-pdf"), user="regular"),
+    Benchmark("prep_sheet", lambda f: reverse("prep-sheet", args=[f["bartender_list"].id]) + "?serves=4",
+              user="bartender"),
+    Benchmark("pantry", lambda f: reverse("pantry") + f"?{f['pantry_query']}&max_missing=1"),
+    Benchmark("pantry_api", lambda f: reverse("pantry-api") + f"?{f['pantry_query']}&max_missing=1"),
+    Benchmark("export_dataset", lambda f: reverse("export-dataset", args=["cocktails"]), user="staff"),
+]
+
+
+def load_fixtures():
+    """
+    Pick the objects the benchmarks need from the database.
+    Missing ones are left out, the benchmarks using them are skipped.
+    """
+    fixtures = {}
+    cocktail = Cocktail.objects.filter(is_classic=True).order_by("id").first()
+    if cocktail:
+        fixtures["cocktail"] = cocktail
+    names = Cocktail.objects.filter(is_classic=True).order_by("name", "id")
+    middle = names.values_list("name", "id")[names.count() // 2:][:1]
+    if middle:
+        fixtures["deep_cursor"] = encode_cursor(middle[0])
+
+    public_list = (
+        BartenderCocktailList.objects.filter(is_public=True)
+        .annotate(cocktail_count=Count("bartendercocktaillistcocktail")).order_by("-cocktail_count", "id").first()
+    )
+    if public_list:
+        fixtures["public_list"] = public_list
+
+    bartender_list = (
+        BartenderCocktailList.objects
+        .filter(owner__user__groups__name=BARTENDER, bartendercocktaillistcocktail__isnull=False)
+        .select_related("owner__user").order_by("id").first()
+    )
+    if bartender_list:
+        fixtures["bartender_list"] = bartender_list
+        fixtures["bartender"] = bartender_list.owner.user
+        entry = BartenderCocktailListCocktail.objects.filter(bartender_list=bartender_list).order_by("id").first()
+        fixtures["list_cocktail"] = entry.cocktail
+
+    favorite = (
+        UserCocktailList.objects.filter(user_list__owner__user__groups__name=USER)
+        .select_related("user_list__owner__user", "cocktail").order_by("id").first()
+    )
+    if favorite:
+        fixtures["regular"] = favorite.user_list.owner.user
+        fixtures["favorite_cocktail"] = favorite.cocktail
+
+    staff = User.objects.filter(is_staff=True, is_active=True).order_by("id").first()
+    if staff:
+        fixtures["staff"] = staff
+
+    ingredient_ids = Ingredient.objects.order_by("id").values_list("id", flat=True)[:10]
+    fixtures["pantry_query"] = "&".join(f"ingredients={ingredient_id}" for ingredient_id in ingredient_ids)
+    return fixtures
+
+
+def _request(client, benchmark, path, data):
+    """Send the request, reading streamed bodies too. :return: response"""
+    if benchmark.writes:
+        with transaction.atomic():
+            response = getattr(client, benchmark.method)(path, data)
+            transaction.set_rollback(True)
+    else:
+        response = getattr(client, benchmark.method)(path, data)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    response.close()
+    return response
+
+
+def run_benchmark(benchmark, fixtures, repeat):
+    """:return: results dict of one benchmark"""
+    try:
+        path = benchmark.path(fixtures)
+        data = benchmark.data(fixtures) if benchmark.data else None
+        user = fixtures[benchmark.user] if benchmark.user else None
+    except KeyError as e:
+        return {"skipped": f"no {e.args[0]} in the database"}
+
+    client = Client()
+    if user:
+        client.force_login(user)
+
+    cache.clear()
+    started = time.perf_counter()
+    response = _request(client, benchmark, path, data)
+    cold = time.perf_counter() - started
+
+    times = []
+    for _ in range(repeat):
+        # Each request clears the query log when it starts, so start every capture from an empty log
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            _request(client, benchmark, path, data)
+            times.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        _request(client, benchmark, path, data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "status": response.status_code,
+        "cold_ms": round(cold * 1000, 2),
+        "min_ms": round(min(times) * 1000, 2),
+        "median_ms": round(statistics.median(times) * 1000, 2),
+        "queries": len(queries),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names=None, repeat=5, log=print):
+    """
+    Run the benchmarks.
+    :param names: names of the benchmarks to run, None for all
+    :param repeat: timed repetitions per benchmark
+    :param log: function taking progress messages
+    :return: results dict, ready to be dumped as JSON
+    """
+    fixtures = load_fixtures()
+    results = {}
+    # The test client talks to "testserver"
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        for benchmark in BENCHMARKS:
+            if names and benchmark.name not in names:
+                continue
+            results[benchmark.name] = result = run_benchmark(benchmark, fixtures, repeat)
+            if "skipped" in result:
+                log(f"{benchmark.name}: skipped, {result['skipped']}")
+            else:
+                log(f"{benchmark.name}: {result['median_ms']} ms, {result['queries']} queries, "
+                    f"{result['peak_kib']} KiB")
+
+    return {
+        "meta": {
+            "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "repeat": repeat,
+            "rows": {
+                "cocktails": Cocktail.objects.count(),
+                "ingredients": Ingredient.objects.count(),
+                "users": User.objects.count(),
+                "lists": BartenderCocktailList.objects.count(),
+                "favorites": UserCocktailList.objects.count(),
+            },
+        },
+        "benchmarks": results,
+    }
+
+
+def compare(baseline, current):
+    """
+    Compare two result sets.
+    :return: list of (name, baseline median ms, current median ms, baseline queries, current queries)
+    """
+    rows = []
+    for name, result in current["benchmarks"].items():
+        before = baseline["benchmarks"].get(name, {})
+        if "skipped" in result or not before or "skipped" in before:
+            continue
+        rows.append((name, before["median_ms"], result["median_ms"], before["queries"], result["queries"]))
+    return rows
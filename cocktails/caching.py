@@ -0,0 +1,74 @@
+"""
+Generation-versioned caching of the public catalogue.
+
+All cache keys include the current catalogue generation, a token that the signal receivers
+replace whenever a change to a cocktail, ingredient, category or public list commits. Stale
+entries are never read again and simply expire, so edits show up on the next request without
+having to guess TTLs or track which keys to delete.
+"""
+import hashlib
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+
+GENERATION_KEY = "cocktails:catalogue-generation"
+
+
+def cache_timeout():
+    return getattr(settings, "COCKTAILS_CACHE_TIMEOUT", 60 * 60 * 24)
+
+
+def version(key):
+    """
+    Token stored under `key` in the shared cache, created on first use. Processes compare it with
+    the token their in-memory data was built at to notice changes made by other processes.
+    """
+    token = cache.get(key)
+    if token is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        token = cache.get(key)
+    return token
+
+
+def bump_version(key):
+    """Replace the token stored under `key`. :return: the new token"""
+    token = uuid.uuid4().hex
+    cache.set(key, token, None)
+    return token
+
+
+def catalogue_generation():
+    """Token identifying the current state of the catalogue."""
+    return version(GENERATION_KEY)
+
+
+def bump_catalogue_generation():
+    """Invalidate every cached page and fragment of the catalogue."""
+    bump_version(GENERATION_KEY)
+
+
+def cache_anonymous_page(view):
+    """
+    View decorator caching the full response for anonymous GET requests.
+    Pages are keyed by path and query string; requests with pending flash messages,
+    and responses that set cookies or aren't 200, are not cached.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (request.method not in ("GET", "HEAD") or request.user.is_authenticated
+                or len(get_messages(request))):
+            return view(request, *args, **kwargs)
+
+        path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        key = f"cocktails:page:{catalogue_generation()}:{path_hash}"
+        response = cache.get(key)
+        if response is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                cache.set(key, response, cache_timeout())
+        return response
+
+    return wrapper
@@ -0,0 +1,125 @@
+"""
+Garbage collection of the catalogue.
+
+Removing a cocktail from a list, deleting a list or deleting a cocktail leaves things behind:
+custom cocktails nobody keeps anymore (in no bartender list and no favorites) and media files no
+row refers to. `run_gc` finds them in bulk, with one NOT EXISTS query for the cocktails and one
+scan of the upload directories for the files, and deletes them in batches. It runs as a scheduled
+job (`gc_catalogue` command), so the request handlers don't pay for this bookkeeping.
+
+Anything changed within the grace period is kept: a cocktail that was just created without being
+added to a list, or a file uploaded by a request that hasn't committed its row yet.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .images import DERIVATIVE_WIDTHS, derivative_name
+from .models import DEFAULT_PROFILE_PICTURE, BartenderCocktailListCocktail, Cocktail, Profile, UserCocktailList
+from .storage import walk
+
+GRACE_PERIOD = timedelta(hours=24)
+BATCH_SIZE = 500
+
+# (model, image field) of every uploaded file
+MEDIA_FIELDS = ((Cocktail, "image"), (Profile, "profile_picture"))
+
+
+def orphaned_cocktails(older_than):
+    """Custom cocktails in no bartender list and no favorites list, unchanged since `older_than`."""
+    return Cocktail.objects.filter(
+        ~Exists(BartenderCocktailListCocktail.objects.filter(cocktail=OuterRef("pk"))),
+        ~Exists(UserCocktailList.objects.filter(cocktail=OuterRef("pk"))),
+        is_classic=False, updated_at__lt=older_than,
+    )
+
+
+def _referenced_files(excluded_cocktail_ids=()):
+    """
+    Storage names of every stored image and its derivatives, and of the default profile picture.
+    :param excluded_cocktail_ids: cocktails whose images don't count, so a dry run reports the images
+        of the orphaned cocktails it would delete too
+    """
+    kept = {
+        Cocktail: Cocktail.objects.exclude(id__in=excluded_cocktail_ids),
+        Profile: Profile.objects.all(),
+    }
+    referenced = set()
+    for model, field in MEDIA_FIELDS:
+        names = set(
+            kept[model].exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+            .values_list(field, flat=True).distinct().iterator()
+        )
+        if model is Profile:
+            names.add(DEFAULT_PROFILE_PICTURE)
+        widths = DERIVATIVE_WIDTHS.get(f"{model._meta.label}.{field}", ())
+        referenced |= names
+        referenced.update(derivative_name(name, width) for name in names for width in widths)
+    return referenced
+
+
+def unreferenced_files(older_than, excluded_cocktail_ids=()):
+    """
+    Files in the upload directories of the image fields that no row refers to, neither as an
+    image nor as one of its derivatives, and that were last modified before `older_than`.
+    :param excluded_cocktail_ids: cocktails to count as deleted already
+    :return: list of (storage, name, size in bytes)
+    """
+    referenced = _referenced_files(excluded_cocktail_ids)
+    found = []
+    seen = set()
+    for model, field in MEDIA_FIELDS:
+        model_field = model._meta.get_field(field)
+        storage, directory = model_field.storage, model_field.upload_to
+        if (id(storage), directory) in seen:
+            continue
+        seen.add((id(storage), directory))
+        for name in walk(storage, directory):
+            if name not in referenced and storage.get_modified_time(name) < older_than:
+                found.append((storage, name, storage.size(name)))
+    return found
+
+
+def _delete_cocktails(cocktail_ids, older_than, batch_size, log):
+    deleted = 0
+    for start in range(0, len(cocktail_ids), batch_size):
+        batch = cocktail_ids[start:start + batch_size]
+        with transaction.atomic():
+            # Checked again, a cocktail may have been added to a list since it was found
+            _, per_model = orphaned_cocktails(older_than).filter(id__in=batch).delete()
+        deleted += per_model.get(Cocktail._meta.label, 0)
+        log(f"{deleted} of {len(cocktail_ids)} orphaned cocktails deleted")
+    return deleted
+
+
+def run_gc(dry_run=False, grace_period=GRACE_PERIOD, batch_size=BATCH_SIZE, log=print):
+    """
+    Delete the orphaned custom cocktails, then the media files nothing refers to anymore
+    (including the images of the cocktails just deleted). Meant to run as a scheduled job.
+    :param dry_run: only report what would be deleted
+    :param grace_period: keep cocktails and files changed more recently than this
+    :return: dict with the "cocktails" and "files" found (lists of (id, name) and of storage
+        names), and the "deleted_cocktails", "deleted_files" and "freed_bytes" counts
+    """
+    older_than = timezone.now() - grace_period
+    cocktails = list(orphaned_cocktails(older_than).order_by("id").values_list("id", "name"))
+    log(f"{len(cocktails)} orphaned cocktails")
+    report = {"cocktails": cocktails, "files": [], "deleted_cocktails": 0, "deleted_files": 0, "freed_bytes": 0}
+    if not dry_run:
+        report["deleted_cocktails"] = _delete_cocktails(
+            [cocktail_id for cocktail_id, _ in cocktails], older_than, batch_size, log,
+        )
+
+    # A real run only spares what it deleted: a cocktail orphaned since the listing, or skipped by
+    # its batch, still has its row and keeps its image
+    files = unreferenced_files(older_than, [cocktail_id for cocktail_id, _ in cocktails] if dry_run else ())
+    report["files"] = [name for _, name, _ in files]
+    log(f"{len(files)} unreferenced media files ({sum(size for _, _, size in files)} bytes)")
+    if not dry_run:
+        for storage, name, size in files:
+            storage.delete(name)
+            report["deleted_files"] += 1
+            report["freed_bytes"] += size
+    return report
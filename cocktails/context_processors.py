@@ -0,0 +1,20 @@
+from .caching import catalogue_generation, cache_timeout
+from .roles import BARTENDER, USER, request_roles
+
+
+def roles(request):
+    """Expose the user's roles and shortcut flags to templates."""
+    user_roles = request_roles(request)
+    return {
+        "roles": user_roles,
+        "is_bartender": BARTENDER in user_roles,
+        "is_regular_user": USER in user_roles,
+    }
+
+
+def catalogue(request):
+    """Expose the catalogue generation, used to key cached template fragments."""
+    return {
+        "catalogue_generation": catalogue_generation(),
+        "catalogue_cache_timeout": cache_timeout(),
+    }
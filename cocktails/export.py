@@ -0,0 +1,171 @@
+"""
+Streaming exports of the catalogue and the user lists.
+
+Rows are read with `.iterator(chunk_size=...)` (a server-side cursor where the database has
+them) and written out one line at a time, so memory use stays flat whatever the size of the
+catalogue. The same generators feed the `export_catalogue` command and the staff-only download
+view. The CSV layout of the cocktails matches what `import_cocktails` reads.
+"""
+import csv
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Cocktail, CocktailIngredient, Ingredient, BartenderCocktailList, \
+    BartenderCocktailListCocktail, UserCocktailList
+
+CHUNK_SIZE = 1000
+FORMATS = ("ndjson", "csv")
+
+
+def _cocktails(since):
+    ingredients = CocktailIngredient.objects.select_related("ingredient").order_by("id")
+    queryset = Cocktail.objects.select_related("category", "bartender").prefetch_related(
+        Prefetch("cocktailingredient_set", queryset=ingredients, to_attr="export_ingredients")
+    )
+    if since:
+        queryset = queryset.filter(updated_at__gte=since)
+    for cocktail in queryset.order_by("id").iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            "id": cocktail.id,
+            "name": cocktail.name,
+            "category": cocktail.category.name,
+            "glass_type": cocktail.glass_type,
+            "alcoholic_strength": cocktail.alcoholic_strength,
+            "is_classic": cocktail.is_classic,
+            "estimated_abv": round(cocktail.estimated_abv, 2),
+            "total_volume_ml": round(cocktail.total_volume_ml, 1),
+            "original_cocktail": cocktail.original_cocktail_id,
+            "bartender": cocktail.bartender.username if cocktail.bartender else None,
+            "image": cocktail.image.name or None,
+            "instructions": cocktail.instructions,
+            "ingredients": [
+                {"name": entry.ingredient.name, "amount": entry.amount} for entry in cocktail.export_ingredients
+            ],
+            "updated_at": cocktail.updated_at,
+        }
+
+
+def _ingredients(since):
+    queryset = Ingredient.objects.all()
+    if since:
+        queryset = queryset.filter(updated_at__gte=since)
+    for ingredient in queryset.order_by("id").iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            "id": ingredient.id,
+            "name": ingredient.name,
+            "type": ingredient.type,
+            "is_spirit": ingredient.is_spirit,
+            "alcohol_percentage": ingredient.alcohol_percentage,
+            "updated_at": ingredient.updated_at,
+        }
+
+
+def _bartender_lists(since):
+    queryset = BartenderCocktailList.objects.select_related("owner__user")
+    if since:
+        queryset = queryset.filter(updated_at__gte=since)
+    for bartender_list in queryset.order_by("id").iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            "id": bartender_list.id,
+            "name": bartender_list.name,
+            "owner": bartender_list.owner.user.username,
+            "is_public": bartender_list.is_public,
+            "updated_at": bartender_list.updated_at,
+        }
+
+
+def _bartender_list_entries(since):
+    queryset = BartenderCocktailListCocktail.objects.select_related("cocktail")
+    if since:
+        queryset = queryset.filter(added_at__gte=since)
+    for entry in queryset.order_by("id").iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            "id": entry.id,
+            "list": entry.bartender_list_id,
+            "cocktail": entry.cocktail_id,
+            "cocktail_name": entry.cocktail.name,
+            "added_at": entry.added_at,
+        }
+
+
+def _favorites(since):
+    queryset = UserCocktailList.objects.select_related("user_list__owner__user", "cocktail")
+    if since:
+        queryset = queryset.filter(added_at__gte=since)
+    for entry in queryset.order_by("id").iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            "id": entry.id,
+            "user": entry.user_list.owner.user.username,
+            "cocktail": entry.cocktail_id,
+            "cocktail_name": entry.cocktail.name,
+            "added_at": entry.added_at,
+        }
+
+
+# Dataset name -> (row generator, CSV columns)
+DATASETS = {
+    "cocktails": (_cocktails, (
+        "id", "name", "category", "glass_type", "alcoholic_strength", "is_classic", "estimated_abv",
+        "total_volume_ml", "original_cocktail", "bartender", "image", "instructions", "ingredients", "updated_at",
+    )),
+    "ingredients": (_ingredients, ("id", "name", "type", "is_spirit", "alcohol_percentage", "updated_at")),
+    "bartender_lists": (_bartender_lists, ("id", "name", "owner", "is_public", "updated_at")),
+    "bartender_list_entries": (_bartender_list_entries, ("id", "list", "cocktail", "cocktail_name", "added_at")),
+    "favorites": (_favorites, ("id", "user", "cocktail", "cocktail_name", "added_at")),
+}
+
+
+def parse_since(value):
+    """
+    Parse a `since` value: an ISO date or date-time, naive values are in the current time zone.
+    :raises ValueError: if the value is not a date
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date {value!r}, use YYYY-MM-DD or an ISO date-time.")
+        moment = datetime.datetime.combine(day, datetime.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class _Echo:
+    """File-like object handing back what is written, so csv.writer can produce single lines."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        # Ingredients as "name: amount|name: amount", the format import_cocktails reads
+        return "|".join(": ".join(str(part) for part in item.values()) for item in value)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return "" if value is None else value
+
+
+def export_lines(dataset, output_format="ndjson", since=None):
+    """
+    Generate the export of a dataset line by line.
+    :param dataset: one of DATASETS
+    :param output_format: "ndjson" or "csv" (with a header line)
+    :param since: only rows changed (or added) at or after this datetime
+    :return: iterator of text lines, newline included
+    """
+    rows, columns = DATASETS[dataset]
+    if output_format == "csv":
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for row in rows(since):
+            yield writer.writerow([_csv_value(row[column]) for column in columns])
+    else:
+        for row in rows(since):
+            yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
@@ -1,17 +1,20 @@
 from django import forms
 from django.core.exceptions import ValidationError
 from django.forms import inlineformset_factory, BaseInlineFormSet
-from .models import Profile, User, BartenderCocktailList, Cocktail, CocktailIngredient
+from django.urls import reverse_lazy
+from django.utils.functional import SimpleLazyObject, cached_property
+from .models import Profile, User, BartenderCocktailList, Cocktail, CocktailIngredient, Ingredient
+from .prep import MAX_SERVES
 
 
 class ProfileUpdateForm(forms.ModelForm):
-    """Update form for profile picture. Removes the check mark to for clearing the curent profile pic"""
+    """Update form for profile picture and drink preference. Removes the check mark to for clearing the curent profile pic"""
     profile_picture = forms.ImageField(
         widget=forms.ClearableFileInput(attrs={'clearable': False})
     )
     class Meta:
         model = Profile
-        fields = ('profile_picture',)
+        fields = ('profile_picture', 'preferred_drink_type')
 
 
 class UserUpdateForm(forms.ModelForm):
@@ -91,8 +94,112 @@ class CustomizeCocktailForm(forms.ModelForm):
                 self.fields["add_to_list"].initial = bartender_lists.first()
 
 
+class PrepSheetForm(forms.Form):
+    """Number of serves to prepare of each cocktail of a list, for the prep sheet."""
+    serves = forms.IntegerField(min_value=0, max_value=MAX_SERVES, required=False, initial=1,
+                                label="Serves per cocktail")
+
+    def __init__(self, cocktails, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cocktails = cocktails
+        for cocktail in cocktails:
+            self.fields[f"serves_{cocktail.id}"] = forms.IntegerField(
+                min_value=0, max_value=MAX_SERVES, required=False, label=cocktail.name,
+            )
+
+    def cocktail_fields(self):
+        """:return: iterator of (cocktail, bound field of its serves)"""
+        for cocktail in self.cocktails:
+            yield cocktail, self[f"serves_{cocktail.id}"]
+
+    def default_serves(self):
+        serves = self.cleaned_data.get("serves") if self.is_bound else None
+        return 1 if serves is None else serves
+
+    def cocktail_serves(self):
+        """:return: {cocktail id: serves} of the cocktails given their own number"""
+        if not self.is_bound:
+            return {}
+        return {
+            cocktail.id: self.cleaned_data[f"serves_{cocktail.id}"] for cocktail in self.cocktails
+            if self.cleaned_data.get(f"serves_{cocktail.id}") is not None
+        }
+
+
+class IngredientAutocompleteWidget(forms.Select):
+    """
+    <select> holding only the selected ingredient, so rendering it doesn't list the whole Ingredient
+    table. The script js/ingredient_autocomplete.js turns it into a search box fed by the
+    autocomplete endpoint. `names` ({ingredient id: name}) is filled by IngredientFormSetHelper with
+    the names of every form at once; a widget without it looks its own selection up.
+    """
+
+    def __init__(self, attrs=None):
+        super().__init__({
+            "class": "ingredient-autocomplete",
+            "data-url": reverse_lazy("ingredient-autocomplete"),
+            **(attrs or {}),
+        })
+        self.names = None
+
+    def optgroups(self, name, value, attrs=None):
+        ingredient_ids = [int(item) for item in value if str(item).isdigit()]
+        names = self.names
+        if names is None:
+            names = ingredient_names(ingredient_ids)
+        selected = {ingredient_id: names[ingredient_id] for ingredient_id in ingredient_ids if ingredient_id in names}
+        options = [] if self.allow_multiple_selected else [self.create_option(name, "", "---------", not selected, 0)]
+        options += [
+            self.create_option(name, ingredient_id, ingredient_name, True, position)
+            for position, (ingredient_id, ingredient_name) in enumerate(selected.items(), start=1)
+        ]
+        return [(None, options, 0)]
+
+
+class IngredientAutocompleteMultipleWidget(IngredientAutocompleteWidget, forms.SelectMultiple):
+    """IngredientAutocompleteWidget picking any number of ingredients."""
+
+
+class PantryForm(forms.Form):
+    """
+    Form for picking the ingredients a bar has in stock. The ingredients are searched with the
+    autocomplete endpoint, so the page doesn't grow with the Ingredient table.
+    """
+    ingredients = forms.ModelMultipleChoiceField(
+        queryset=Ingredient.objects.all(),
+        required=False,
+        widget=IngredientAutocompleteMultipleWidget,
+        label="Ingredients in stock",
+    )
+    max_missing = forms.TypedChoiceField(
+        choices=[(0, "None"), (1, "Up to 1"), (2, "Up to 2")],
+        coerce=int,
+        initial=1,
+        label="Allowed missing ingredients",
+    )
+
+
+def ingredient_names(ingredient_ids):
+    """:return: {ingredient id: name} of the given ids that exist, with one query"""
+    if not ingredient_ids:
+        return {}
+    return dict(Ingredient.objects.filter(id__in=ingredient_ids).values_list("id", "name"))
+
+
 class IngredientFormSetHelper(BaseInlineFormSet):
     """Custom Formset that dynamically adjusts extra fields and skips blank ones"""
+
+    @cached_property
+    def forms(self):
+        """The forms, their ingredient widgets sharing one lookup of all the selected names."""
+        forms = super().forms
+        names = SimpleLazyObject(lambda: ingredient_names({
+            int(value) for value in (form["ingredient"].value() for form in forms) if str(value).isdigit()
+        }))
+        for form in forms:
+            form.fields["ingredient"].widget.names = names
+        return forms
+
     def clean(self):
         """Override validation to allow empty ingredient fields instead of marking as required"""
         super().clean()
@@ -117,6 +224,7 @@ IngredientFormSet = inlineformset_factory(
     Cocktail,
     CocktailIngredient,
     fields=("ingredient", "amount"),
+    widgets={"ingredient": IngredientAutocompleteWidget},
     extra=10,  # Ensures at least one blank ingredient field for new additions
     can_delete=True,  # Allows removing ingredients
     formset=IngredientFormSetHelper  # Use the custom formset
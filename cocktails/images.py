@@ -0,0 +1,155 @@
+"""
+Responsive image derivatives.
+
+Every uploaded cocktail image (and profile picture) gets a few downscaled WebP copies stored next
+to the original as `<name>-<width>w.webp`. The `responsive_image` template tag picks them up and
+emits a `srcset`, so browsers download the smallest file that fits instead of the original.
+Processing runs on the background queue (see tasks.py), never on the request thread.
+"""
+import os
+from io import BytesIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from PIL import Image
+
+from .tasks import enqueue
+
+# Derivative widths per image field, keyed by "<app_label>.<Model>.<field>"
+DERIVATIVE_WIDTHS = {
+    "cocktails.Cocktail.image": (480, 960, 1600),
+    "cocktails.Profile.profile_picture": (75, 150),
+}
+WEBP_QUALITY = 80
+
+
+def field_label(field_file):
+    """Label "<app_label>.<Model>.<field>" of the image field this file belongs to."""
+    return f"{field_file.instance._meta.label}.{field_file.field.name}"
+
+
+def derivative_widths(field_file):
+    """Widths configured for the field this file belongs to."""
+    return DERIVATIVE_WIDTHS.get(field_label(field_file), ())
+
+
+def derivative_name(name, width):
+    """Storage name of the `width` pixels wide WebP copy of `name`."""
+    root, _ = os.path.splitext(name)
+    return f"{root}-{width}w.webp"
+
+
+def existing_derivatives(field_file):
+    """
+    :return: list of (width, storage name) of the derivatives that exist for this file
+    """
+    if not field_file:
+        return []
+    storage = field_file.storage
+    derivatives = []
+    for width in derivative_widths(field_file):
+        name = derivative_name(field_file.name, width)
+        if storage.exists(name):
+            derivatives.append((width, name))
+    return derivatives
+
+
+def _is_fresh(storage, name, original_modified):
+    return storage.exists(name) and storage.get_modified_time(name) >= original_modified
+
+
+def generate_derivatives(field_file, force=False):
+    """
+    Create the WebP derivatives of an image that are missing or older than the original.
+    Widths that are not smaller than the original are skipped, images are never upscaled.
+    :param field_file: FieldFile of an image field listed in DERIVATIVE_WIDTHS
+    :param force: regenerate even if the derivatives are up to date
+    :return: list of created storage names
+    """
+    if not field_file:
+        return []
+    return _generate_derivatives(field_file.storage, field_file.name, derivative_widths(field_file), force)
+
+
+def _generate_derivatives(storage, name, widths, force=False):
+    if not widths or not storage.exists(name):
+        return []
+
+    original_modified = storage.get_modified_time(name)
+    pending = [
+        width for width in widths
+        if force or not _is_fresh(storage, derivative_name(name, width), original_modified)
+    ]
+    if not pending:
+        return []
+
+    with storage.open(name) as original:
+        img = Image.open(original)
+        img.load()
+    img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+
+    created = []
+    for width in pending:
+        if width >= img.width:
+            continue
+        height = max(1, round(img.height * width / img.width))
+        buffer = BytesIO()
+        img.resize((width, height), Image.LANCZOS).save(buffer, "WEBP", quality=WEBP_QUALITY)
+
+        target = derivative_name(name, width)
+        if storage.exists(target):
+            storage.delete(target)
+        created.append(storage.save(target, ContentFile(buffer.getvalue())))
+    return created
+
+
+def _make_thumbnail(model, field_name, name, size):
+    """
+    Store a copy of the image shrunk to fit `size` and point the rows using the original at it.
+    The copy is saved through the field, so it gets its own content-addressed name; the original is
+    never rewritten and is left to gc_catalogue once nothing refers to it.
+    :return: storage name of the image to use from now on
+    """
+    instance = model.objects.filter(**{field_name: name}).first()
+    if instance is None:
+        return None
+    storage = model._meta.get_field(field_name).storage
+    with storage.open(name) as original:
+        img = Image.open(original)
+        img.load()
+    if img.width <= size[0] and img.height <= size[1]:
+        return name
+
+    image_format = img.format
+    img.thumbnail(size)
+    buffer = BytesIO()
+    img.save(buffer, image_format)
+    thumbnail = getattr(instance, field_name)
+    thumbnail.save(name, ContentFile(buffer.getvalue()), save=False)
+    model.objects.filter(**{field_name: name}).update(**{field_name: thumbnail.name})
+    return thumbnail.name
+
+
+def process_image(label, name, thumbnail_size=None):
+    """
+    Background job: optionally thumbnail a stored image, then refresh its derivatives.
+    :param label: "<app_label>.<Model>.<field>" of the image field
+    :param name: storage name of the image
+    :param thumbnail_size: (width, height) to shrink the original to, or None to keep it
+    """
+    model_label, field_name = label.rsplit(".", 1)
+    model = apps.get_model(model_label)
+    storage = model._meta.get_field(field_name).storage
+    if not storage.exists(name):
+        return
+    if thumbnail_size:
+        name = _make_thumbnail(model, field_name, name, thumbnail_size)
+        if name is None:
+            return  # Replaced before the job ran
+    _generate_derivatives(storage, name, DERIVATIVE_WIDTHS.get(label, ()))
+
+
+def queue_image_processing(field_file, thumbnail_size=None):
+    """Schedule `process_image` for this file once the current transaction commits."""
+    if field_file:
+        enqueue(process_image, field_label(field_file), field_file.name, thumbnail_size)
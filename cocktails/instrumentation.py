@@ -0,0 +1,103 @@
+"""
+Per-request performance instrumentation.
+
+While TimingMiddleware samples a request, every SQL query (through a connection execute wrapper)
+and every top-level template render (through the TimedDjangoTemplates backend) is timed into a
+RequestTimings object held in a context variable. Outside sampled requests both hooks cost a
+context variable lookup.
+"""
+import contextvars
+import time
+
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+_current = contextvars.ContextVar("cocktails_request_timings", default=None)
+
+
+class RequestTimings:
+    """Timings collected during one request. Durations are in seconds."""
+
+    def __init__(self):
+        self.queries = []  # (sql, duration)
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_db_time = 0.0  # part of db_time spent while rendering templates
+        self._rendering = 0
+
+    def add_query(self, sql, duration):
+        self.queries.append((sql, duration))
+        self.db_time += duration
+        if self._rendering:
+            self.template_db_time += duration
+
+    def slowest_queries(self, count):
+        """:return: list of (sql, duration), slowest first"""
+        return sorted(self.queries, key=lambda query: query[1], reverse=True)[:count]
+
+    def duplicated_queries(self):
+        """
+        Statements run more than once (same SQL, any parameters), the typical N+1 pattern.
+        :return: list of (sql, times run, total duration), most frequent first
+        """
+        stats = {}
+        for sql, duration in self.queries:
+            count, total = stats.get(sql, (0, 0.0))
+            stats[sql] = (count + 1, total + duration)
+        duplicated = [(sql, count, total) for sql, (count, total) in stats.items() if count > 1]
+        return sorted(duplicated, key=lambda query: (query[1], query[2]), reverse=True)
+
+
+def current_timings():
+    """RequestTimings of the request being sampled, or None."""
+    return _current.get()
+
+
+def start_timings():
+    """Start collecting for the current request. :return: (RequestTimings, token for stop_timings)"""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def stop_timings(token):
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper (see connection.execute_wrapper) timing each query."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(sql, time.perf_counter() - started)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        timings._rendering += 1
+        try:
+            return super().render(context, request)
+        finally:
+            timings._rendering -= 1
+            if not timings._rendering:
+                timings.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render times recorded into the request timings."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -0,0 +1,152 @@
+"""
+Variant lineage of customized cocktails.
+
+`Cocktail.original_cocktail` links every customized cocktail to the one it was made from, which
+forms a tree per classic. Each cocktail also stores the root of its tree and its depth
+(`lineage_root`, `lineage_depth`, kept in sync by Cocktail.save), so a whole tree is one indexed
+query. Ancestor chains and the subtree below a cocktail are walked in the database with
+recursive CTEs, also one query each, whatever the depth.
+"""
+from django.db import connection
+from django.db.models import Q
+
+# Guards the recursive queries against cycles entered through the admin
+MAX_DEPTH = 100
+
+
+def _table(model):
+    return model._meta.db_table
+
+
+def ancestors(cocktail):
+    """
+    The cocktails a variant was customized from, in one query.
+    :return: list of Cocktail, the root first and the direct original last
+    """
+    if cocktail.original_cocktail_id is None:
+        return []
+    model = type(cocktail)
+    table = _table(model)
+    return list(model.objects.raw(
+        f"""
+        WITH RECURSIVE chain(id, original_id, depth) AS (
+            SELECT id, original_cocktail_id, 0 FROM {table} WHERE id = %s
+            UNION ALL
+            SELECT c.id, c.original_cocktail_id, chain.depth + 1
+            FROM {table} c JOIN chain ON c.id = chain.original_id
+            WHERE chain.depth < %s
+        )
+        SELECT c.* FROM {table} c JOIN chain ON c.id = chain.id
+        WHERE chain.depth > 0
+        ORDER BY chain.depth DESC
+        """,
+        [cocktail.id, MAX_DEPTH],
+    ))
+
+
+def variants(cocktail, limit=None):
+    """
+    The variants made from a cocktail, and from those, in one query.
+    :param limit: maximum number of variants to return, closest first
+    :return: list of Cocktail with `variant_depth` (1 for direct variants) and `variant_count`
+        (number of variants in the whole subtree, also when `limit` cuts the list)
+    """
+    model = type(cocktail)
+    table = _table(model)
+    return list(model.objects.raw(
+        f"""
+        WITH RECURSIVE subtree(id, depth) AS (
+            SELECT id, 0 FROM {table} WHERE id = %s
+            UNION ALL
+            SELECT c.id, subtree.depth + 1
+            FROM {table} c JOIN subtree ON c.original_cocktail_id = subtree.id
+            WHERE subtree.depth < %s
+        )
+        SELECT c.*, subtree.depth AS variant_depth, COUNT(*) OVER () AS variant_count
+        FROM {table} c JOIN subtree ON c.id = subtree.id
+        WHERE subtree.depth > 0
+        ORDER BY subtree.depth, c.name, c.id
+        {"LIMIT %s" if limit is not None else ""}
+        """,
+        [cocktail.id, MAX_DEPTH] + ([limit] if limit is not None else []),
+    ))
+
+
+def tree(cocktail):
+    """
+    The whole variant tree a cocktail belongs to, from the stored roots, in one indexed query.
+    :return: list of (cocktail, depth) in depth-first order, children by name
+    """
+    model = type(cocktail)
+    root_id = cocktail.lineage_root_id or cocktail.id
+    rows = (
+        model.objects.filter(Q(lineage_root_id=root_id) | Q(id=root_id))
+        .only("id", "name", "original_cocktail", "is_classic").order_by("name", "id")
+    )
+    children = {}
+    root = None
+    for row in rows:
+        if row.id == root_id:
+            root = row
+        else:
+            children.setdefault(row.original_cocktail_id, []).append(row)
+
+    ordered = []
+    stack = [(root, 0)] if root else []
+    while stack:
+        node, depth = stack.pop()
+        ordered.append((node, depth))
+        stack += [(child, depth + 1) for child in reversed(children.get(node.id, []))]
+    return ordered
+
+
+def placement(original):
+    """:return: (root id, depth) of a variant of `original`, (None, 0) for a cocktail without one"""
+    if original is None:
+        return None, 0
+    return original.lineage_root_id or original.id, original.lineage_depth + 1
+
+
+def refresh_descendants(cocktail):
+    """
+    Store the root and depth of every cocktail below `cocktail` after it moved in the tree
+    (its original changed or was deleted). One recursive query finds the subtree, then one
+    UPDATE runs per level.
+    """
+    model = type(cocktail)
+    root_id, depth = cocktail.lineage_root_id or cocktail.id, cocktail.lineage_depth
+    by_depth = {}
+    for variant in variants(cocktail):
+        by_depth.setdefault(variant.variant_depth, []).append(variant.id)
+    for relative_depth, cocktail_ids in by_depth.items():
+        model.objects.filter(id__in=cocktail_ids).update(lineage_root_id=root_id, lineage_depth=depth + relative_depth)
+
+
+def detach(model, cocktail_ids):
+    """
+    Make the given cocktails roots of their own trees, after their original was deleted: one UPDATE
+    for them, then one recursive UPDATE giving everything below them its new root and depth.
+    """
+    cocktail_ids = list(cocktail_ids)
+    if not cocktail_ids:
+        return
+    model.objects.filter(id__in=cocktail_ids).update(original_cocktail=None, lineage_root=None, lineage_depth=0)
+    table = _table(model)
+    placeholders = ", ".join(["%s"] * len(cocktail_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH RECURSIVE subtree(id, root_id, depth) AS (
+                SELECT id, id, 0 FROM {table} WHERE id IN ({placeholders})
+                UNION ALL
+                SELECT c.id, subtree.root_id, subtree.depth + 1
+                FROM {table} c JOIN subtree ON c.original_cocktail_id = subtree.id
+                WHERE subtree.depth < %s
+            )
+            UPDATE {table}
+            SET lineage_root_id = (SELECT root_id FROM subtree WHERE subtree.id = {table}.id),
+                lineage_depth = (SELECT depth FROM subtree WHERE subtree.id = {table}.id)
+            WHERE id IN (SELECT id FROM subtree WHERE depth > 0)
+            """,
+            cocktail_ids + [MAX_DEPTH],
+        )
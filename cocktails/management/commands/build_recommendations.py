@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cocktails import recommendations
+
+
+class Command(BaseCommand):
+    help = "Recompute the cocktail recommendations of every user from the favorites. Meant to run daily."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=recommendations.TOP_N,
+                            help=f"Recommendations per user (default {recommendations.TOP_N}).")
+
+    def handle(self, *args, **options):
+        if options["limit"] < 1:
+            raise CommandError("--limit must be positive.")
+        started = time.monotonic()
+        stored = recommendations.build(options["limit"], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            f"{stored} recommendations stored in {time.monotonic() - started:.1f}s."
+        ))
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cocktails import similarity
+
+
+class Command(BaseCommand):
+    help = "Recompute the similar cocktails of every cocktail from scratch."
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        stored = similarity.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"{stored} similar cocktails stored in {time.monotonic() - started:.1f}s."
+        ))
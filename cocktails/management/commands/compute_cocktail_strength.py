@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from cocktails.amounts import recompute_strength, update_volumes
+from cocktails.caching import bump_catalogue_generation
+from cocktails.models import Cocktail, CocktailIngredient
+
+
+class Command(BaseCommand):
+    help = "Re-parse all ingredient amounts and recompute every cocktail's volume and estimated ABV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--show-unparsed", type=int, default=10, metavar="N",
+                            help="List the N most common amounts that are not volumes (default 10).")
+
+    def handle(self, *args, **options):
+        updated, unparsed = update_volumes(CocktailIngredient.objects.all())
+        self.stdout.write(f"{updated} ingredient volumes updated.")
+        if unparsed and options["show_unparsed"]:
+            self.stdout.write(f"{sum(unparsed.values())} amounts are not volumes, the most common:")
+            for amount, count in unparsed.most_common(options["show_unparsed"]):
+                self.stdout.write(f"  {amount!r}: {count}")
+
+        cocktails = recompute_strength(Cocktail.objects.all())
+        bump_catalogue_generation()
+        self.stdout.write(self.style.SUCCESS(f"Strength of {cocktails} cocktails recomputed."))
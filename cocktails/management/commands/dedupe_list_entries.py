@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from cocktails.models import BartenderCocktailListCocktail, UserCocktailList
+from cocktails.utils import duplicate_rows
+
+
+class Command(BaseCommand):
+    help = "Delete cocktails listed more than once in the same bartender list or favourites list."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report the duplicates.")
+
+    def handle(self, *args, **options):
+        for model, fields in (
+            (BartenderCocktailListCocktail, ("bartender_list", "cocktail")),
+            (UserCocktailList, ("user_list", "cocktail")),
+        ):
+            duplicates = duplicate_rows(model, fields)
+            if options["dry_run"]:
+                self.stdout.write(f"{model._meta.verbose_name_plural}: {duplicates.count()} duplicates")
+            else:
+                deleted, _ = duplicates.delete()
+                self.stdout.write(f"{model._meta.verbose_name_plural}: {deleted} duplicates deleted")
+        self.stdout.write(self.style.SUCCESS("Done."))
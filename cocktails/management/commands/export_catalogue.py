@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cocktails.export import DATASETS, FORMATS, export_lines, parse_since
+
+
+class Command(BaseCommand):
+    help = "Stream a dataset (cocktails, ingredients, lists, favorites) as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=sorted(DATASETS))
+        parser.add_argument("--format", choices=FORMATS, default="ndjson", help="Output format (default ndjson).")
+        parser.add_argument("--since", help="Only export rows changed at or after this ISO date or date-time.")
+        parser.add_argument("--output", help="File to write to, standard output by default.")
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = parse_since(options["since"])
+            except ValueError as e:
+                raise CommandError(e)
+
+        lines = export_lines(options["dataset"], options["format"], since)
+        if options["output"]:
+            rows = 0
+            with open(options["output"], "w", newline="", encoding="utf-8") as out:
+                for line in lines:
+                    out.write(line)
+                    rows += 1
+            if options["format"] == "csv":
+                rows -= 1  # header
+            self.stderr.write(self.style.SUCCESS(f"{rows} rows written to {options['output']}."))
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from cocktails.caching import bump_catalogue_generation
+from cocktails.cleanup import MEDIA_FIELDS
+from cocktails.storage import fold_duplicates
+
+
+class Command(BaseCommand):
+    help = ("Rename stored cocktail images and profile pictures to content-addressed names, "
+            "so identical files are kept once and shared by their rows.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be renamed.")
+
+    def handle(self, *args, **options):
+        renamed, freed = 0, 0
+        for model, field in MEDIA_FIELDS:
+            field_renamed, field_freed = fold_duplicates(
+                model, field, dry_run=options["dry_run"], log=self.stdout.write,
+            )
+            renamed += field_renamed
+            freed += field_freed
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"Dry run: {renamed} files would be renamed, freeing {freed} bytes."))
+            return
+        if renamed:
+            bump_catalogue_generation()
+        self.stdout.write(self.style.SUCCESS(f"{renamed} files renamed, {freed} bytes freed."))
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cocktails import cleanup
+
+
+class Command(BaseCommand):
+    help = ("Delete custom cocktails that are in no list and no favorites, and media files nothing refers to. "
+            "Meant to run daily.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted.")
+        parser.add_argument("--grace-hours", type=float, default=cleanup.GRACE_PERIOD.total_seconds() / 3600,
+                            help="Keep cocktails and files changed more recently than this (default 24).")
+        parser.add_argument("--batch-size", type=int, default=cleanup.BATCH_SIZE,
+                            help=f"Cocktails deleted per transaction (default {cleanup.BATCH_SIZE}).")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+        if options["grace_hours"] < 0:
+            raise CommandError("--grace-hours can't be negative.")
+
+        report = cleanup.run_gc(
+            dry_run=options["dry_run"], grace_period=timedelta(hours=options["grace_hours"]),
+            batch_size=options["batch_size"], log=self.stdout.write,
+        )
+        if options["dry_run"]:
+            for cocktail_id, name in report["cocktails"]:
+                self.stdout.write(f"Would delete cocktail {cocktail_id}: {name}")
+            for name in report["files"]:
+                self.stdout.write(f"Would delete {name}")
+            self.stdout.write(self.style.SUCCESS(
+                f"Dry run: {len(report['cocktails'])} cocktails and {len(report['files'])} files would be deleted."
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{report['deleted_cocktails']} cocktails and {report['deleted_files']} files deleted, "
+                f"{report['freed_bytes']} bytes freed."
+            ))
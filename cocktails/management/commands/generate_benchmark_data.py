@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from cocktails.benchmarks.data import DEFAULT_SIZES, generate
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a large synthetic catalogue for benchmarking. "
+        "Use a scratch copy of the database, the generated rows are not removed again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Random seed (default 0).")
+        for name, default in DEFAULT_SIZES.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default,
+                                help=f"Default {default}.")
+
+    def handle(self, *args, **options):
+        sizes = {name: options[name] for name in DEFAULT_SIZES}
+        created = generate(seed=options["seed"], log=self.stdout.write, **sizes)
+        summary = ", ".join(f"{count} {name}" for name, count in created.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary}."))
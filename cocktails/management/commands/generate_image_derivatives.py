@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from cocktails.images import generate_derivatives
+from cocktails.models import Cocktail, Profile
+
+
+class Command(BaseCommand):
+    help = "Create the responsive WebP derivatives for existing cocktail images and profile pictures."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Regenerate derivatives that are up to date.")
+
+    def handle(self, *args, **options):
+        created = 0
+        # Several rows can share one file, so each stored image is processed once
+        for model, field in ((Cocktail, "image"), (Profile, "profile_picture")):
+            seen = set()
+            for instance in model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True}).iterator():
+                field_file = getattr(instance, field)
+                if field_file.name in seen:
+                    continue
+                seen.add(field_file.name)
+                names = generate_derivatives(field_file, force=options["force"])
+                for name in names:
+                    self.stdout.write(f"Created {name}")
+                created += len(names)
+
+        self.stdout.write(self.style.SUCCESS(f"{created} derivatives created."))
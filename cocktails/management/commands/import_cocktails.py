@@ -0,0 +1,288 @@
+import csv
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from cocktails import autocomplete, search, pantry, similarity
+from cocktails.amounts import parse_amount, recompute_strength
+from cocktails.caching import bump_catalogue_generation
+from cocktails.images import queue_image_processing
+from cocktails.models import Cocktail, CocktailIngredient, CocktailCategory, Ingredient
+
+FORMATS = ("csv", "json", "ndjson")
+STRENGTHS = {value for value, _ in Cocktail.ALCOHOLIC_STRENGTH}
+TRUE_VALUES = ("1", "true", "yes", "y")
+DEFAULT_INGREDIENT_TYPE = "Other"
+
+
+def _iter_csv(stream):
+    """
+    One record per row. The `ingredients` column lists "name: amount" pairs separated by `|`,
+    e.g. "Vodka: 50 ml|Tomato juice: 100 ml|Salt".
+    """
+    for row in csv.DictReader(stream):
+        entries = []
+        for item in (row.get("ingredients") or "").split("|"):
+            name, _, amount = item.partition(":")
+            if name.strip():
+                entries.append({"name": name, "amount": amount})
+        row["ingredients"] = entries
+        yield row
+
+
+def _iter_ndjson(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _iter_json(stream, read_size=1 << 16):
+    """Items of a top-level JSON array, decoded one at a time without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buffer, eof = "", False
+    started = False
+    while True:
+        buffer = buffer.lstrip()
+        if not buffer:
+            if eof:
+                raise CommandError("Unexpected end of JSON input.")
+            chunk = stream.read(read_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        if not started:
+            if buffer[0] != "[":
+                raise CommandError("JSON input must be an array of cocktails.")
+            buffer, started = buffer[1:], True
+            continue
+        if buffer[0] == "]":
+            return
+        if buffer[0] == ",":
+            buffer = buffer[1:]
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise CommandError("Invalid JSON input.")
+            chunk = stream.read(read_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+READERS = {"csv": _iter_csv, "json": _iter_json, "ndjson": _iter_ndjson}
+
+
+class Command(BaseCommand):
+    help = (
+        "Import cocktails with their categories and ingredients from a CSV, JSON or NDJSON file. "
+        "Rows are inserted in chunks, each in its own transaction; an interrupted import continues "
+        "where it stopped when run again with the same file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import.")
+        parser.add_argument("--format", choices=FORMATS, help="Input format, guessed from the file extension by default.")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Cocktails per transaction (default 1000).")
+        parser.add_argument("--checkpoint", help="Progress file, <path>.checkpoint by default.")
+        parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and import from the start.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        input_format = options["format"] or os.path.splitext(path)[1].lstrip(".").lower()
+        if input_format not in FORMATS:
+            raise CommandError(f"Unknown input format {input_format!r}, use --format.")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive.")
+        checkpoint = options["checkpoint"] or f"{path}.checkpoint"
+
+        skip = 0 if options["restart"] else self._read_checkpoint(checkpoint)
+        if skip:
+            self.stdout.write(f"Resuming after {skip} records.")
+
+        self._load_lookups()
+        done, imported, skipped = skip, 0, 0
+        started = time.monotonic()
+        try:
+            with open(path, newline="", encoding="utf-8") as stream:
+                chunk = []
+                for number, record in enumerate(READERS[input_format](stream), start=1):
+                    if number <= skip:
+                        continue
+                    chunk.append((number, record))
+                    if len(chunk) >= options["chunk_size"]:
+                        imported_now, skipped_now = self._import_chunk(chunk)
+                        imported, skipped, done = imported + imported_now, skipped + skipped_now, number
+                        self._write_checkpoint(checkpoint, done)
+                        self._report(done, imported, started)
+                        chunk = []
+                if chunk:
+                    imported_now, skipped_now = self._import_chunk(chunk)
+                    imported, skipped, done = imported + imported_now, skipped + skipped_now, chunk[-1][0]
+                    self._write_checkpoint(checkpoint, done)
+                    self._report(done, imported, started)
+        except (OSError, ValueError, csv.Error) as e:
+            raise CommandError(f"Import stopped after record {done}: {e}")
+
+        if imported or skip:
+            # Refreshing the similar cocktails chunk by chunk costs more than one rebuild at the end.
+            # A resumed import rebuilds even without new records: the interrupted run didn't.
+            self.stdout.write("Rebuilding the similar cocktails.")
+            similarity.rebuild()
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f"{imported} cocktails imported, {skipped} records skipped in {time.monotonic() - started:.1f}s."
+        ))
+
+    def _read_checkpoint(self, checkpoint):
+        try:
+            with open(checkpoint) as f:
+                return int(json.load(f)["records"])
+        except FileNotFoundError:
+            return 0
+        except (ValueError, KeyError, TypeError):
+            raise CommandError(f"Unreadable checkpoint {checkpoint}, fix it or pass --restart.")
+
+    def _write_checkpoint(self, checkpoint, records):
+        tmp_path = f"{checkpoint}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"records": records}, f)
+        os.replace(tmp_path, checkpoint)
+
+    def _report(self, done, imported, started):
+        elapsed = time.monotonic() - started
+        rate = imported / elapsed if elapsed else 0
+        self.stdout.write(f"{done} records read, {imported} cocktails imported ({rate:.0f}/s)")
+
+    def _load_lookups(self):
+        """Name (case-insensitive) -> id maps of the existing categories and ingredients."""
+        self.categories = {}
+        for pk, name in CocktailCategory.objects.order_by("-id").values_list("id", "name"):
+            self.categories[name.strip().casefold()] = pk
+        self.ingredients = {}
+        for pk, name in Ingredient.objects.order_by("-id").values_list("id", "name"):
+            self.ingredients[name.strip().casefold()] = pk
+
+    def _clean(self, number, record):
+        """
+        Validate one input record.
+        :return: (cocktail fields, [(ingredient name, ingredient type, amount)]), or None to skip it
+        """
+        if not isinstance(record, dict):
+            self.stderr.write(f"Record {number}: not an object, skipped.")
+            return None
+        name = str(record.get("name") or "").strip()
+        category = str(record.get("category") or "").strip()
+        if not name or not category:
+            self.stderr.write(f"Record {number}: name and category are required, skipped.")
+            return None
+
+        strength = str(record.get("alcoholic_strength") or "Medium").strip().capitalize()
+        if strength not in STRENGTHS:
+            self.stderr.write(f"Record {number}: unknown alcoholic strength {strength!r}, skipped.")
+            return None
+        is_classic = record.get("is_classic", True)
+        if isinstance(is_classic, str):
+            is_classic = is_classic.strip().lower() in TRUE_VALUES
+
+        entries = []
+        for entry in record.get("ingredients") or []:
+            if isinstance(entry, str):
+                entry = {"name": entry}
+            ingredient_name = str(entry.get("name") or "").strip()
+            if ingredient_name:
+                entries.append((
+                    ingredient_name[:100],
+                    str(entry.get("type") or DEFAULT_INGREDIENT_TYPE).strip()[:50],
+                    str(entry.get("amount") or "").strip()[:100] or "To taste",
+                ))
+
+        fields = {
+            "name": name[:100],
+            "category": category[:50],
+            "instructions": str(record.get("instructions") or "").strip(),
+            "glass_type": str(record.get("glass_type") or "").strip()[:100],
+            "alcoholic_strength": strength,
+            "is_classic": bool(is_classic),
+            "image": str(record.get("image") or "").strip() or None,
+        }
+        return fields, entries
+
+    def _import_chunk(self, chunk):
+        """
+        Insert one chunk of records in a single transaction.
+        bulk_create bypasses the model signals and save(), so ingredient volumes, cocktail strength,
+        the search index, pantry index, ingredient suggestions and page cache are computed here for the whole chunk.
+        Records whose cocktail already exists (same name and category) are skipped, so a chunk that
+        committed just before a crash, but not its checkpoint, isn't imported twice on resume.
+        :return: (imported, skipped)
+        """
+        rows = [row for row in (self._clean(number, record) for number, record in chunk) if row]
+        if not rows:
+            return 0, len(chunk)
+
+        with transaction.atomic():
+            new_categories = {}
+            for fields, _ in rows:
+                key = fields["category"].casefold()
+                if key not in self.categories:
+                    new_categories.setdefault(key, CocktailCategory(name=fields["category"]))
+            for category in CocktailCategory.objects.bulk_create(new_categories.values()):
+                self.categories[category.name.casefold()] = category.pk
+
+            new_ingredients = {}
+            for _, entries in rows:
+                for ingredient_name, ingredient_type, _ in entries:
+                    key = ingredient_name.casefold()
+                    if key not in self.ingredients:
+                        new_ingredients.setdefault(key, Ingredient(name=ingredient_name, type=ingredient_type))
+            for ingredient in Ingredient.objects.bulk_create(new_ingredients.values()):
+                self.ingredients[ingredient.name.casefold()] = ingredient.pk
+
+            existing = set(
+                Cocktail.objects.filter(name__in={fields["name"] for fields, _ in rows})
+                .values_list("name", "category_id")
+            )
+            rows = [
+                (fields, entries) for fields, entries in rows
+                if (fields["name"], self.categories[fields["category"].casefold()]) not in existing
+            ]
+            cocktails = [
+                Cocktail(
+                    name=fields["name"], category_id=self.categories[fields["category"].casefold()],
+                    instructions=fields["instructions"], glass_type=fields["glass_type"],
+                    alcoholic_strength=fields["alcoholic_strength"], is_classic=fields["is_classic"],
+                    image=fields["image"],
+                )
+                for fields, _ in rows
+            ]
+            Cocktail.objects.bulk_create(cocktails)
+
+            cocktail_ingredients = [
+                CocktailIngredient(
+                    cocktail_id=cocktail.pk, ingredient_id=self.ingredients[ingredient_name.casefold()], amount=amount,
+                    volume_ml=parse_amount(amount),
+                )
+                for cocktail, (_, entries) in zip(cocktails, rows)
+                for ingredient_name, _, amount in entries
+            ]
+            CocktailIngredient.objects.bulk_create(cocktail_ingredients, batch_size=5000)
+
+            cocktail_ids = [cocktail.pk for cocktail in cocktails]
+            recompute_strength(Cocktail.objects.filter(id__in=cocktail_ids))
+            search.index_cocktails(cocktail_ids)
+            for cocktail in cocktails:
+                queue_image_processing(cocktail.image)
+
+        pantry.index.refresh_cocktails(cocktail_ids)
+        if new_ingredients:
+            autocomplete.index.clear()
+        bump_catalogue_generation()
+        return len(cocktails), len(chunk) - len(rows)
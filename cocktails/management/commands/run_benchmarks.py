@@ -0,0 +1,51 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cocktails.benchmarks import suite
+
+
+class Command(BaseCommand):
+    help = "Benchmark the views: wall time, SQL queries and peak memory, written as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="Write the JSON results to this file.")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed requests per benchmark (default 5).")
+        parser.add_argument("--only", nargs="+", metavar="NAME", help="Only run these benchmarks.")
+        parser.add_argument("--compare", metavar="FILE", help="Compare with the JSON results of an earlier run.")
+        parser.add_argument("--list", action="store_true", help="List the benchmark names and exit.")
+
+    def handle(self, *args, **options):
+        if options["list"]:
+            for benchmark in suite.BENCHMARKS:
+                self.stdout.write(benchmark.name)
+            return
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be positive.")
+        known = {benchmark.name for benchmark in suite.BENCHMARKS}
+        unknown = set(options["only"] or ()) - known
+        if unknown:
+            raise CommandError(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+        baseline = None
+        if options["compare"]:
+            try:
+                with open(options["compare"]) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {options['compare']}: {e}")
+
+        results = suite.run(options["only"], options["repeat"], log=self.stdout.write)
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}."))
+
+        if baseline:
+            self.stdout.write(f"\n{'benchmark':<32} {'before ms':>10} {'after ms':>10} {'change':>8} {'queries':>10}")
+            for name, before_ms, after_ms, before_queries, after_queries in suite.compare(baseline, results):
+                change = f"{(after_ms - before_ms) / before_ms:+.0%}" if before_ms else "n/a"
+                self.stdout.write(
+                    f"{name:<32} {before_ms:>10} {after_ms:>10} {change:>8} {before_queries:>4} -> {after_queries:<4}"
+                )
@@ -0,0 +1,90 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.functional import SimpleLazyObject
+
+from .instrumentation import record_query, start_timings, stop_timings
+from .roles import get_roles
+
+slow_request_logger = logging.getLogger("cocktails.timing")
+
+
+class RolesMiddleware:
+    """
+    Sets `request.roles`, the user's group names, resolved lazily at most once per request.
+    Must come after SessionMiddleware and AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.roles = SimpleLazyObject(lambda: get_roles(request))
+        return self.get_response(request)
+
+
+class TimingMiddleware:
+    """
+    Measures a sample of the requests: SQL query count and time, template render time and the
+    remaining (view) time. They are sent back in a Server-Timing header, and requests slower than
+    COCKTAILS_SLOW_REQUEST_MS are logged as JSON to the "cocktails.timing" logger together with
+    their slowest and duplicated queries.
+    Sampling is off unless COCKTAILS_TIMING_SAMPLE_RATE is above 0 (1 measures every request).
+    Template times need the cocktails.instrumentation.TimedDjangoTemplates backend.
+    Should come first in MIDDLEWARE, so the other middleware is measured too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample_rate = getattr(settings, "COCKTAILS_TIMING_SAMPLE_RATE", 0)
+        if not sample_rate or random.random() >= sample_rate:
+            return self.get_response(request)
+
+        timings, token = start_timings()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(record_query))
+                response = self.get_response(request)
+        finally:
+            stop_timings(token)
+        total = time.perf_counter() - started
+
+        # Queries run from templates are part of the template time already
+        view = max(0.0, total - timings.template_time - (timings.db_time - timings.template_db_time))
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={timings.db_time * 1000:.1f};desc="{len(timings.queries)} queries"',
+            f"tpl;dur={timings.template_time * 1000:.1f}",
+            f"view;dur={view * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ])
+
+        if total * 1000 >= getattr(settings, "COCKTAILS_SLOW_REQUEST_MS", 500):
+            top = getattr(settings, "COCKTAILS_SLOW_REQUEST_TOP_QUERIES", 5)
+            slow_request_logger.warning(json.dumps({
+                "event": "slow_request",
+                "method": request.method,
+                "path": request.get_full_path(),
+                "status": response.status_code,
+                "total_ms": round(total * 1000, 1),
+                "view_ms": round(view * 1000, 1),
+                "db_ms": round(timings.db_time * 1000, 1),
+                "template_ms": round(timings.template_time * 1000, 1),
+                "queries": len(timings.queries),
+                "slowest_queries": [
+                    {"sql": sql, "ms": round(duration * 1000, 2)} for sql, duration in timings.slowest_queries(top)
+                ],
+                "duplicated_queries": [
+                    {"sql": sql, "count": count, "ms": round(duration * 1000, 2)}
+                    for sql, count, duration in timings.duplicated_queries()[:top]
+                ],
+            }))
+        return response
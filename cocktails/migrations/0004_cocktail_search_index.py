@@ -0,0 +1,41 @@
+from django.db import migrations
+
+FTS_TABLE = "cocktails_cocktail_fts"
+
+
+def create_search_index(apps, schema_editor):
+    """Create and fill the FTS5 search index (SQLite only, other backends search with icontains)."""
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        "name, category, glass_type, instructions, ingredients, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(f"""
+        INSERT INTO {FTS_TABLE} (rowid, name, category, glass_type, instructions, ingredients)
+        SELECT c.id, c.name, cat.name, c.glass_type, c.instructions,
+               COALESCE((SELECT group_concat(i.name, ' ')
+                         FROM cocktails_cocktailingredient ci
+                         JOIN cocktails_ingredient i ON i.id = ci.ingredient_id
+                         WHERE ci.cocktail_id = c.id), '')
+        FROM cocktails_cocktail c
+        JOIN cocktails_cocktailcategory cat ON cat.id = c.category_id
+    """)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocktails', '0003_cocktailingredient_amount'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
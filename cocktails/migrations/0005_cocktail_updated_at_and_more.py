@@ -0,0 +1,49 @@
+# Generated by Django 4.2.19 on 2026-10-17 22:51
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocktails', '0004_cocktail_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cocktail',
+            name='alcoholic_strength',
+            field=models.CharField(choices=[('None', 'None'), ('Light', 'Light'), ('Medium', 'Medium'), ('Strong', 'Strong')], default='Medium', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='cocktail',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='bartendercocktaillist',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='bartendercocktaillistcocktail',
+            name='added_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='usercocktaillist',
+            name='added_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
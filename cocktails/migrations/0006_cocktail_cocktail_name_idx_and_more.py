@@ -0,0 +1,46 @@
+# Generated by Django 4.2.19 on 2026-10-17 22:51
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def delete_duplicate_entries(apps, schema_editor):
+    """
+    Drop repeated list and favourite entries, so the unique constraints can be created.
+    The row with the lowest id is kept. A copy of cocktails.utils.duplicate_rows, so later changes
+    to it don't change what this migration does.
+    """
+    for model_name, fields in (
+        ("BartenderCocktailListCocktail", ("bartender_list", "cocktail")),
+        ("UserCocktailList", ("user_list", "cocktail")),
+    ):
+        model = apps.get_model("cocktails", model_name)
+        keep = model.objects.values(*fields).annotate(keep_id=Min("id")).values("keep_id")
+        model.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocktails', '0005_cocktail_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_entries, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='cocktail',
+            index=models.Index(fields=['name', 'id'], name='cocktail_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cocktail',
+            index=models.Index(fields=['is_classic', 'name', 'id'], name='cocktail_classic_name_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='bartendercocktaillistcocktail',
+            constraint=models.UniqueConstraint(fields=('bartender_list', 'cocktail'), name='unique_list_cocktail'),
+        ),
+        migrations.AddConstraint(
+            model_name='usercocktaillist',
+            constraint=models.UniqueConstraint(fields=('user_list', 'cocktail'), name='unique_favorite_cocktail'),
+        ),
+    ]
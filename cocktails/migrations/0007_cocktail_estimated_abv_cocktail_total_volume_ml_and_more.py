@@ -0,0 +1,138 @@
+# Generated by Django 4.2.19 on 2026-10-17 22:59
+
+import re
+
+from django.db import migrations, models
+from django.db.models import F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+# A copy of the amount parser and strength computation of cocktails.amounts as they were when this
+# migration was written, so later changes to them don't change what it does.
+
+OUNCE_ML = 29.57
+
+UNITS = {
+    "ml": 1, "milliliter": 1, "millilitre": 1,
+    "cl": 10, "centiliter": 10, "centilitre": 10,
+    "dl": 100, "l": 1000, "liter": 1000, "litre": 1000,
+    "oz": OUNCE_ML, "ounce": OUNCE_ML, "fl oz": OUNCE_ML, "fluid ounce": OUNCE_ML,
+    "shot": 44, "jigger": 44, "pony": 30,
+    "tbsp": 15, "tablespoon": 15, "tsp": 5, "teaspoon": 5, "bar spoon": 5, "barspoon": 5,
+    "cup": 240, "pint": 473,
+    "splash": 5, "dash": 0.9, "drop": 0.05,
+}
+NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "half": 0.5}
+FRACTIONS = {"¼": " 1/4", "½": " 1/2", "¾": " 3/4", "⅓": " 1/3", "⅔": " 2/3", "⅛": " 1/8"}
+
+_NUMBER = r"\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?"
+_AMOUNT_RE = re.compile(
+    rf"^(?:(?P<low>{_NUMBER}|(?:{'|'.join(NUMBER_WORDS)})\b)\s*(?:(?:-|to\b)\s*(?P<high>{_NUMBER})\s*)?)?"
+    rf"(?P<unit>.*)$"
+)
+
+
+def _number(text):
+    if text in NUMBER_WORDS:
+        return NUMBER_WORDS[text]
+    total = 0.0
+    for part in text.split():
+        if "/" in part:
+            numerator, denominator = part.split("/")
+            if float(denominator) == 0:
+                raise ValueError(text)
+            total += float(numerator) / float(denominator)
+        else:
+            total += float(part)
+    return total
+
+
+def _unit_ml(text):
+    words = re.sub(r"[^a-z ]", " ", text).split()
+    for length in (2, 1):
+        if len(words) < length:
+            continue
+        unit = " ".join(words[:length])
+        singulars = (unit[:-1] if unit.endswith("s") else None, unit[:-2] if unit.endswith("es") else None)
+        for candidate in (unit, *singulars):
+            if candidate in UNITS:
+                return UNITS[candidate]
+    return None
+
+
+def parse_amount(amount):
+    if not amount:
+        return None
+    text = amount.strip().lower().replace(",", ".")
+    for fraction, replacement in FRACTIONS.items():
+        text = text.replace(fraction, replacement)
+    text = text.strip()
+
+    match = _AMOUNT_RE.match(text)
+    if not match:
+        return None
+    unit_ml = _unit_ml(match.group("unit"))
+    if unit_ml is None:
+        return None
+    try:
+        quantity = _number(match.group("low")) if match.group("low") else 1
+        if match.group("high"):
+            quantity = (quantity + _number(match.group("high"))) / 2
+    except ValueError:
+        return None
+    return round(quantity * unit_ml, 2)
+
+
+def compute_strength(apps, schema_editor):
+    CocktailIngredient = apps.get_model("cocktails", "CocktailIngredient")
+    Cocktail = apps.get_model("cocktails", "Cocktail")
+
+    changed = []
+    for entry in CocktailIngredient.objects.only("id", "amount", "volume_ml").order_by().iterator(chunk_size=2000):
+        volume = parse_amount(entry.amount)
+        if volume != entry.volume_ml:
+            entry.volume_ml = volume
+            changed.append(entry)
+    CocktailIngredient.objects.bulk_update(changed, ["volume_ml"], batch_size=2000)
+
+    rows = (
+        CocktailIngredient.objects.filter(cocktail=OuterRef("pk"), volume_ml__isnull=False)
+        .order_by().values("cocktail")
+    )
+    volume = Subquery(rows.annotate(total=Sum("volume_ml")).values("total"), output_field=FloatField())
+    alcohol = Subquery(rows.annotate(total=Sum(
+        F("volume_ml") * Coalesce(Cast("ingredient__alcohol_percentage", FloatField()), Value(0.0))
+    )).values("total"), output_field=FloatField())
+    Cocktail.objects.update(
+        total_volume_ml=Coalesce(volume, Value(0.0)),
+        estimated_abv=Coalesce(alcohol / NullIf(volume, Value(0.0)), Value(0.0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocktails', '0006_cocktail_cocktail_name_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cocktail',
+            name='estimated_abv',
+            field=models.FloatField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cocktail',
+            name='total_volume_ml',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cocktailingredient',
+            name='volume_ml',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='cocktail',
+            index=models.Index(fields=['is_classic', '-estimated_abv', 'id'], name='cocktail_classic_abv_idx'),
+        ),
+        migrations.RunPython(compute_strength, migrations.RunPython.noop),
+    ]
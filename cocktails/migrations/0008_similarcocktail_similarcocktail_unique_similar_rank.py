@@ -0,0 +1,28 @@
+# Generated by Django 4.2.19 on 2026-10-17 23:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocktails', '0007_cocktail_estimated_abv_cocktail_total_volume_ml_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarCocktail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('cocktail', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='cocktails.cocktail')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cocktails.cocktail')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='similarcocktail',
+            constraint=models.UniqueConstraint(fields=('cocktail', 'rank'), name='unique_similar_rank'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.19 on 2026-10-17 23:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocktails', '0008_similarcocktail_similarcocktail_unique_similar_rank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('cocktail', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='cocktails.cocktail')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='cocktails.profile')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='recommendation',
+            constraint=models.UniqueConstraint(fields=('profile', 'rank'), name='unique_recommendation_rank'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.19 on 2026-10-17 23:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_lineage(apps, schema_editor):
+    """Store the root and depth of every customized cocktail, one level of the trees at a time."""
+    Cocktail = apps.get_model('cocktails', 'Cocktail')
+    level = dict(Cocktail.objects.filter(original_cocktail__isnull=True).values_list('id', 'id'))
+    depth = 0
+    # Cocktails in a cycle of originals are never reached and stay roots
+    while level and depth < 100:
+        depth += 1
+        children = {}
+        for cocktail_id, original_id in Cocktail.objects.filter(original_cocktail_id__in=level).values_list(
+                'id', 'original_cocktail_id'):
+            children[cocktail_id] = level[original_id]
+        roots = {}
+        for cocktail_id, root_id in children.items():
+            roots.setdefault(root_id, []).append(cocktail_id)
+        for root_id, cocktail_ids in roots.items():
+            Cocktail.objects.filter(id__in=cocktail_ids).update(lineage_root_id=root_id, lineage_depth=depth)
+        level = children
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocktails', '0009_recommendation_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cocktail',
+            name='lineage_depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cocktail',
+            name='lineage_root',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='cocktails.cocktail'),
+        ),
+        migrations.AddIndex(
+            model_name='cocktail',
+            index=models.Index(fields=['lineage_root', 'lineage_depth'], name='cocktail_lineage_idx'),
+        ),
+        migrations.RunPython(fill_lineage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.19 on 2026-10-17 23:13
+
+import cocktails.storage
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cocktails', '0010_cocktail_lineage_depth_cocktail_lineage_root_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cocktail',
+            name='image',
+            field=cocktails.storage.ContentAddressedImageField(blank=True, null=True, upload_to='cocktails'),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='profile_picture',
+            field=cocktails.storage.ContentAddressedImageField(blank=True, default='profile_pics/default-user.png', null=True, upload_to='profile_pics'),
+        ),
+    ]
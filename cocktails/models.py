@@ -1,14 +1,21 @@
 from django.db import models
 from django.contrib.auth.models import User
-from PIL import Image
+
+from .amounts import parse_amount
+from .lineage import placement, refresh_descendants
+from .images import queue_image_processing
+from .storage import ContentAddressedImageField
+
+
+DEFAULT_PROFILE_PICTURE = "profile_pics/default-user.png"
 
 
 class Profile(models.Model):
     """Profile Model"""
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    profile_picture = models.ImageField(
+    profile_picture = ContentAddressedImageField(
         upload_to='profile_pics',
-        default="profile_pics/default-user.png",
+        default=DEFAULT_PROFILE_PICTURE,
         blank=True,
         null=True
     )
@@ -22,13 +29,24 @@ class Profile(models.Model):
     def __str__(self):
         return self.user.username
 
+    THUMBNAIL_SIZE = (200, 200)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_picture = instance.profile_picture.name
+        return instance
+
     def save(self, *args, **kwargs):
+        """
+        Saves the profile and, only when a new picture was stored, queues it for thumbnailing.
+        The image work runs in the background, so saving stays cheap for email-only updates.
+        """
         super().save(*args, **kwargs)
-        if self.profile_picture.path:
-            img = Image.open(self.profile_picture.path)
-            thumb_size = (200, 200)
-            img.thumbnail(thumb_size)
-            img.save(self.profile_picture.path)
+        picture = self.profile_picture.name
+        if picture and picture != getattr(self, "_stored_picture", DEFAULT_PROFILE_PICTURE):
+            queue_image_processing(self.profile_picture, self.THUMBNAIL_SIZE)
+        self._stored_picture = picture
 
 
 class Ingredient(models.Model):
@@ -37,6 +55,7 @@ class Ingredient(models.Model):
     type = models.CharField(max_length=50)
     is_spirit = models.BooleanField(default=False)
     alcohol_percentage = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
@@ -58,7 +77,7 @@ class Cocktail(models.Model):
     bartender = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     category = models.ForeignKey(CocktailCategory, on_delete=models.CASCADE)
     instructions = models.TextField()
-    image = models.ImageField(upload_to='cocktails', blank=True, null=True)
+    image = ContentAddressedImageField(upload_to='cocktails', blank=True, null=True)
     glass_type = models.CharField(max_length=100)
     ALCOHOLIC_STRENGTH = [
         ('None', 'None'),
@@ -68,6 +87,25 @@ class Cocktail(models.Model):
     ]
     alcoholic_strength = models.CharField(max_length=10, choices=ALCOHOLIC_STRENGTH, default='Medium')
     is_classic = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Derived from the ingredients by amounts.recompute_strength, see signals.py
+    total_volume_ml = models.FloatField(default=0, editable=False)
+    estimated_abv = models.FloatField(default=0, db_index=True, editable=False)
+    # Place in the tree of customizations, maintained by save(), see lineage.py. No root for classics.
+    lineage_root = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, related_name='+',
+                                     editable=False)
+    lineage_depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Name-ordered listings, all cocktails and classics only (keyset pagination on name, id)
+            models.Index(fields=["name", "id"], name="cocktail_name_idx"),
+            models.Index(fields=["is_classic", "name", "id"], name="cocktail_classic_name_idx"),
+            # Classics sorted by strength
+            models.Index(fields=["is_classic", "-estimated_abv", "id"], name="cocktail_classic_abv_idx"),
+            # Whole variant trees, in tree order
+            models.Index(fields=["lineage_root", "lineage_depth"], name="cocktail_lineage_idx"),
+        ]
 
     @property
     def is_alcoholic(self):
@@ -83,16 +121,66 @@ class Cocktail(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """
+        Saves the cocktail with its lineage root and depth taken from its original.
+        When an existing cocktail moves in the tree, its variants follow.
+        """
+        root_id, depth = placement(self.original_cocktail)
+        moved = self.pk is not None and (root_id, depth) != (self.lineage_root_id, self.lineage_depth)
+        self.lineage_root_id, self.lineage_depth = root_id, depth
+        super().save(*args, **kwargs)
+        if moved:
+            refresh_descendants(self)
+
 
 class CocktailIngredient(models.Model):
     """Junction Table for Cocktail-Ingredient Relationship"""
     cocktail = models.ForeignKey(Cocktail, on_delete=models.CASCADE)
     ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
     amount = models.CharField(max_length=100, default="To taste")
+    volume_ml = models.FloatField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return f"{self.amount} of {self.ingredient.name} in {self.cocktail.name}"
 
+    def save(self, *args, **kwargs):
+        """Saves the entry with its amount parsed into millilitres (None if it isn't a volume)."""
+        self.volume_ml = parse_amount(self.amount)
+        super().save(*args, **kwargs)
+
+
+class SimilarCocktail(models.Model):
+    """Precomputed neighbour of a cocktail by shared ingredients, see similarity.py"""
+    cocktail = models.ForeignKey(Cocktail, on_delete=models.CASCADE)
+    similar = models.ForeignKey(Cocktail, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()  # Jaccard similarity of the ingredient sets
+    rank = models.PositiveSmallIntegerField()  # 0 for the most similar
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["cocktail", "rank"], name="unique_similar_rank"),
+        ]
+
+    def __str__(self):
+        return f"{self.similar.name} is similar to {self.cocktail.name}"
+
+
+class Recommendation(models.Model):
+    """Precomputed cocktail suggestion for a user, see recommendations.py"""
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE)
+    cocktail = models.ForeignKey(Cocktail, on_delete=models.CASCADE)
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()  # 0 for the best suggestion
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["profile", "rank"], name="unique_recommendation_rank"),
+        ]
+
+    def __str__(self):
+        return f"{self.cocktail.name} for {self.profile.user.username}"
+
 
 class UserFavoriteList(models.Model):
     """User's Favorite Cocktail List Model"""
@@ -107,6 +195,12 @@ class UserCocktailList(models.Model):
     """Junction Table for User Favorite Cocktails"""
     user_list = models.ForeignKey(UserFavoriteList, on_delete=models.CASCADE)
     cocktail = models.ForeignKey(Cocktail, on_delete=models.CASCADE)
+    added_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user_list", "cocktail"], name="unique_favorite_cocktail"),
+        ]
 
     def __str__(self):
         return f"{self.cocktail.name} in {self.user_list.owner.user.username}'s Favorites"
@@ -117,6 +211,7 @@ class BartenderCocktailList(models.Model):
     name = models.CharField(max_length=100)
     owner = models.ForeignKey(Profile, on_delete=models.CASCADE)
     is_public = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.owner.user.username}'s {self.name}"
@@ -126,6 +221,12 @@ class BartenderCocktailListCocktail(models.Model):
     """Junction Table for Bartender's Cocktail Lists"""
     bartender_list = models.ForeignKey(BartenderCocktailList, on_delete=models.CASCADE)
     cocktail = models.ForeignKey(Cocktail, on_delete=models.CASCADE)
+    added_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["bartender_list", "cocktail"], name="unique_list_cocktail"),
+        ]
 
     def __str__(self):
         return f"{self.cocktail.name} in {self.bartender_list.owner.user.username}'s {self.bartender_list.name}"
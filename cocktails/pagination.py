@@ -0,0 +1,164 @@
+"""
+Keyset (cursor) pagination.
+
+Instead of COUNT(*) plus LIMIT/OFFSET, each page continues from the sort key of the last row of
+the previous page (`WHERE (name, id) > (last_name, last_id)`), so deep pages cost the same as
+the first one and rows don't shift between pages while the table changes. Cursors are opaque
+base64 strings; counts are optional and capped.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    """The cursor does not fit the paginated data (e.g. it was edited by hand)."""
+
+
+def encode_cursor(key, backwards=False):
+    payload = json.dumps({"k": list(key), "b": backwards}, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    :return: (key tuple, backwards flag), or (None, False) for a missing or malformed cursor
+    """
+    if not cursor:
+        return None, False
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return tuple(payload["k"]), bool(payload["b"])
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        return None, False
+
+
+class QuerySetKeyset:
+    """
+    Keyset source over a queryset.
+    :param ordering: field names (`-` prefix for descending, `__` to follow relations).
+        Together they must be unique and non-null, so end with a unique field such as "id".
+    """
+
+    def __init__(self, queryset, ordering):
+        self.queryset = queryset
+        self.ordering = ordering
+
+    def _key(self, obj):
+        key = []
+        for field in self.ordering:
+            value = obj
+            for attr in field.lstrip("-").split("__"):
+                value = getattr(value, attr)
+            key.append(value)
+        return tuple(key)
+
+    def _after(self, key, backwards):
+        """Q object selecting the rows that come after `key` (before it when going backwards)."""
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, key):
+            name = field.lstrip("-")
+            descending = field.startswith("-") != backwards
+            condition |= Q(**equal, **{f"{name}__{'lt' if descending else 'gt'}": value})
+            equal[name] = value
+        return condition
+
+    def fetch(self, after, backwards, limit):
+        """
+        :return: up to `limit` (key, object) pairs following `after` in the walking direction
+        :raises InvalidCursor: if `after` does not match the ordering fields
+        """
+        ordering = [
+            field[1:] if field.startswith("-") else f"-{field}" for field in self.ordering
+        ] if backwards else list(self.ordering)
+        queryset = self.queryset.order_by(*ordering)
+        if after is not None:
+            if len(after) != len(self.ordering):
+                raise InvalidCursor
+            try:
+                queryset = queryset.filter(self._after(after, backwards))
+            except (ValueError, TypeError, ValidationError):
+                raise InvalidCursor
+        return [(self._key(obj), obj) for obj in queryset[:limit]]
+
+    def count(self, cap):
+        """Number of rows, counting at most `cap + 1` of them."""
+        return self.queryset.order_by()[:cap + 1].count()
+
+
+class KeysetPage:
+    """One page of a KeysetPaginator, iterable like a Django Page."""
+
+    def __init__(self, object_list, next_cursor, previous_cursor, count=None, count_is_exact=True):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+        self.count_is_exact = count_is_exact
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Cursor-based paginator.
+    :param source: a queryset (paired with `ordering`) or any object with
+        `fetch(after, backwards, limit)` and `count(cap)` methods like QuerySetKeyset
+    :param per_page: rows per page
+    :param ordering: sort key fields for a queryset source, default ("name", "id")
+    :param count_cap: if set, pages carry a row count that stops at this number
+    """
+
+    def __init__(self, source, per_page, ordering=("name", "id"), count_cap=None):
+        if hasattr(source, "model"):
+            source = QuerySetKeyset(source, ordering)
+        self.source = source
+        self.per_page = per_page
+        self.count_cap = count_cap
+
+    def get_page(self, cursor=None):
+        after, backwards = decode_cursor(cursor)
+        try:
+            rows = self.source.fetch(after, backwards, self.per_page + 1)
+        except InvalidCursor:
+            after, backwards = None, False
+            rows = self.source.fetch(after, backwards, self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or backwards:
+                next_cursor = encode_cursor(rows[-1][0])
+            if after is not None and (has_more or not backwards):
+                previous_cursor = encode_cursor(rows[0][0], backwards=True)
+
+        count = count_is_exact = None
+        if self.count_cap is not None:
+            count = self.source.count(self.count_cap)
+            count_is_exact = count <= self.count_cap
+            count = min(count, self.count_cap)
+
+        return KeysetPage([obj for _, obj in rows], next_cursor, previous_cursor, count, count_is_exact)
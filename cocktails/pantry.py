@@ -0,0 +1,176 @@
+"""
+"What can I make?" matcher.
+
+Every cocktail's ingredient set is kept in memory as a bitset (a Python int, one bit per
+ingredient), so checking a bar's stock against the whole catalogue is a loop of AND/popcount
+operations instead of ORM joins. The index is built lazily on first use and refreshed per
+cocktail by the signal receivers whenever CocktailIngredient rows change, once the change commits.
+Each process keeps its own copy, tagged with a version token in the shared cache: every change
+(the receivers, import_cocktails) replaces the token, and the other processes reload their copy
+when they see it changed.
+"""
+import threading
+
+from django.db import transaction
+
+from .caching import bump_version, version
+from .models import Cocktail, CocktailIngredient, Ingredient
+
+VERSION_KEY = "cocktails:pantry-index-version"
+
+MAX_MISSING = 2
+RESULT_LIMIT = 100
+
+
+class PantryIndex:
+    """Ingredient bitsets per cocktail."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._masks = {}  # cocktail id -> bitset of ingredient bits
+        self._sizes = {}  # cocktail id -> number of distinct ingredients
+        self._bits = {}  # ingredient id -> bit position
+        self._ingredient_ids = []  # bit position -> ingredient id
+        self._version = None  # version token the index was loaded at
+
+    def _bit(self, ingredient_id):
+        bit = self._bits.get(ingredient_id)
+        if bit is None:
+            bit = self._bits[ingredient_id] = len(self._ingredient_ids)
+            self._ingredient_ids.append(ingredient_id)
+        return bit
+
+    def _set(self, cocktail_id, mask):
+        if mask:
+            self._masks[cocktail_id] = mask
+            self._sizes[cocktail_id] = mask.bit_count()
+        else:
+            self._masks.pop(cocktail_id, None)
+            self._sizes.pop(cocktail_id, None)
+
+    def _reset(self):
+        self._loaded = False
+        self._masks, self._sizes, self._bits, self._ingredient_ids = {}, {}, {}, []
+
+    def _ensure_loaded(self):
+        current = version(VERSION_KEY)
+        if self._loaded and self._version == current:
+            return
+        self._reset()
+        self._version = current
+        masks = {}
+        rows = CocktailIngredient.objects.values_list("cocktail_id", "ingredient_id").order_by()
+        for cocktail_id, ingredient_id in rows.iterator(chunk_size=5000):
+            masks[cocktail_id] = masks.get(cocktail_id, 0) | (1 << self._bit(ingredient_id))
+        for cocktail_id, mask in masks.items():
+            self._set(cocktail_id, mask)
+        self._loaded = True
+
+    def _bump(self):
+        """
+        Tell the other processes the index changed.
+        :return: whether this process' copy was up to date before, so it can be patched in place
+        """
+        up_to_date = self._loaded and self._version == version(VERSION_KEY)
+        token = bump_version(VERSION_KEY)
+        self._version = token if up_to_date else None
+        return up_to_date
+
+    def refresh_cocktails(self, cocktail_ids):
+        """
+        Re-read the ingredients of the given cocktails once the current transaction commits, right
+        away outside of one (no-op until the index is first used). Rolled back changes never reach
+        the index, and the other processes only reload once they can see the committed rows.
+        """
+        cocktail_ids = list(cocktail_ids)
+        transaction.on_commit(lambda: self._refresh(cocktail_ids))
+
+    def remove_cocktails(self, cocktail_ids):
+        """Drop the given cocktails once the current transaction commits, right away outside of one."""
+        cocktail_ids = list(cocktail_ids)
+        transaction.on_commit(lambda: self._remove(cocktail_ids))
+
+    def _refresh(self, cocktail_ids):
+        with self._lock:
+            if not self._bump():
+                return
+            cocktail_ids = set(cocktail_ids)
+            masks = dict.fromkeys(cocktail_ids, 0)
+            rows = CocktailIngredient.objects.filter(cocktail_id__in=cocktail_ids).values_list(
+                "cocktail_id", "ingredient_id")
+            for cocktail_id, ingredient_id in rows:
+                masks[cocktail_id] |= 1 << self._bit(ingredient_id)
+            for cocktail_id, mask in masks.items():
+                self._set(cocktail_id, mask)
+
+    def _remove(self, cocktail_ids):
+        with self._lock:
+            if not self._bump():
+                return
+            for cocktail_id in cocktail_ids:
+                self._set(cocktail_id, 0)
+
+    def clear(self):
+        """Forget everything, the index is rebuilt on next use in every process."""
+        with self._lock:
+            self._reset()
+            bump_version(VERSION_KEY)
+
+    def match(self, ingredient_ids, max_missing=MAX_MISSING, limit=None):
+        """
+        Find the cocktails that can be made from the given ingredients.
+        :param ingredient_ids: ids of the ingredients in stock
+        :param max_missing: also return cocktails missing up to this many ingredients
+        :param limit: maximum number of results, None for all
+        :return: list of (cocktail id, list of missing ingredient ids), fewest missing first
+        """
+        with self._lock:
+            self._ensure_loaded()
+            stock = 0
+            for ingredient_id in ingredient_ids:
+                bit = self._bits.get(ingredient_id)
+                if bit is not None:
+                    stock |= 1 << bit
+
+            sizes = self._sizes
+            matches = []
+            for cocktail_id, mask in self._masks.items():
+                missing_count = sizes[cocktail_id] - (mask & stock).bit_count()
+                if missing_count <= max_missing:
+                    matches.append((missing_count, cocktail_id, mask & ~stock))
+            matches.sort(key=lambda match: match[:2])
+
+            result = []
+            for _, cocktail_id, missing in matches[:limit]:
+                missing_ids = []
+                while missing:
+                    low_bit = missing & -missing
+                    missing_ids.append(self._ingredient_ids[low_bit.bit_length() - 1])
+                    missing ^= low_bit
+                result.append((cocktail_id, missing_ids))
+        return result
+
+
+index = PantryIndex()
+
+
+def find_makeable(ingredient_ids, max_missing=MAX_MISSING, limit=RESULT_LIMIT):
+    """
+    Cocktails that can be made from the given ingredients, plus near misses.
+    :param ingredient_ids: ids of the ingredients in stock
+    :param max_missing: how many missing ingredients still count as a near miss
+    :param limit: maximum number of results
+    :return: list of {"cocktail": Cocktail, "missing": [Ingredient, ...]}, fewest missing first
+    """
+    matches = index.match(ingredient_ids, max_missing, limit)
+    cocktails = Cocktail.objects.in_bulk([cocktail_id for cocktail_id, _ in matches])
+    ingredients = Ingredient.objects.in_bulk({i for _, missing in matches for i in missing})
+    return [
+        {
+            "cocktail": cocktails[cocktail_id],
+            "missing": sorted((ingredients[i] for i in missing if i in ingredients), key=lambda i: i.name),
+        }
+        for cocktail_id, missing in matches
+        if cocktail_id in cocktails
+    ]
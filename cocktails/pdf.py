@@ -0,0 +1,250 @@
+"""
+PDF rendering for cocktails.
+
+Rendered PDFs are cached on disk in COCKTAILS_PDF_CACHE_DIR as `<cocktail id>-<version>.pdf`,
+where the version is derived from `Cocktail.updated_at`, which the signal receivers move whenever
+the cocktail, its ingredients or its category change. Unchanged cocktails are served straight from
+the cache without another query; the receivers also delete the stale files.
+
+Whole lists are rendered as a booklet: a table of contents followed by one page per cocktail,
+and their prep sheets as a table of ingredient totals.
+"""
+import hashlib
+import math
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Prefetch
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from .models import CocktailIngredient
+
+# Bump when the page layout changes, so previously cached files are not served anymore
+LAYOUT_VERSION = 1
+
+TOC_ENTRIES_PER_PAGE = 35
+BOOKLET_CHUNK_SIZE = 200
+
+
+def draw_cocktail(p, cocktail, ingredients):
+    """
+    Draw one cocktail on the current page of a reportlab canvas.
+    :param p: reportlab canvas
+    :param cocktail: Cocktail (with its category loaded)
+    :param ingredients: iterable of CocktailIngredient with their ingredient loaded
+    """
+    width, height = letter
+    y_position = height - 50
+
+    # Title
+    p.setFont("Helvetica-Bold", 18)
+    p.drawString(50, y_position, f"Cocktail: {cocktail.name}")
+    y_position -= 30
+
+    # Category & Alcoholic Status
+    p.setFont("Helvetica", 12)
+    p.drawString(50, y_position, f"Category: {cocktail.category.name if cocktail.category else 'Not Assigned'}")
+    y_position -= 20
+
+    alcohol_status = "Yes" if cocktail.is_alcoholic else "No"
+    p.drawString(50, y_position, f"Alcoholic: {alcohol_status}")
+    y_position -= 20
+
+    # Add Classic/Customized Status
+    cocktail_type = "Classic" if cocktail.is_classic else "Customized"
+    p.drawString(50, y_position, f"Type: {cocktail_type}")
+    y_position -= 30
+
+    # Ingredients
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(50, y_position, "Ingredients:")
+    y_position -= 20
+    p.setFont("Helvetica", 12)
+
+    for ingredient_entry in ingredients:
+        p.drawString(60, y_position, f"- {ingredient_entry.ingredient.name}: {ingredient_entry.amount}")
+        y_position -= 20
+
+    # Instructions
+    y_position -= 20
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(50, y_position, "Instructions:")
+    y_position -= 20
+    p.setFont("Helvetica", 12)
+    p.drawString(60, y_position, cocktail.instructions)
+
+
+def pdf_version(cocktail):
+    """Version of the cocktail's PDF, changing with the layout and the cocktail's updated_at."""
+    key = f"{LAYOUT_VERSION}:{cocktail.updated_at.isoformat()}"
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def _cache_dir():
+    path = Path(settings.COCKTAILS_PDF_CACHE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def open_cocktail_pdf(cocktail):
+    """
+    Open the cached PDF of a cocktail, rendering it first if needed.
+    :param cocktail: Cocktail (with its category loaded)
+    :return: (open binary file, version)
+    """
+    version = pdf_version(cocktail)
+    cache_dir = _cache_dir()
+    path = cache_dir / f"{cocktail.id}-{version}.pdf"
+
+    try:
+        return open(path, "rb"), version
+    except FileNotFoundError:
+        pass
+
+    ingredients = CocktailIngredient.objects.filter(cocktail=cocktail).select_related("ingredient").order_by("id")
+
+    # Render into a temporary file and move it in place, so readers never see a partial PDF
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            p = canvas.Canvas(tmp_file, pagesize=letter)
+            draw_cocktail(p, cocktail, ingredients)
+            p.showPage()
+            p.save()
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return open(path, "rb"), version
+
+
+def invalidate_cocktail_pdfs(cocktail_ids):
+    """Delete the cached PDFs of the given cocktails."""
+    cache_dir = Path(settings.COCKTAILS_PDF_CACHE_DIR)
+    if not cache_dir.is_dir():
+        return
+    for cocktail_id in set(cocktail_ids):
+        for path in cache_dir.glob(f"{cocktail_id}-*.pdf"):
+            try:
+                path.unlink()
+            except OSError:
+                pass  # already removed, or still open for download on Windows
+
+
+def _draw_toc_page(p, title, entries, first_number, first_cocktail_page):
+    """Draw one table of contents page, each entry linking to the cocktail's page."""
+    width, height = letter
+    y_position = height - 50
+
+    p.setFont("Helvetica-Bold", 18)
+    p.drawString(50, y_position, title)
+    y_position -= 30
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(50, y_position, "Contents")
+    y_position -= 25
+
+    p.setFont("Helvetica", 12)
+    for number, name in enumerate(entries, start=first_number):
+        page_number = first_cocktail_page + number
+        p.drawString(60, y_position, name)
+        p.drawRightString(width - 50, y_position, str(page_number))
+        p.linkRect("", f"cocktail-{number}", (50, y_position - 4, width - 50, y_position + 12), relative=0)
+        y_position -= 18
+
+
+def render_booklet(title, cocktails, out):
+    """
+    Render several cocktails as one PDF: table of contents first, then a page per cocktail.
+    Cocktails are fetched in chunks, so the query count only grows with the chunk count
+    and only one chunk of rows is held in memory at a time.
+    :param title: booklet title, printed on the contents pages
+    :param cocktails: ordered Cocktail queryset
+    :param out: writable binary file the PDF goes to
+    """
+    names = list(cocktails.values_list("name", flat=True))
+    toc_pages = max(1, math.ceil(len(names) / TOC_ENTRIES_PER_PAGE))
+
+    p = canvas.Canvas(out, pagesize=letter)
+    p.setTitle(title)
+    for start in range(0, toc_pages * TOC_ENTRIES_PER_PAGE, TOC_ENTRIES_PER_PAGE):
+        _draw_toc_page(p, title, names[start:start + TOC_ENTRIES_PER_PAGE], start, toc_pages + 1)
+        p.showPage()
+
+    ingredients = CocktailIngredient.objects.select_related("ingredient").order_by("id")
+    cocktails = cocktails.select_related("category").prefetch_related(
+        Prefetch("cocktailingredient_set", queryset=ingredients, to_attr="pdf_ingredients")
+    )
+    width, _ = letter
+    for number, cocktail in enumerate(cocktails.iterator(chunk_size=BOOKLET_CHUNK_SIZE)):
+        key = f"cocktail-{number}"
+        p.bookmarkPage(key)
+        p.addOutlineEntry(cocktail.name, key, level=0)
+        draw_cocktail(p, cocktail, cocktail.pdf_ingredients)
+        p.setFont("Helvetica", 9)
+        p.drawCentredString(width / 2, 30, str(toc_pages + 1 + number))
+        p.showPage()
+    p.save()
+
+
+def open_booklet(title, cocktails):
+    """
+    Render a booklet into a temporary file (spilled to disk, not kept in memory).
+    :return: open binary file positioned at the start, removed from disk once closed
+    """
+    out = tempfile.TemporaryFile()
+    try:
+        render_booklet(title, cocktails, out)
+    except BaseException:
+        out.close()
+        raise
+    out.seek(0)
+    return out
+
+
+def render_prep_sheet(title, rows, total_serves, out):
+    """
+    Render the ingredient totals of a list (see prep.ingredient_totals) as a PDF table.
+    :param title: list name, printed on every page
+    :param rows: ingredient total dicts
+    :param total_serves: number of drinks the totals are for
+    :param out: writable binary file the PDF goes to
+    """
+    width, height = letter
+    p = canvas.Canvas(out, pagesize=letter)
+    p.setTitle(f"Prep sheet: {title}")
+
+    def start_page():
+        y_position = height - 50
+        p.setFont("Helvetica-Bold", 18)
+        p.drawString(50, y_position, f"Prep sheet: {title}")
+        y_position -= 22
+        p.setFont("Helvetica", 11)
+        p.drawString(50, y_position, f"For {total_serves} serves")
+        y_position -= 28
+        p.setFont("Helvetica-Bold", 11)
+        for x, heading in ((50, "Ingredient"), (260, "Type")):
+            p.drawString(x, y_position, heading)
+        for x, heading in ((420, "ml"), (480, "oz"), (width - 50, "Unmeasured")):
+            p.drawRightString(x, y_position, heading)
+        p.line(50, y_position - 5, width - 50, y_position - 5)
+        p.setFont("Helvetica", 11)
+        return y_position - 20
+
+    y_position = start_page()
+    for row in rows:
+        if y_position < 50:
+            p.showPage()
+            y_position = start_page()
+        p.drawString(50, y_position, row["ingredient"][:34])
+        p.drawString(260, y_position, row["type"][:24])
+        if row["total_ml"] is not None:
+            p.drawRightString(420, y_position, f"{row['total_ml']:g}")
+            p.drawRightString(480, y_position, f"{row['total_oz']:g}")
+        if row["unmeasured_serves"]:
+            p.drawRightString(width - 50, y_position, f"{row['unmeasured_serves']} serves")
+        y_position -= 18
+    p.showPage()
+    p.save()
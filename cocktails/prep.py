@@ -0,0 +1,80 @@
+"""
+Prep sheets: how much of each ingredient a bartender list needs for a shift.
+
+The totals come from one grouped query over `CocktailIngredient.volume_ml` (the amounts already
+normalized to millilitres, see amounts.py), with the number of serves of each cocktail applied
+through a CASE expression. Cocktails with the same number of serves share one WHEN branch, so the
+query stays small for lists with hundreds of drinks. Amounts that aren't volumes ("1 slice",
+"To taste") can't be added up; they are counted as serves instead.
+"""
+import csv
+from collections import defaultdict
+
+from django.db.models import Case, Count, F, FloatField, IntegerField, Sum, Value, When
+
+from .amounts import OUNCE_ML
+from .models import CocktailIngredient
+
+MAX_SERVES = 10_000
+CSV_COLUMNS = ("ingredient", "type", "total_ml", "total_oz", "unmeasured_serves", "cocktails")
+
+
+def _serves_expression(serves, default_serves):
+    """CASE expression giving the number of serves of the cocktail of a CocktailIngredient row."""
+    cocktails_by_serves = defaultdict(list)
+    for cocktail_id, count in serves.items():
+        if count != default_serves:
+            cocktails_by_serves[count].append(cocktail_id)
+    return Case(
+        *[When(cocktail_id__in=cocktail_ids, then=Value(count)) for count, cocktail_ids in cocktails_by_serves.items()],
+        default=Value(default_serves), output_field=IntegerField(),
+    )
+
+
+def ingredient_totals(bartender_list, serves=None, default_serves=1):
+    """
+    Total quantity of each ingredient needed to make every cocktail of a list.
+    :param bartender_list: BartenderCocktailList
+    :param serves: {cocktail id: number of serves} for cocktails not made `default_serves` times
+    :param default_serves: number of serves of the other cocktails
+    :return: list of dicts with the ingredient name and type, total_ml, total_oz (None when no
+        amount of the ingredient is a volume), unmeasured_serves and the number of cocktails using it,
+        ordered by type and name
+    """
+    serves = serves or {}
+    entries = CocktailIngredient.objects.filter(cocktail__bartendercocktaillistcocktail__bartender_list=bartender_list)
+    skipped = [cocktail_id for cocktail_id, count in serves.items() if count == 0]
+    if default_serves == 0:
+        entries = entries.filter(cocktail_id__in=[cocktail_id for cocktail_id, count in serves.items() if count])
+    elif skipped:
+        entries = entries.exclude(cocktail_id__in=skipped)
+
+    multiplier = _serves_expression(serves, default_serves)
+    rows = (
+        entries.values("ingredient_id", "ingredient__name", "ingredient__type")
+        .annotate(
+            total_ml=Sum(F("volume_ml") * multiplier, output_field=FloatField()),
+            unmeasured_serves=Sum(Case(When(volume_ml__isnull=True, then=multiplier), default=Value(0))),
+            cocktails=Count("cocktail_id", distinct=True),
+        )
+        .order_by("ingredient__type", "ingredient__name")
+    )
+    return [
+        {
+            "ingredient": row["ingredient__name"],
+            "type": row["ingredient__type"],
+            "total_ml": round(row["total_ml"], 1) if row["total_ml"] is not None else None,
+            "total_oz": round(row["total_ml"] / OUNCE_ML, 1) if row["total_ml"] is not None else None,
+            "unmeasured_serves": row["unmeasured_serves"],
+            "cocktails": row["cocktails"],
+        }
+        for row in rows
+    ]
+
+
+def write_csv(rows, out):
+    """Write ingredient totals as CSV with a header line to a text file."""
+    writer = csv.writer(out)
+    writer.writerow(CSV_COLUMNS)
+    for row in rows:
+        writer.writerow(["" if row[column] is None else row[column] for column in CSV_COLUMNS])
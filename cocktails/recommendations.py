@@ -0,0 +1,125 @@
+"""
+Personalized cocktail recommendations.
+
+Item-item collaborative filtering over the favorites: two cocktails are similar when the same
+users saved them (cosine similarity of their columns in the sparse user x cocktail matrix), and
+a user's candidates are scored by summing the similarities to everything in their favorites.
+The matrix is held as dicts of sets, which is sparse by construction. Suggestions only include
+classic cocktails matching the user's preferred drink type; users with too few signals are
+topped up with the most popular cocktails.
+
+The work runs in batch (`build_recommendations` command) and the TOP_N results per user are
+stored in Recommendation, so the "Recommended for you" page is a single query.
+"""
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+from .models import Cocktail, Profile, Recommendation, UserCocktailList
+
+TOP_N = 12
+NEIGHBOURS = 50  # most similar cocktails kept per cocktail
+MAX_FAVORITES = 500  # favorites of one user counted in the co-occurrences, bounds the pair count
+BATCH_SIZE = 5000
+
+
+def _eligible_cocktails():
+    """:return: {preferred_drink_type: set of classic cocktail ids to suggest}"""
+    alcoholic, non_alcoholic = set(), set()
+    rows = Cocktail.objects.filter(is_classic=True).values_list("id", "alcoholic_strength", "category__is_alcoholic")
+    for cocktail_id, strength, category_alcoholic in rows.iterator():
+        # Same rule as Cocktail.is_alcoholic
+        if strength != "None" and category_alcoholic:
+            alcoholic.add(cocktail_id)
+        else:
+            non_alcoholic.add(cocktail_id)
+    return {"Alcoholic": alcoholic, "Non-Alcoholic": non_alcoholic, "Both": alcoholic | non_alcoholic}
+
+
+def _similar_items(favorites):
+    """
+    :param favorites: {profile id: set of cocktail ids}
+    :return: {cocktail id: [(similarity, cocktail id)]}, the NEIGHBOURS most similar of each cocktail
+    """
+    counts = Counter()
+    co_occurrences = defaultdict(Counter)
+    for cocktail_ids in favorites.values():
+        cocktail_ids = sorted(cocktail_ids)[:MAX_FAVORITES]
+        counts.update(cocktail_ids)
+        for position, cocktail_id in enumerate(cocktail_ids):
+            for other_id in cocktail_ids[position + 1:]:
+                co_occurrences[cocktail_id][other_id] += 1
+                co_occurrences[other_id][cocktail_id] += 1
+
+    return {
+        cocktail_id: heapq.nlargest(NEIGHBOURS, (
+            (together / math.sqrt(counts[cocktail_id] * counts[other_id]), other_id)
+            for other_id, together in others.items()
+        ))
+        for cocktail_id, others in co_occurrences.items()
+    }
+
+
+def recommend(favorites, similar, popular, eligible, limit=TOP_N):
+    """
+    Top suggestions for one user.
+    :param favorites: set of the user's favorite cocktail ids
+    :param similar: result of _similar_items
+    :param popular: cocktail ids, most favorited first
+    :param eligible: set of the cocktail ids that may be suggested
+    :return: list of (score, cocktail id), best first
+    """
+    scores = defaultdict(float)
+    for cocktail_id in favorites:
+        for similarity, other_id in similar.get(cocktail_id, ()):
+            if other_id in eligible and other_id not in favorites:
+                scores[other_id] += similarity
+    top = heapq.nlargest(limit, ((score, cocktail_id) for cocktail_id, score in scores.items()))
+
+    # Not enough signal (new users, rare tastes): fill up with the most popular cocktails
+    suggested = {cocktail_id for _, cocktail_id in top}
+    for cocktail_id in popular:
+        if len(top) >= limit:
+            break
+        if cocktail_id in eligible and cocktail_id not in favorites and cocktail_id not in suggested:
+            top.append((0.0, cocktail_id))
+    return top
+
+
+def build(limit=TOP_N, log=print):
+    """
+    Recompute the recommendations of every user and replace the stored ones in one transaction.
+    :return: number of stored recommendations
+    """
+    favorites = defaultdict(set)
+    rows = UserCocktailList.objects.values_list("user_list__owner_id", "cocktail_id").order_by()
+    for profile_id, cocktail_id in rows.iterator(chunk_size=BATCH_SIZE):
+        favorites[profile_id].add(cocktail_id)
+    log(f"{sum(map(len, favorites.values()))} favorites of {len(favorites)} users")
+
+    similar = _similar_items(favorites)
+    popularity = Counter(cocktail_id for cocktail_ids in favorites.values() for cocktail_id in cocktail_ids)
+    eligible = _eligible_cocktails()
+    # Popular first, then the rest of the catalogue by id, so even an empty favorites table gives suggestions
+    popular = [cocktail_id for cocktail_id, _ in popularity.most_common()]
+    popular += sorted(eligible["Both"] - popularity.keys())
+
+    stored = 0
+    with transaction.atomic():
+        Recommendation.objects.all().delete()
+        batch = []
+        profiles = Profile.objects.values_list("id", "preferred_drink_type").order_by("id")
+        for profile_id, drink_type in profiles.iterator(chunk_size=BATCH_SIZE):
+            top = recommend(favorites.get(profile_id, set()), similar, popular,
+                            eligible.get(drink_type, eligible["Both"]), limit)
+            batch += [
+                Recommendation(profile_id=profile_id, cocktail_id=cocktail_id, score=round(score, 4), rank=rank)
+                for rank, (score, cocktail_id) in enumerate(top)
+            ]
+            if len(batch) >= BATCH_SIZE:
+                stored += len(Recommendation.objects.bulk_create(batch))
+                batch = []
+        stored += len(Recommendation.objects.bulk_create(batch))
+    return stored
@@ -0,0 +1,78 @@
+"""
+User roles.
+
+A role is the name of an auth group ("bartender", "user"). Roles are resolved once per request
+by RolesMiddleware (as `request.roles`) and cached in the session, so views and templates don't
+query the groups table again and again. The session copy is tied to a per-user version kept in
+the cache, which the signal receivers bump when the user's group membership changes.
+"""
+import time
+import uuid
+from functools import wraps
+
+from django.contrib import messages
+from django.core.cache import cache
+from django.shortcuts import redirect
+
+BARTENDER = "bartender"
+USER = "user"
+
+SESSION_KEY = "_cocktails_roles"
+# Re-read the groups at least this often, in case a version bump was missed (e.g. with a per-process cache)
+MAX_AGE = 300
+
+
+def _version_key(user_id):
+    return f"cocktails:roles-version:{user_id}"
+
+
+def invalidate_roles(user_ids):
+    """Make the cached roles of the given users stale."""
+    cache.set_many({_version_key(user_id): uuid.uuid4().hex for user_id in user_ids}, None)
+
+
+def get_roles(request):
+    """
+    Names of the groups the request's user belongs to.
+    :return: frozenset, empty for anonymous users
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return frozenset()
+
+    version = cache.get(_version_key(user.pk), "")
+    cached = request.session.get(SESSION_KEY)
+    if (cached and cached["user"] == user.pk and cached["version"] == version
+            and time.time() - cached["time"] < MAX_AGE):
+        return frozenset(cached["roles"])
+
+    roles = frozenset(user.groups.values_list("name", flat=True))
+    request.session[SESSION_KEY] = {
+        "user": user.pk, "version": version, "time": time.time(), "roles": sorted(roles),
+    }
+    return roles
+
+
+def request_roles(request):
+    """`request.roles` if RolesMiddleware is installed, otherwise resolve them now."""
+    roles = getattr(request, "roles", None)
+    return get_roles(request) if roles is None else roles
+
+
+def bartender_required(view_func=None, message="You must be a bartender to access this page."):
+    """
+    View decorator letting only bartenders through; everybody else is redirected to the
+    cocktail list with an error message. Can be used bare or with a custom message:
+
+        @bartender_required(message="You must be a bartender to create a list.")
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if BARTENDER not in request_roles(request):
+                messages.error(request, message)
+                return redirect("cocktail-list")
+            return view(request, *args, **kwargs)
+        return wrapper
+
+    return decorator(view_func) if view_func else decorator
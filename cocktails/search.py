@@ -0,0 +1,151 @@
+"""
+Full-text search over the cocktail catalogue.
+
+On SQLite the index is an FTS5 virtual table (created by migration 0004) holding one row per
+cocktail, with rowid == cocktail id. It covers name, category, glass type, instructions and
+ingredient names, and is kept up to date by the receivers in signals.py. Other database
+backends fall back to plain icontains lookups.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Cocktail
+from .pagination import InvalidCursor
+
+FTS_TABLE = "cocktails_cocktail_fts"
+
+# bm25() weights for the indexed columns: name, category, glass_type, instructions, ingredients
+COLUMN_WEIGHTS = (10.0, 4.0, 2.0, 1.0, 5.0)
+
+# How many ids go into a single IN (...) clause when (re)indexing
+INDEX_BATCH_SIZE = 500
+
+_TERM_RE = re.compile(r"\w+")
+
+_DOCUMENT_SQL = f"""
+    INSERT INTO {FTS_TABLE} (rowid, name, category, glass_type, instructions, ingredients)
+    SELECT c.id, c.name, cat.name, c.glass_type, c.instructions,
+           COALESCE((SELECT group_concat(i.name, ' ')
+                     FROM cocktails_cocktailingredient ci
+                     JOIN cocktails_ingredient i ON i.id = ci.ingredient_id
+                     WHERE ci.cocktail_id = c.id), '')
+    FROM cocktails_cocktail c
+    JOIN cocktails_cocktailcategory cat ON cat.id = c.category_id
+"""
+
+
+def fts_enabled():
+    """The FTS5 index only exists on SQLite."""
+    return connection.vendor == "sqlite"
+
+
+def build_match_expression(query_text):
+    """
+    Turn free text into an FTS5 MATCH expression.
+    Every word has to match (implicit AND) and is treated as a prefix, so "marg" finds "Margarita".
+    :param query_text: raw text typed by the user
+    :return: str, empty if the text has no searchable words
+    """
+    terms = _TERM_RE.findall(query_text.lower())
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def index_cocktails(cocktail_ids):
+    """
+    (Re)index the given cocktails. Ids of cocktails that no longer exist are just removed.
+    """
+    if not fts_enabled():
+        return
+    cocktail_ids = sorted(set(cocktail_ids))
+    with connection.cursor() as cursor:
+        for start in range(0, len(cocktail_ids), INDEX_BATCH_SIZE):
+            batch = cocktail_ids[start:start + INDEX_BATCH_SIZE]
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", batch)
+            cursor.execute(f"{_DOCUMENT_SQL} WHERE c.id IN ({placeholders})", batch)
+
+
+def remove_cocktails(cocktail_ids):
+    """Drop the given cocktails from the index."""
+    if not fts_enabled():
+        return
+    cocktail_ids = sorted(set(cocktail_ids))
+    with connection.cursor() as cursor:
+        for start in range(0, len(cocktail_ids), INDEX_BATCH_SIZE):
+            batch = cocktail_ids[start:start + INDEX_BATCH_SIZE]
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", batch)
+
+
+def rebuild_index():
+    """Rebuild the whole index with one set-based statement."""
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(_DOCUMENT_SQL)
+
+
+class SearchResults:
+    """
+    Relevance-ranked FTS5 results, paged by KeysetPaginator on (bm25 rank, cocktail id).
+    Fetching a page is one query for the ids plus one query to load the page's cocktails.
+    """
+
+    def __init__(self, match_expression):
+        self.match_expression = match_expression
+
+    def fetch(self, after, backwards, limit):
+        weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS)
+        direction, comparison = ("DESC", "<") if backwards else ("ASC", ">")
+        sql = (
+            f"SELECT id, rank FROM (SELECT rowid AS id, bm25({FTS_TABLE}, {weights}) AS rank "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)"
+        )
+        params = [self.match_expression]
+        if after is not None:
+            if len(after) != 2:
+                raise InvalidCursor
+            sql += f" WHERE rank {comparison} %s OR (rank = %s AND id {comparison} %s)"
+            params += [after[0], after[0], after[1]]
+        sql += f" ORDER BY rank {direction}, id {direction} LIMIT %s"
+        params.append(limit)
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            keys = cursor.fetchall()
+        cocktails = Cocktail.objects.select_related("category").in_bulk([cocktail_id for cocktail_id, _ in keys])
+        return [((rank, cocktail_id), cocktails[cocktail_id]) for cocktail_id, rank in keys if cocktail_id in cocktails]
+
+    def count(self, cap):
+        """Number of matches, counting at most `cap + 1` of them."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM (SELECT 1 FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT %s)",
+                [self.match_expression, cap + 1],
+            )
+            return cursor.fetchone()[0]
+
+
+def search_catalogue(query_text):
+    """
+    Search cocktails by name, category, glass type, instructions and ingredient names.
+    :param query_text: raw text typed by the user
+    :return: relevance-ranked SearchResults on SQLite, a queryset elsewhere;
+        either can be paged with pagination.KeysetPaginator
+    """
+    if fts_enabled():
+        match_expression = build_match_expression(query_text)
+        if not match_expression:
+            return Cocktail.objects.none()
+        return SearchResults(match_expression)
+
+    return Cocktail.objects.filter(
+        Q(name__icontains=query_text) |
+        Q(category__name__icontains=query_text) |
+        Q(glass_type__icontains=query_text) |
+        Q(instructions__icontains=query_text) |
+        Q(cocktailingredient__ingredient__name__icontains=query_text)
+    ).select_related("category").distinct()
@@ -1,9 +1,149 @@
-from django.db.models.signals import post_save
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
 from django.dispatch import receiver
-from .models import Profile, User
+from django.utils import timezone
+from .models import Profile, User, Cocktail, CocktailIngredient, CocktailCategory, Ingredient, \
+    BartenderCocktailList, BartenderCocktailListCocktail, SimilarCocktail
+from . import search, pantry, similarity, lineage, autocomplete
+from .amounts import recompute_strength
+from .pdf import invalidate_cocktail_pdfs
+from .roles import invalidate_roles
+from .caching import bump_catalogue_generation
+from .images import queue_image_processing
 
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def group_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear", "post_clear"):
+        return
+    if not reverse:
+        # user.groups.add(...) / remove / clear
+        if action != "pre_clear":
+            invalidate_roles([instance.pk])
+    elif action == "pre_clear":
+        # group.user_set.clear(): the members are only known before the clear
+        invalidate_roles(instance.user_set.values_list("id", flat=True))
+    elif action != "post_clear":
+        invalidate_roles(pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    invalidate_roles(instance.user_set.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=Cocktail)
+def cocktail_saved(sender, instance, **kwargs):
+    search.index_cocktails([instance.pk])
+    invalidate_cocktail_pdfs([instance.pk])
+    # Only classics are suggested as similar, so a change of is_classic moves the cocktail in or out
+    similarity.schedule_refresh([instance.pk])
+
+
+@receiver(post_save, sender=Cocktail)
+def create_image_derivatives(sender, instance, **kwargs):
+    queue_image_processing(instance.image)
+
+
+@receiver(pre_delete, sender=Cocktail)
+def remember_variants(sender, instance, **kwargs):
+    # After the delete the variants' original_cocktail is already NULL
+    instance._variant_ids = list(Cocktail.objects.filter(original_cocktail=instance).values_list("id", flat=True))
+
+
+@receiver(pre_delete, sender=Cocktail)
+def remember_similar_listings(sender, instance, **kwargs):
+    # Their SimilarCocktail rows naming this cocktail go with the delete and need refilling
+    instance._listing_ids = list(
+        SimilarCocktail.objects.filter(similar=instance).values_list("cocktail_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Cocktail)
+def cocktail_deleted(sender, instance, **kwargs):
+    search.remove_cocktails([instance.pk])
+    pantry.index.remove_cocktails([instance.pk])
+    invalidate_cocktail_pdfs([instance.pk])
+    lineage.detach(Cocktail, getattr(instance, "_variant_ids", []))
+    similarity.schedule_refresh(getattr(instance, "_listing_ids", []))
+
+
+@receiver(post_save, sender=CocktailIngredient)
+@receiver(post_delete, sender=CocktailIngredient)
+def cocktail_ingredients_changed(sender, instance, **kwargs):
+    # Exports pick up changed cocktails by updated_at, which the ingredients are part of
+    Cocktail.objects.filter(id=instance.cocktail_id).update(updated_at=timezone.now())
+    recompute_strength(Cocktail.objects.filter(id=instance.cocktail_id))
+    search.index_cocktails([instance.cocktail_id])
+    pantry.index.refresh_cocktails([instance.cocktail_id])
+    invalidate_cocktail_pdfs([instance.cocktail_id])
+    similarity.schedule_refresh([instance.cocktail_id])
+
+
+@receiver(post_save, sender=CocktailCategory)
+def category_changed(sender, instance, created, **kwargs):
+    if not created:
+        cocktail_ids = list(Cocktail.objects.filter(category=instance).values_list("id", flat=True))
+        Cocktail.objects.filter(id__in=cocktail_ids).update(updated_at=timezone.now())
+        search.index_cocktails(cocktail_ids)
+        invalidate_cocktail_pdfs(cocktail_ids)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, created, **kwargs):
+    if not created:
+        cocktail_ids = list(CocktailIngredient.objects.filter(ingredient=instance).values_list("cocktail_id", flat=True))
+        Cocktail.objects.filter(id__in=cocktail_ids).update(updated_at=timezone.now())
+        recompute_strength(Cocktail.objects.filter(id__in=cocktail_ids))
+        search.index_cocktails(cocktail_ids)
+        invalidate_cocktail_pdfs(cocktail_ids)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredients_renamed(sender, **kwargs):
+    # After the commit, or other processes could rebuild their copy from the old names and keep it
+    transaction.on_commit(autocomplete.index.clear)
+
+
+@receiver(post_save, sender=Cocktail)
+@receiver(post_delete, sender=Cocktail)
+@receiver(post_save, sender=CocktailIngredient)
+@receiver(post_delete, sender=CocktailIngredient)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=CocktailCategory)
+@receiver(post_delete, sender=CocktailCategory)
+@receiver(post_save, sender=BartenderCocktailList)
+@receiver(post_delete, sender=BartenderCocktailList)
+@receiver(post_save, sender=BartenderCocktailListCocktail)
+@receiver(post_delete, sender=BartenderCocktailListCocktail)
+def catalogue_changed(sender, **kwargs):
+    # After the commit: a request reading the old rows after an earlier bump would cache them
+    # under the new generation
+    transaction.on_commit(bump_catalogue_generation)
+
+
+@receiver(pre_save, sender=User)
+def remember_username_change(sender, instance, update_fields=None, **kwargs):
+    # Public lists show their owner's username. Every login saves last_login, which must not
+    # throw the page cache away, so only a changed username counts.
+    instance._username_changed = False
+    if instance.pk is None or (update_fields is not None and "username" not in update_fields):
+        return
+    stored = User.objects.filter(pk=instance.pk).values_list("username", flat=True).first()
+    instance._username_changed = stored is not None and stored != instance.username
+
+
+@receiver(post_save, sender=User)
+def username_changed(sender, instance, **kwargs):
+    if getattr(instance, "_username_changed", False):
+        transaction.on_commit(bump_catalogue_generation)
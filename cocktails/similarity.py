@@ -0,0 +1,207 @@
+"""
+Similar cocktails by shared ingredients.
+
+The similarity of two cocktails is the Jaccard index of their ingredient sets. The TOP_K most
+similar classic cocktails of every cocktail are stored in SimilarCocktail, so the detail page
+reads them with one indexed lookup.
+
+Candidates come from an inverted index (ingredient -> classic cocktails) with prefix filtering:
+two cocktails at least MIN_SCORE similar share one of the `size - ceil(MIN_SCORE * size) + 1`
+rarest ingredients of either of them, so only the cocktails containing those are compared, never
+the whole catalogue. `rebuild` recomputes everything in memory; `refresh_cocktails` updates the
+neighbours of changed cocktails, and of the cocktails they are (or now become) neighbours of,
+reading only the rows it needs. The signal receivers go through `schedule_refresh`, which runs
+one refresh per committed transaction.
+"""
+import heapq
+import math
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+
+from .caching import bump_catalogue_generation
+from .models import Cocktail, CocktailIngredient, SimilarCocktail
+
+TOP_K = 6
+MIN_SCORE = 0.25
+BATCH_SIZE = 5000
+
+_pending = threading.local()
+
+
+def jaccard(ingredients, other):
+    """Jaccard index of two sets, rounded like the stored scores so fresh and stored ones compare."""
+    overlap = len(ingredients & other)
+    return round(overlap / (len(ingredients) + len(other) - overlap), 4) if overlap else 0.0
+
+
+def _order(neighbour):
+    """Sort key of (score, cocktail id): most similar first, then the older cocktail."""
+    return neighbour[0], -neighbour[1]
+
+
+def _prefix(ingredients, frequency):
+    """The rarest ingredients of a set; every cocktail at least MIN_SCORE similar contains one."""
+    ordered = sorted(ingredients, key=lambda ingredient_id: (frequency.get(ingredient_id, 0), ingredient_id))
+    return ordered[:len(ordered) - math.ceil(MIN_SCORE * len(ordered)) + 1]
+
+
+def _top(cocktail_id, candidates, sets):
+    """
+    :param candidates: ids of the classic cocktails to compare with
+    :param sets: {cocktail id: ingredient id set}, including the cocktail and its candidates
+    :return: up to TOP_K (score, cocktail id), most similar first
+    """
+    ingredients = sets[cocktail_id]
+    size = len(ingredients)
+    scored = []
+    for other_id in candidates:
+        other = sets[other_id]
+        # The Jaccard index can't exceed smaller size / larger size
+        if other_id == cocktail_id or min(size, len(other)) < MIN_SCORE * max(size, len(other)):
+            continue
+        score = jaccard(ingredients, other)
+        if score >= MIN_SCORE:
+            scored.append((score, other_id))
+    return heapq.nlargest(TOP_K, scored, key=_order)
+
+
+def _rows(cocktail_id, neighbours):
+    return [
+        SimilarCocktail(cocktail_id=cocktail_id, similar_id=similar_id, score=score, rank=rank)
+        for rank, (score, similar_id) in enumerate(neighbours)
+    ]
+
+
+def rebuild():
+    """
+    Recompute the neighbours of every cocktail, in one transaction.
+    :return: number of stored neighbours
+    """
+    sets = defaultdict(set)
+    rows = CocktailIngredient.objects.values_list("cocktail_id", "ingredient_id").order_by()
+    for cocktail_id, ingredient_id in rows.iterator(chunk_size=BATCH_SIZE):
+        sets[cocktail_id].add(ingredient_id)
+
+    postings = defaultdict(list)
+    for cocktail_id in Cocktail.objects.filter(is_classic=True).values_list("id", flat=True).iterator():
+        for ingredient_id in sets.get(cocktail_id, ()):
+            postings[ingredient_id].append(cocktail_id)
+    frequency = {ingredient_id: len(cocktail_ids) for ingredient_id, cocktail_ids in postings.items()}
+
+    stored = 0
+    with transaction.atomic():
+        SimilarCocktail.objects.all().delete()
+        batch = []
+        for cocktail_id, ingredients in sets.items():
+            candidates = {
+                other_id for ingredient_id in _prefix(ingredients, frequency) for other_id in postings[ingredient_id]
+            }
+            batch += _rows(cocktail_id, _top(cocktail_id, candidates, sets))
+            if len(batch) >= BATCH_SIZE:
+                stored += len(SimilarCocktail.objects.bulk_create(batch))
+                batch = []
+        stored += len(SimilarCocktail.objects.bulk_create(batch))
+    bump_catalogue_generation()
+    return stored
+
+
+def _ingredient_sets(cocktail_ids):
+    sets = {cocktail_id: set() for cocktail_id in cocktail_ids}
+    rows = CocktailIngredient.objects.filter(cocktail_id__in=sets).values_list("cocktail_id", "ingredient_id")
+    for cocktail_id, ingredient_id in rows.order_by():
+        sets[cocktail_id].add(ingredient_id)
+    return sets
+
+
+def _postings(ingredient_ids, classic_only):
+    """{ingredient id: cocktail ids} of the given ingredients"""
+    postings = defaultdict(set)
+    rows = CocktailIngredient.objects.filter(ingredient_id__in=ingredient_ids)
+    if classic_only:
+        rows = rows.filter(cocktail__is_classic=True)
+    for ingredient_id, cocktail_id in rows.values_list("ingredient_id", "cocktail_id").order_by():
+        postings[ingredient_id].add(cocktail_id)
+    return postings
+
+
+def refresh_cocktails(cocktail_ids):
+    """
+    Update the stored neighbours after the ingredients or the classic status of cocktails changed,
+    or after a cocktail they listed was deleted.
+    The changed cocktails and those listing one of them are recomputed; other cocktails get a
+    changed classic added to their list when it is now similar enough to make their top TOP_K.
+    """
+    classic = dict(Cocktail.objects.filter(id__in=set(cocktail_ids)).values_list("id", "is_classic"))
+    if not classic:
+        return  # Deleted, their rows went with them
+    listing = set(SimilarCocktail.objects.filter(similar_id__in=classic).values_list("cocktail_id", flat=True))
+    sets = _ingredient_sets(classic.keys() | listing)
+    frequency = dict(
+        CocktailIngredient.objects.filter(ingredient_id__in=set().union(*sets.values()))
+        .values("ingredient_id").annotate(count=Count("id")).values_list("ingredient_id", "count").order_by()
+    )
+    prefixes = {cocktail_id: _prefix(ingredients, frequency) for cocktail_id, ingredients in sets.items()}
+
+    classic_postings = _postings(set().union(*prefixes.values()), classic_only=True)
+    candidates = {
+        cocktail_id: set().union(*(classic_postings[ingredient_id] for ingredient_id in prefix))
+        for cocktail_id, prefix in prefixes.items()
+    }
+    # Any cocktail containing a prefix ingredient of a changed classic may now rank it
+    changed_classics = [cocktail_id for cocktail_id, is_classic in classic.items() if is_classic]
+    prefix_ingredients = {ingredient_id for cocktail_id in changed_classics for ingredient_id in prefixes[cocktail_id]}
+    all_postings = _postings(prefix_ingredients, classic_only=False)
+    pairs = {
+        (other_id, cocktail_id)
+        for cocktail_id in changed_classics
+        for ingredient_id in prefixes[cocktail_id]
+        for other_id in all_postings[ingredient_id]
+        if other_id not in sets
+    }
+    sets.update(_ingredient_sets(
+        set().union(*candidates.values(), (other_id for other_id, _ in pairs)) - sets.keys()
+    ))
+
+    neighbours = {cocktail_id: _top(cocktail_id, candidates[cocktail_id], sets) for cocktail_id in prefixes}
+    joining = defaultdict(list)
+    for other_id, cocktail_id in pairs:
+        score = jaccard(sets[other_id], sets[cocktail_id])
+        if score >= MIN_SCORE:
+            joining[other_id].append((score, cocktail_id))
+    current = defaultdict(list)
+    for other_id, similar_id, score in SimilarCocktail.objects.filter(cocktail_id__in=joining).values_list(
+            "cocktail_id", "similar_id", "score"):
+        current[other_id].append((score, similar_id))
+    for other_id, new in joining.items():
+        top = heapq.nlargest(TOP_K, current[other_id] + new, key=_order)
+        if top != sorted(current[other_id], key=_order, reverse=True):
+            neighbours[other_id] = top
+
+    with transaction.atomic():
+        SimilarCocktail.objects.filter(cocktail_id__in=neighbours).delete()
+        SimilarCocktail.objects.bulk_create(
+            [row for cocktail_id, top in neighbours.items() for row in _rows(cocktail_id, top)], batch_size=BATCH_SIZE,
+        )
+    bump_catalogue_generation()
+
+
+def _flush():
+    cocktail_ids = getattr(_pending, "cocktail_ids", None)
+    if cocktail_ids:
+        _pending.cocktail_ids = set()
+        refresh_cocktails(cocktail_ids)
+
+
+def schedule_refresh(cocktail_ids):
+    """
+    Refresh the neighbours of the given cocktails when the current transaction commits, right away
+    outside of one. Everything changed in one transaction is refreshed together.
+    """
+    if getattr(_pending, "cocktail_ids", None) is None:
+        _pending.cocktail_ids = set()
+    _pending.cocktail_ids.update(cocktail_ids)
+    # Registered on every call, the first run after a commit takes all the pending ids
+    transaction.on_commit(_flush)
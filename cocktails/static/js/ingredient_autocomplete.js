@@ -0,0 +1,103 @@
+// Turns the ingredient <select>s of the cocktail and pantry forms into search boxes.
+// The selects only hold the chosen ingredients; suggestions come from the autocomplete endpoint
+// (URL in their data-url) and the picked one is added to the hidden select, which is submitted.
+// A multiple select shows its ingredients as removable badges and clears the box after each pick.
+document.addEventListener("DOMContentLoaded", function () {
+    document.querySelectorAll("select.ingredient-autocomplete").forEach(select => {
+        let input = document.createElement("input");
+        input.type = "search";
+        input.className = "form-control";
+        input.placeholder = "Type an ingredient…";
+        input.autocomplete = "off";
+        if (!select.multiple) {
+            input.value = select.selectedIndex > 0 ? select.options[select.selectedIndex].text : "";
+        }
+
+        let list = document.createElement("datalist");
+        list.id = `${select.id}-suggestions`;
+        input.setAttribute("list", list.id);
+
+        let chosen = document.createElement("div");
+        chosen.className = "mb-2";
+
+        select.hidden = true;
+        select.after(chosen, input, list);
+
+        let suggestions = new Map();  // name -> ingredient id
+        let timer = null;
+
+        function showChosen(option) {
+            let badge = document.createElement("span");
+            badge.className = "badge badge-secondary mr-1";
+            badge.textContent = `${option.text} `;
+            let remove = document.createElement("a");
+            remove.href = "#";
+            remove.className = "text-white";
+            remove.setAttribute("aria-label", `Remove ${option.text}`);
+            remove.textContent = "×";
+            remove.addEventListener("click", event => {
+                event.preventDefault();
+                option.remove();
+                badge.remove();
+            });
+            badge.appendChild(remove);
+            chosen.appendChild(badge);
+        }
+
+        if (select.multiple) {
+            Array.from(select.selectedOptions).forEach(showChosen);
+        }
+
+        function choose(ingredientId) {
+            let value = String(ingredientId);
+            let option = Array.from(select.options).find(option => option.value === value);
+            if (!select.multiple) {
+                if (!option) {
+                    select.appendChild(new Option(input.value, value));
+                }
+                select.value = value;
+                return;
+            }
+            if (!option) {
+                option = new Option(input.value, value, true, true);
+                select.appendChild(option);
+                showChosen(option);
+            }
+            input.value = "";
+        }
+
+        input.addEventListener("input", () => {
+            clearTimeout(timer);
+            if (suggestions.has(input.value)) {
+                choose(suggestions.get(input.value));
+                return;
+            }
+            if (!select.multiple) {
+                select.value = "";  // What was typed isn't an ingredient (yet)
+            }
+            if (!input.value.trim()) {
+                return;
+            }
+            timer = setTimeout(() => {
+                fetch(`${select.getAttribute("data-url")}?q=${encodeURIComponent(input.value)}`)
+                .then(response => response.json())
+                .then(data => {
+                    if (!data.success) {
+                        return;
+                    }
+                    suggestions.clear();
+                    list.replaceChildren();
+                    data.ingredients.forEach(ingredient => {
+                        suggestions.set(ingredient.name, ingredient.id);
+                        let option = document.createElement("option");
+                        option.value = ingredient.name;
+                        list.appendChild(option);
+                    });
+                    if (suggestions.has(input.value)) {
+                        choose(suggestions.get(input.value));
+                    }
+                });
+            }, 200);
+        });
+    });
+});
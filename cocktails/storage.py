@@ -0,0 +1,131 @@
+"""
+Content-addressed media files.
+
+Uploaded images are stored as `<upload_to>/<sha256 of the content><extension>`. Uploading bytes
+that are already stored doesn't write anything: the row gets the existing name, so identical
+uploads (a customized cocktail keeping the classic's photo, the same picture uploaded twice) share
+one file and one URL, which downstream caches then only fetch once.
+
+The hashing happens in the field file rather than in the storage backend: images.py writes the
+derivatives under fixed names through the same storage. Thumbnailed profile pictures are saved
+through the field again, so they get a name of their own and the original is never rewritten.
+"""
+import hashlib
+import os
+import posixpath
+
+from django.db.models.fields.files import ImageField, ImageFieldFile
+from django.utils import timezone
+
+from .images import DERIVATIVE_WIDTHS, derivative_name
+
+
+def content_hash(content):
+    """SHA-256 hex digest of a file, read in chunks; the file is rewound afterwards."""
+    digest = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks() if hasattr(content, "chunks") else iter(lambda: content.read(64 * 1024), b""):
+        digest.update(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def content_name(name, content):
+    """File name `<hash><extension>` of an upload, the extension taken from its original name."""
+    _, extension = os.path.splitext(name)
+    return f"{content_hash(content)}{extension.lower()}"
+
+
+def walk(storage, directory):
+    """Storage names of all files below a directory."""
+    if not storage.exists(directory):
+        return
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield posixpath.join(directory, name)
+    for subdirectory in directories:
+        yield from walk(storage, posixpath.join(directory, subdirectory))
+
+
+class ContentAddressedFieldFile(ImageFieldFile):
+    def save(self, name, content, save=True):
+        name = content_name(name, content)
+        stored = self.field.generate_filename(self.instance, name)
+        if not self.storage.exists(stored):
+            super().save(name, content, save)
+            return
+
+        # The same bytes are stored already: share the file
+        self.name = stored
+        setattr(self.instance, self.field.attname, self.name)
+        self._committed = True
+        if save:
+            self.instance.save()
+
+    save.alters_data = True
+
+
+class ContentAddressedImageField(ImageField):
+    """ImageField storing each distinct upload once, named by the hash of its content."""
+    attr_class = ContentAddressedFieldFile
+
+
+def _copy(storage, name, target):
+    """Store the file `name` as `target` too, unless that exists already."""
+    if not storage.exists(target):
+        with storage.open(name) as content:
+            storage.save(target, content)
+
+
+def fold_duplicates(model, field_name, dry_run=False, log=print):
+    """
+    Give the stored files of an image field their content-addressed names: duplicates collapse into
+    one file, the rows are pointed at it and the old files (derivatives included) are deleted.
+    The field default and files no row refers to are left alone; the latter are gc_catalogue's job.
+    :param dry_run: only report the renames
+    :return: (number of renamed files, bytes freed by the duplicates)
+    """
+    field = model._meta.get_field(field_name)
+    storage = field.storage
+    widths = DERIVATIVE_WIDTHS.get(f"{model._meta.label}.{field_name}", ())
+    names = (
+        model.objects.exclude(**{field_name: ""}).exclude(**{f"{field_name}__isnull": True})
+        .values_list(field_name, flat=True).distinct()
+    )
+    renamed, freed = 0, 0
+    targets = set()
+    for name in list(names):
+        if name == field.get_default() or not storage.exists(name):
+            continue
+        with storage.open(name) as content:
+            target = field.generate_filename(None, content_name(name, content))
+        if target == name:
+            targets.add(target)
+            continue
+
+        renamed += 1
+        if target in targets or storage.exists(target):
+            freed += storage.size(name)
+            log(f"{name}: duplicate of {target}")
+        else:
+            log(f"{name}: renamed to {target}")
+        targets.add(target)
+        if dry_run:
+            continue
+
+        # Copies first and deletes last, so the rows never point at a missing file
+        moves = [(name, target)] + [
+            (derivative_name(name, width), derivative_name(target, width))
+            for width in widths if storage.exists(derivative_name(name, width))
+        ]
+        for source, destination in moves:
+            _copy(storage, source, destination)
+        updates = {field_name: target}
+        if hasattr(model, "updated_at"):
+            updates["updated_at"] = timezone.now()  # Exports pick up the new image name
+        model.objects.filter(**{field_name: name}).update(**updates)
+        for source, _ in moves:
+            storage.delete(source)
+    return renamed, freed
@@ -0,0 +1,61 @@
+"""
+In-process background queue.
+
+Slow, request-independent work (image processing) is handed to a small thread pool once the
+current transaction commits, so request handlers return without waiting for it. The pool size
+comes from the COCKTAILS_BACKGROUND_WORKERS setting; 0 runs every job inline, which is handy
+for management commands and tests.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_lock = threading.Lock()
+_pending = set()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "COCKTAILS_BACKGROUND_WORKERS", 0),
+                thread_name_prefix="cocktails-worker",
+            )
+        return _executor
+
+
+def _run(func, args):
+    with _lock:
+        _pending.discard((func, args))
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Background job %s%r failed", func.__name__, args)
+    finally:
+        close_old_connections()
+
+
+def _submit(func, args):
+    if not getattr(settings, "COCKTAILS_BACKGROUND_WORKERS", 0):
+        _run(func, args)
+        return
+    with _lock:
+        if (func, args) in _pending:
+            return  # the same job is already waiting to run
+        _pending.add((func, args))
+    _get_executor().submit(_run, func, args)
+
+
+def enqueue(func, *args):
+    """
+    Run `func(*args)` in the background after the current transaction commits.
+    Arguments must be hashable; a job identical to one still waiting in the queue is dropped.
+    """
+    transaction.on_commit(lambda: _submit(func, args))
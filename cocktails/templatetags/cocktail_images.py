@@ -0,0 +1,31 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from cocktails.images import existing_derivatives
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(image, alt="", sizes="100vw", **attrs):
+    """
+    Render an image field as a <picture> with a WebP `srcset` built from its derivatives,
+    falling back to the original file. Extra keyword arguments become <img> attributes:
+
+        {% responsive_image cocktail.image alt=cocktail.name sizes="400px" class="img-fluid" %}
+    """
+    if not image:
+        return ""
+
+    img = format_html('<img src="{}" alt="{}"{}>', image.url, alt, flatatt(attrs))
+    derivatives = existing_derivatives(image)
+    if not derivatives:
+        return img
+
+    storage = image.storage
+    srcset = ", ".join(f"{storage.url(name)} {width}w" for width, name in derivatives)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">{}</picture>',
+        srcset, sizes, img,
+    )
@@ -1,3 +1,459 @@
-from django.test import TestCase
+import json
+import os
+import random
+import tempfile
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from . import lineage, search, similarity
+from .caching import cache_anonymous_page
+from .amounts import OUNCE_ML, parse_amount
+from .pagination import KeysetPaginator, encode_cursor
+from .models import Cocktail, CocktailCategory, CocktailIngredient, Ingredient, SimilarCocktail
+
+
+class ParseAmountTests(SimpleTestCase):
+    """Amounts as they appear in imported recipes and the millilitres they parse to."""
+
+    CASES = [
+        # Units
+        ("30 ml", 30),
+        ("30ml", 30),
+        ("3 cl", 30),
+        ("2 oz", round(2 * OUNCE_ML, 2)),
+        ("1 fl oz", OUNCE_ML),
+        ("2 tsp", 10),
+        ("1 bar spoon", 5),
+        ("dash", 0.9),
+        ("2 dashes", 1.8),
+        ("1,5 oz", round(1.5 * OUNCE_ML, 2)),
+        # Fractions
+        ("1 1/2 oz", round(1.5 * OUNCE_ML, 2)),
+        ("3/4 oz", round(0.75 * OUNCE_ML, 2)),
+        ("½ cup", 120),
+        ("1½ oz", round(1.5 * OUNCE_ML, 2)),
+        ("half cup", 120),
+        # Ranges give their middle
+        ("1-2 oz", round(1.5 * OUNCE_ML, 2)),
+        ("1 to 2 oz", round(1.5 * OUNCE_ML, 2)),
+        # Not volumes
+        ("Top up", None),
+        ("To taste", None),
+        ("2 slices", None),
+        ("1 lime", None),
+        ("", None),
+        (None, None),
+        ("1/0 oz", None),
+    ]
+
+    def test_parse_amount(self):
+        for amount, expected in self.CASES:
+            with self.subTest(amount=amount):
+                self.assertEqual(parse_amount(amount), expected)
+
+
+class SimilarCocktailRefreshTests(TestCase):
+    """The incremental refresh run by the signal receivers must store what a full rebuild would."""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(7)
+        category = CocktailCategory.objects.create(name="Cocktail")
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"Ingredient {i}", type="Other") for i in range(12)
+        )
+        cocktails = Cocktail.objects.bulk_create(
+            Cocktail(name=f"Cocktail {i}", category=category, instructions="", glass_type="", is_classic=i % 4 != 0)
+            for i in range(40)
+        )
+        CocktailIngredient.objects.bulk_create(
+            CocktailIngredient(cocktail=cocktail, ingredient=ingredient, amount="1 oz")
+            for cocktail in cocktails
+            for ingredient in rng.sample(ingredients, rng.randint(2, 5))
+        )
+        similarity.rebuild()
+
+    def assertMatchesRebuild(self):
+        stored = set(SimilarCocktail.objects.values_list("cocktail_id", "similar_id", "score", "rank"))
+        similarity.rebuild()
+        rebuilt = set(SimilarCocktail.objects.values_list("cocktail_id", "similar_id", "score", "rank"))
+        self.assertEqual(stored, rebuilt)
+
+    def test_delete_classic(self):
+        listed = SimilarCocktail.objects.values("similar_id").order_by("similar_id").first()["similar_id"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Cocktail.objects.get(id=listed).delete()
+        self.assertMatchesRebuild()
+
+    def test_change_ingredients(self):
+        cocktail = Cocktail.objects.filter(is_classic=True).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            cocktail.cocktailingredient_set.first().delete()
+            CocktailIngredient.objects.create(cocktail=cocktail, ingredient=Ingredient.objects.last(), amount="1 oz")
+        self.assertMatchesRebuild()
+
+    def test_toggle_classic(self):
+        classic = Cocktail.objects.filter(is_classic=True).first()
+        custom = Cocktail.objects.filter(is_classic=False).first()
+        for cocktail in (classic, custom):
+            cocktail.is_classic = not cocktail.is_classic
+            with self.captureOnCommitCallbacks(execute=True):
+                cocktail.save()
+        self.assertMatchesRebuild()
+
+
+class SearchTests(TestCase):
+    """Full-text search: bm25 ranking on SQLite, icontains lookups on other backends."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CocktailCategory.objects.create(name="Sour")
+        lime = Ingredient.objects.create(name="Lime juice", type="Juice")
+        cls.in_name = Cocktail.objects.create(name="Lime Rickey", category=category, instructions="Build.",
+                                              glass_type="Highball")
+        cls.in_ingredients = Cocktail.objects.create(name="Gimlet", category=category, instructions="Shake.",
+                                                     glass_type="Coupe")
+        CocktailIngredient.objects.create(cocktail=cls.in_ingredients, ingredient=lime, amount="1 oz")
+        cls.in_instructions = Cocktail.objects.create(name="Daiquiri", category=category,
+                                                      instructions="Shake, garnish with a lime wheel.",
+                                                      glass_type="Coupe")
+        Cocktail.objects.create(name="Negroni", category=category, instructions="Stir.", glass_type="Rocks")
+
+    def test_bm25_ordering(self):
+        page = KeysetPaginator(search.search_catalogue("lime"), 10).get_page()
+        self.assertEqual(list(page), [self.in_name, self.in_ingredients, self.in_instructions])
+
+    def test_prefix_match(self):
+        page = KeysetPaginator(search.search_catalogue("daiq"), 10).get_page()
+        self.assertEqual(list(page), [self.in_instructions])
+
+    def test_paging_ranked_results(self):
+        paginator = KeysetPaginator(search.search_catalogue("lime"), 2)
+        first = paginator.get_page()
+        second = paginator.get_page(first.next_cursor)
+        self.assertEqual(list(second), [self.in_instructions])
+        self.assertEqual(list(paginator.get_page(second.previous_cursor)), list(first))
+
+    def test_fallback_on_other_backends(self):
+        with mock.patch.object(search, "fts_enabled", return_value=False):
+            results = search.search_catalogue("lime")
+            self.assertFalse(isinstance(results, search.SearchResults))
+            self.assertEqual(set(results), {self.in_name, self.in_ingredients, self.in_instructions})
+
+    def test_no_searchable_words(self):
+        self.assertEqual(list(search.search_catalogue("?!")), [])
+
+
+class KeysetPaginatorTests(TestCase):
+    """Cursor paging over a queryset ordered by (name, id)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CocktailCategory.objects.create(name="Cocktail")
+        # Duplicate names, so the id has to break the ties
+        Cocktail.objects.bulk_create(
+            Cocktail(name=f"Cocktail {i // 2:02}", category=category, instructions="", glass_type="")
+            for i in range(25)
+        )
+        cls.ordered = list(Cocktail.objects.order_by("name", "id"))
+
+    def test_forward_and_backward(self):
+        paginator = KeysetPaginator(Cocktail.objects.all(), 10)
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual([cocktail for page in pages for cocktail in page], self.ordered)
+        self.assertFalse(pages[0].has_previous())
+
+        previous = paginator.get_page(pages[2].previous_cursor)
+        self.assertEqual(list(previous), list(pages[1]))
+        self.assertEqual(list(paginator.get_page(previous.previous_cursor)), list(pages[0]))
+        self.assertEqual(list(paginator.get_page(previous.next_cursor)), list(pages[2]))
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        paginator = KeysetPaginator(Cocktail.objects.all(), 10)
+        first = list(paginator.get_page())
+        for cursor in ("not a cursor", encode_cursor(("Cocktail 03",)), encode_cursor(("Cocktail 03", "x"))):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(list(paginator.get_page(cursor)), first)
+
+    def test_count_cap(self):
+        capped = KeysetPaginator(Cocktail.objects.all(), 10, count_cap=20).get_page()
+        self.assertEqual((capped.count, capped.count_is_exact), (20, False))
+        exact = KeysetPaginator(Cocktail.objects.all(), 10, count_cap=100).get_page()
+        self.assertEqual((exact.count, exact.count_is_exact), (25, True))
+        self.assertIsNone(KeysetPaginator(Cocktail.objects.all(), 10).get_page().count)
+
+
+class PageCacheTests(TestCase):
+    """Pages and fragments cached per catalogue generation must go stale with the catalogue."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CocktailCategory.objects.create(name="Sour")
+        cls.cocktail = Cocktail.objects.create(name="Daiquiri", category=category, instructions="Shake.",
+                                               glass_type="Coupe", is_classic=True)
+        cls.rum = Ingredient.objects.create(name="White rum", type="Spirit")
+        CocktailIngredient.objects.create(cocktail=cls.cocktail, ingredient=cls.rum, amount="2 oz")
+        cls.user = User.objects.create_user("guest", password="guest-password")
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def view(self, status=200, cookie=False):
+        @cache_anonymous_page
+        def view(request):
+            self.calls += 1
+            response = HttpResponse(f"call {self.calls}", status=status)
+            if cookie:
+                response.set_cookie("seen", "1")
+            return response
+        return view
+
+    def request(self, user=None, messages=()):
+        request = RequestFactory().get("/page/?q=1")
+        request.user = user or AnonymousUser()
+        request._messages = list(messages)
+        return request
+
+    def test_anonymous_get_is_cached(self):
+        view = self.view()
+        self.assertEqual(view(self.request()).content, b"call 1")
+        self.assertEqual(view(self.request()).content, b"call 1")
+        self.assertEqual(self.calls, 1)
+
+    def test_never_cached(self):
+        cases = {
+            "authenticated": (self.view(), {"user": self.user}),
+            "pending messages": (self.view(), {"messages": ["Saved."]}),
+            "not found": (self.view(status=404), {}),
+            "sets a cookie": (self.view(cookie=True), {}),
+        }
+        for case, (view, request_kwargs) in cases.items():
+            with self.subTest(case):
+                self.calls = 0
+                view(self.request(**request_kwargs))
+                view(self.request(**request_kwargs))
+                self.assertEqual(self.calls, 2)
+
+    def test_cocktail_save_invalidates_page(self):
+        url = reverse("cocktail-list")
+        self.assertContains(self.client.get(url), "Daiquiri")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cocktail.name = "Hemingway Daiquiri"
+            self.cocktail.save()
+        self.assertContains(self.client.get(url), "Hemingway Daiquiri")
+
+    def test_ingredient_rename_invalidates_fragment(self):
+        self.client.force_login(self.user)
+        url = reverse("cocktail-detail", args=[self.cocktail.id])
+        self.assertContains(self.client.get(url), "White rum")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rum.name = "Light rum"
+            self.rum.save()
+        response = self.client.get(url)
+        self.assertContains(response, "Light rum")
+        self.assertNotContains(response, "White rum")
+
+
+class ApiTests(TestCase):
+    """Catalogue API: sparse fieldsets, cursor paging and conditional requests."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CocktailCategory.objects.create(name="Sour")
+        lime = Ingredient.objects.create(name="Lime juice", type="Juice")
+        cls.cocktails = [
+            Cocktail.objects.create(name=name, category=category, instructions="Shake.", glass_type="Coupe")
+            for name in ("Margarita", "Daiquiri", "Gimlet", "Sidecar", "Aviation")
+        ]
+        CocktailIngredient.objects.create(cocktail=cls.cocktails[0], ingredient=lime, amount="1 oz")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_sparse_fieldsets(self):
+        url = reverse("api-cocktail-detail", args=[self.cocktails[0].id])
+        data = self.client.get(url, {"fields": "name,ingredients"}).json()
+        self.assertEqual(data["cocktail"], {
+            "name": "Margarita", "ingredients": [{"id": Ingredient.objects.get().id, "name": "Lime juice",
+                                                  "amount": "1 oz"}],
+        })
+        response = self.client.get(url, {"fields": "name,secret"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()["success"])
+
+    def test_cursor_paging(self):
+        url = reverse("api-cocktail-list")
+        first = self.client.get(url, {"fields": "name", "limit": 2}).json()
+        self.assertEqual([cocktail["name"] for cocktail in first["cocktails"]], ["Aviation", "Daiquiri"])
+        self.assertIsNone(first["previous"])
+        second = self.client.get(first["next"]).json()
+        self.assertEqual([cocktail["name"] for cocktail in second["cocktails"]], ["Gimlet", "Margarita"])
+        third = self.client.get(second["next"]).json()
+        self.assertEqual([cocktail["name"] for cocktail in third["cocktails"]], ["Sidecar"])
+        self.assertIsNone(third["next"])
+        self.assertEqual(self.client.get(third["previous"]).json()["cocktails"], second["cocktails"])
+
+    def test_matching_etag_returns_not_modified(self):
+        url = reverse("api-cocktail-list")
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_catalogue_write_changes_etag(self):
+        url = reverse("api-cocktail-list")
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cocktails[1].name = "Hemingway Daiquiri"
+            self.cocktails[1].save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_errors_carry_no_etag(self):
+        for url in (reverse("api-cocktail-detail", args=[0]), reverse("api-cocktail-list") + "?limit=x"):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn(response.status_code, (400, 404))
+                self.assertFalse(response.has_header("ETag"))
+
+
+class ImportCocktailsTests(TestCase):
+    """import_cocktails: chunked inserts, checkpoints and re-runs that don't duplicate anything."""
+
+    RECORDS = [
+        {"name": "Margarita", "category": "Sour", "ingredients": [
+            {"name": "Tequila", "amount": "2 oz"}, {"name": "Lime juice", "type": "Juice", "amount": "1 oz"},
+        ]},
+        {"name": "Daiquiri", "category": "Sour", "ingredients": [{"name": "Rum", "amount": "2 oz"}]},
+        {"name": "Negroni", "category": "Stirred", "ingredients": ["Gin", "Campari", "Sweet vermouth"]},
+        {"name": "Margarita", "category": "Frozen", "ingredients": [{"name": "tequila", "amount": "2 oz"}]},
+        {"name": "", "category": "Sour"},
+    ]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "cocktails.ndjson")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(record) + "\n" for record in self.RECORDS)
+        self.checkpoint = f"{self.path}.checkpoint"
+        Ingredient.objects.create(name="Tequila", type="Spirit", is_spirit=True, alcohol_percentage=40)
+
+    def run_import(self, path=None, **options):
+        call_command("import_cocktails", path or self.path, chunk_size=2, stdout=StringIO(), stderr=StringIO(),
+                     **options)
+
+    def assertImported(self):
+        self.assertEqual(
+            sorted(Cocktail.objects.values_list("name", "category__name")),
+            [("Daiquiri", "Sour"), ("Margarita", "Frozen"), ("Margarita", "Sour"), ("Negroni", "Stirred")],
+        )
+        self.assertEqual(Ingredient.objects.count(), 6)
+        self.assertEqual(CocktailIngredient.objects.count(), 7)
+
+    def test_import(self):
+        self.run_import()
+        self.assertImported()
+        self.assertFalse(os.path.exists(self.checkpoint))
+        margarita = Cocktail.objects.get(name="Margarita", category__name="Sour")
+        self.assertAlmostEqual(margarita.total_volume_ml, 3 * OUNCE_ML, places=1)
+        self.assertAlmostEqual(margarita.estimated_abv, 40 * 2 / 3, places=1)
+
+    def test_rerun_does_not_duplicate(self):
+        self.run_import()
+        self.run_import()
+        self.assertImported()
+
+    def test_resume_after_checkpoint(self):
+        # The first chunk committed but the run died before its checkpoint was written
+        self.run_import()
+        Cocktail.objects.exclude(name="Margarita", category__name="Sour").exclude(name="Daiquiri").delete()
+        with open(self.checkpoint, "w") as f:
+            json.dump({"records": 0}, f)
+        self.run_import()
+        self.assertImported()
+
+    def test_checkpoint_skips_records(self):
+        with open(self.checkpoint, "w") as f:
+            json.dump({"records": 2}, f)
+        self.run_import()
+        self.assertEqual(
+            sorted(Cocktail.objects.values_list("name", "category__name")),
+            [("Margarita", "Frozen"), ("Negroni", "Stirred")],
+        )
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_csv(self):
+        path = os.path.join(os.path.dirname(self.path), "cocktails.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            f.write("name,category,ingredients\n"
+                    "Margarita,Sour,Tequila: 2 oz|Lime juice: 1 oz\n"
+                    "Paloma,Highball,Tequila: 2 oz|Grapefruit soda\n")
+        self.run_import(path)
+        self.run_import(path)
+        self.assertEqual(Cocktail.objects.count(), 2)
+        self.assertEqual(Ingredient.objects.filter(name__iexact="tequila").count(), 1)
+        self.assertEqual(CocktailIngredient.objects.count(), 4)
+
+
+class LineageTests(TestCase):
+    """Variant trees: the recursive ancestor and subtree queries, and detaching a deleted original."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = CocktailCategory.objects.create(name="Sour")
+        # classic > house > spicy > smoky, and house > frozen
+        cls.classic = cls.create("Margarita", is_classic=True)
+        cls.house = cls.create("House Margarita", cls.classic)
+        cls.spicy = cls.create("Spicy Margarita", cls.house)
+        cls.smoky = cls.create("Smoky Spicy Margarita", cls.spicy)
+        cls.frozen = cls.create("Frozen Margarita", cls.house)
+
+    @classmethod
+    def create(cls, name, original=None, is_classic=False):
+        return Cocktail.objects.create(name=name, category=cls.category, instructions="", glass_type="",
+                                       original_cocktail=original, is_classic=is_classic)
+
+    def placement(self, cocktail):
+        cocktail.refresh_from_db()
+        return cocktail.lineage_root_id, cocktail.lineage_depth
+
+    def test_ancestors(self):
+        self.assertEqual(lineage.ancestors(self.smoky), [self.classic, self.house, self.spicy])
+        self.assertEqual(lineage.ancestors(self.classic), [])
+
+    def test_variants(self):
+        variants = lineage.variants(self.classic)
+        self.assertEqual(
+            [(variant, variant.variant_depth) for variant in variants],
+            [(self.house, 1), (self.frozen, 2), (self.spicy, 2), (self.smoky, 3)],
+        )
+        self.assertEqual({variant.variant_count for variant in variants}, {4})
+        limited = lineage.variants(self.classic, limit=2)
+        self.assertEqual(limited, [self.house, self.frozen])
+        self.assertEqual(limited[0].variant_count, 4)
+
+    def test_stored_placement(self):
+        self.assertEqual(self.placement(self.classic), (None, 0))
+        self.assertEqual(self.placement(self.smoky), (self.classic.id, 3))
+
+    def test_detach_middle_node(self):
+        self.house.delete()
+        self.assertEqual(self.placement(self.spicy), (None, 0))
+        self.assertEqual(self.placement(self.frozen), (None, 0))
+        self.assertEqual(self.placement(self.smoky), (self.spicy.id, 1))
+        self.assertEqual(lineage.ancestors(self.smoky), [self.spicy])
+        self.assertEqual(lineage.variants(self.classic), [])
+        self.assertEqual([cocktail for cocktail, _ in lineage.tree(self.smoky)], [self.spicy, self.smoky])
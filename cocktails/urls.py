@@ -1,13 +1,15 @@
 from django.urls import path
-from . import views
+from . import views, api
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('carousel/slides/', views.carousel_slides, name='carousel-slides'),
     path('coctails/search/', views.search_cocktails, name='search'),
     path('register/', views.register_user, name='register'),
     path('profile/', views.get_user_profile, name='user-profile'),
     path('cocktails/', views.cocktail_list, name='cocktail-list'),
     path('cocktails/<int:cocktail_id>/', views.cocktail_detail, name='cocktail-detail'),
+    path('cocktails/<int:cocktail_id>/variants/', views.cocktail_variants, name='cocktail-variants'),
     path("bartender/lists/", views.bartender_lists, name="bartender-lists"),
     path("bartender/lists/create/", views.create_bartender_list, name="create-bartender-list"),
     path("bartender/lists/<int:list_id>/add-cocktail/", views.add_cocktail_to_list, name="add-cocktail-to-list"),
@@ -16,10 +18,27 @@ urlpatterns = [
     path("cocktails/customize/<int:cocktail_id>/", views.customize_cocktail, name="customize-cocktail"),
     path("cocktails/create/", views.create_cocktail, name="create-cocktail"),
     path("public-lists/", views.public_lists, name="public-lists"),
+    path("public-lists/<int:list_id>/cocktails/", views.public_list_cocktails, name="public-list-cocktails"),
     path("favorites/", views.user_favorite_list, name="user-favorite-list"),
     path("favorites/add/<int:cocktail_id>/", views.add_to_favorites, name="add-to-favorites"),
     path("favorites/remove/<int:cocktail_id>/", views.remove_from_favorites, name="remove-from-favorites"),
+    path("favorites/export-pdf/", views.export_favorites_pdf, name="export-favorites-pdf"),
+    path("recommendations/", views.recommended_cocktails, name="recommendations"),
     path("bartender/lists/<int:list_id>/toggle-visibility/", views.toggle_list_visibility, name="toggle-list-visibility"),
     path("bartender/lists/<int:list_id>/delete/", views.delete_list, name="delete-list"),
+    path("bartender/lists/<int:list_id>/export-pdf/", views.export_list_pdf, name="export-list-pdf"),
+    path("bartender/lists/<int:list_id>/prep-sheet/", views.prep_sheet, name="prep-sheet"),
     path("cocktails/<int:cocktail_id>/export-pdf/", views.export_cocktail_pdf, name="export-cocktail-pdf"),
+    path("pantry/", views.pantry, name="pantry"),
+    path("api/pantry/", views.pantry_api, name="pantry-api"),
+    path("export/<str:dataset>/", views.export_dataset, name="export-dataset"),
+    path("api/cocktails/", api.cocktail_list, name="api-cocktail-list"),
+    path("api/cocktails/<int:cocktail_id>/", api.cocktail_detail, name="api-cocktail-detail"),
+    path("api/ingredients/", api.ingredient_list, name="api-ingredient-list"),
+    path("api/ingredients/autocomplete/", views.ingredient_autocomplete, name="ingredient-autocomplete"),
+    path("api/ingredients/<int:ingredient_id>/", api.ingredient_detail, name="api-ingredient-detail"),
+    path("api/categories/", api.category_list, name="api-category-list"),
+    path("api/categories/<int:category_id>/", api.category_detail, name="api-category-detail"),
+    path("api/public-lists/", api.public_list_list, name="api-public-list-list"),
+    path("api/public-lists/<int:list_id>/", api.public_list_detail, name="api-public-list-detail"),
 ]
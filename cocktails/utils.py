@@ -8,3 +8,17 @@ def check_pasword(password):
         return True
     else:
         return False
+
+
+def duplicate_rows(model, fields):
+    """
+    Rows repeating the `fields` values of an earlier row (the one with the lowest id is kept).
+    Works with historical models too.
+    :param model: model class
+    :param fields: names of the fields that should be unique together
+    :return: queryset of the duplicate rows
+    """
+    from django.db.models import Min
+
+    keep = model.objects.values(*fields).annotate(keep_id=Min("id")).values("keep_id")
+    return model.objects.exclude(id__in=keep)
@@ -1,111 +1,296 @@
+import os
+import random
+
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, Max, Min, Prefetch, Q
 from django.contrib import messages
 from django.views.decorators.csrf import csrf_protect
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.http import JsonResponse, HttpResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse, FileResponse, Http404, StreamingHttpResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import http_date, urlencode
+from django.urls import reverse
 from django.contrib.auth.models import Group
+from django.core.paginator import Paginator
 
 from .models import Cocktail, User, BartenderCocktailList, BartenderCocktailListCocktail, CocktailIngredient, \
-    UserFavoriteList, UserCocktailList, Ingredient
+    UserFavoriteList, UserCocktailList, Ingredient, SimilarCocktail, Recommendation
 from .utils import check_pasword
+from .search import search_catalogue
+from .pagination import KeysetPaginator
+from .roles import bartender_required
+from .caching import cache_anonymous_page
+from .images import existing_derivatives
+from . import lineage
 from .forms import ProfileUpdateForm, UserUpdateForm, BartenderListForm, AddCocktailToListForm, CustomizeCocktailForm, \
-    IngredientFormSet, CreateCocktailForm
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+    IngredientFormSet, CreateCocktailForm, PantryForm, PrepSheetForm
+from .pantry import find_makeable, MAX_MISSING
+from . import autocomplete
+from .pdf import open_cocktail_pdf, open_booklet, render_prep_sheet
+from .prep import ingredient_totals, write_csv
+from .export import DATASETS, FORMATS, export_lines, parse_since
+
+
+CAROUSEL_SIZE = 8
+CAROUSEL_SLIDES_MAX_LIMIT = 12
+
+
+def _carousel_cocktails():
+    return Cocktail.objects.exclude(image="").exclude(image__isnull=True).only("id", "name", "image").order_by("id")
 
 
+def _carousel_window(size):
+    """
+    Up to `size` cocktails with an image, in id order from a random id on, wrapping around at the
+    end of the catalogue. Two indexed range queries, however many cocktails have an image.
+    """
+    cocktails = _carousel_cocktails()
+    bounds = cocktails.aggregate(first=Min("id"), last=Max("id"))
+    if bounds["first"] is None:
+        return []
+    start = random.randint(bounds["first"], bounds["last"])
+    window = list(cocktails.filter(id__gte=start)[:size])
+    if len(window) < size:
+        window += cocktails.filter(id__lt=start)[:size - len(window)]
+    return window
+
+
+@cache_anonymous_page
 def index(request):
     """
     Display the home page with a personalized message and a cocktail image carousel.
+    The slides aren't part of the page, which is cached: the carousel fetches a random window of
+    them from `carousel_slides` on load, then the following ones as it turns.
     """
-    cocktails = Cocktail.objects.exclude(image="")
+    return render(request, "index.html")
 
-    context = {
-        "cocktails": cocktails,
+
+def _carousel_slide(cocktail):
+    srcset = (f"{cocktail.image.storage.url(name)} {width}w" for width, name in existing_derivatives(cocktail.image))
+    return {
+        "id": cocktail.id,
+        "name": cocktail.name,
+        "url": reverse("cocktail-detail", args=[cocktail.id]),
+        "image": cocktail.image.url,
+        "srcset": ", ".join(srcset),
     }
-    return render(request, "index.html", context)
+
+
+def carousel_slides(request):
+    """
+    JSON endpoint returning the carousel slides after a cocktail id, in batches.
+    Pass the `next` value of a response as `after` to get the following batch; it is null at the
+    end of the catalogue, where the carousel starts over from `after=0`. With `random=1` the batch
+    starts at a random cocktail instead, which is how the carousel opens.
+    """
+    try:
+        after = int(request.GET.get("after", 0))
+        limit = int(request.GET.get("limit", CAROUSEL_SIZE))
+        limit = max(1, min(limit, CAROUSEL_SLIDES_MAX_LIMIT))
+    except ValueError:
+        return JsonResponse({"success": False, "error": "Invalid request"}, status=400)
+
+    if request.GET.get("random"):
+        cocktails = _carousel_window(limit)
+        next_after = cocktails[-1].id if cocktails else None
+    else:
+        cocktails = list(_carousel_cocktails().filter(id__gt=after)[:limit + 1])
+        next_after = cocktails[limit - 1].id if len(cocktails) > limit else None
+        cocktails = cocktails[:limit]
+
+    return JsonResponse({
+        "success": True,
+        "slides": [_carousel_slide(cocktail) for cocktail in cocktails],
+        "next": next_after,
+    })
 
 
 def search_cocktails(request):
     """
-    Search for Cocktails by name or category name.
+    Full-text search for Cocktails by name, category, glass type, instructions or ingredients.
+    Results are ranked by relevance and paged with cursors.
     """
-    query_text = request.GET.get('q', '')
+    query_text = request.GET.get('q', '').strip()
     search_results = []
 
     if query_text:
-        search_results = Cocktail.objects.filter(
-            Q(name__icontains=query_text) |
-            Q(category__name__icontains=query_text)
-        )
+        paginator = KeysetPaginator(search_catalogue(query_text), 10, count_cap=1000)
+        search_results = paginator.get_page(request.GET.get("cursor"))
 
     context = {'query_text': query_text, 'cocktails': search_results}
     return render(request, 'search_results.html', context)
 
 
+@cache_anonymous_page
 def cocktail_list(request):
     """
-    View to display all classic cocktails with pagination.
+    View to display all classic cocktails, paged with cursors.
+    Ordered by name, or strongest first with `?sort=strength`; `min_abv` and `max_abv` filter on
+    the stored estimated ABV (in percent).
     """
     cocktails = Cocktail.objects.filter(is_classic=True)  # Only show classic cocktails
-    paginator = Paginator(cocktails, 4)
-    page_number = request.GET.get("page")
-    paged_cocktails = paginator.get_page(page_number)
+    params = {}
+    for name, lookup in (("min_abv", "estimated_abv__gte"), ("max_abv", "estimated_abv__lte")):
+        value = request.GET.get(name, "").strip()
+        try:
+            cocktails = cocktails.filter(**{lookup: float(value)})
+            params[name] = value
+        except ValueError:
+            pass  # Missing or not a number, no filter
+
+    sort = "strength" if request.GET.get("sort") == "strength" else "name"
+    if sort == "strength":
+        params["sort"] = sort
+    ordering = ("-estimated_abv", "id") if sort == "strength" else ("name", "id")
+    paginator = KeysetPaginator(cocktails, 4, ordering=ordering, count_cap=1000)
+    paged_cocktails = paginator.get_page(request.GET.get("cursor"))
 
-    context = {"cocktails": paged_cocktails}
+    context = {
+        "cocktails": paged_cocktails,
+        "sort": sort,
+        "min_abv": params.get("min_abv", ""),
+        "max_abv": params.get("max_abv", ""),
+        "query": urlencode(params),
+    }
     return render(request, "cocktails/cocktail_list.html", context)
 
 
+VARIANTS_PREVIEW = 10
+
+
+@cache_anonymous_page
 def cocktail_detail(request, cocktail_id):
     """
-    View to display detailed information about a single classic cocktail.
+    View to display detailed information about a single classic cocktail,
+    with the precomputed similar cocktails and its place among the customized versions.
     """
     cocktail = get_object_or_404(Cocktail, id=cocktail_id)
+    similar_cocktails = SimilarCocktail.objects.filter(cocktail=cocktail).select_related("similar").order_by("rank")
 
     context = {
         "cocktail": cocktail,
+        "similar_cocktails": similar_cocktails,
+        # Lazy, so they are not queried when the template fragment comes from the cache
+        "ancestors": SimpleLazyObject(lambda: lineage.ancestors(cocktail)),
+        "variants": SimpleLazyObject(lambda: lineage.variants(cocktail, VARIANTS_PREVIEW)),
     }
     return render(request, "cocktails/cocktail_detail.html", context)
 
 
+VARIANT_TREE_PAGE_SIZE = 200
+
+
+@cache_anonymous_page
+def cocktail_variants(request, cocktail_id):
+    """
+    The whole tree of customized versions a cocktail belongs to, from its root classic down,
+    paginated in tree order.
+    """
+    cocktail = get_object_or_404(Cocktail, id=cocktail_id)
+    nodes = Paginator(lineage.tree(cocktail), VARIANT_TREE_PAGE_SIZE).get_page(request.GET.get("page"))
+
+    context = {"cocktail": cocktail, "nodes": nodes}
+    return render(request, "cocktails/cocktail_variants.html", context)
+
+
+PUBLIC_LISTS_PER_PAGE = 10
+PUBLIC_LIST_PREVIEW_SIZE = 5
+PUBLIC_LIST_COCKTAILS_MAX_LIMIT = 50
+
+
+@cache_anonymous_page
 def public_lists(request):
-    """Displays all publicly available cocktail lists from bartenders and users."""
-    bartender_lists = BartenderCocktailList.objects.filter(is_public=True)
+    """
+    Displays publicly available cocktail lists from bartenders, paginated.
+    Each list shows its cocktail count and a short preview of its cocktails; the rest can be
+    loaded on demand from `public_list_cocktails`. The page costs the same two queries
+    (lists, previews) no matter how many lists or cocktails there are.
+    """
+    preview_entries = BartenderCocktailListCocktail.objects.select_related("cocktail").order_by("id")
+    bartender_lists = (
+        BartenderCocktailList.objects.filter(is_public=True)
+        .select_related("owner__user")
+        .annotate(cocktail_count=Count("bartendercocktaillistcocktail"))
+        .prefetch_related(Prefetch(
+            "bartendercocktaillistcocktail_set",
+            queryset=preview_entries[:PUBLIC_LIST_PREVIEW_SIZE],
+            to_attr="preview_entries",
+        ))
+    )
+    paginator = KeysetPaginator(bartender_lists, PUBLIC_LISTS_PER_PAGE, ordering=("name", "id"))
+    paged_lists = paginator.get_page(request.GET.get("cursor"))
 
     context = {
-        "bartender_lists": bartender_lists,
+        "bartender_lists": paged_lists,
     }
     return render(request, "cocktails/public_lists.html", context)
 
 
+def public_list_cocktails(request, list_id):
+    """
+    JSON endpoint returning the cocktails of a public list in batches.
+    Pass the `next` value of a response as `after` to get the following batch.
+    """
+    bartender_list = get_object_or_404(BartenderCocktailList, id=list_id, is_public=True)
+
+    try:
+        after = int(request.GET.get("after", 0))
+        limit = int(request.GET.get("limit", PUBLIC_LIST_COCKTAILS_MAX_LIMIT))
+        limit = max(1, min(limit, PUBLIC_LIST_COCKTAILS_MAX_LIMIT))
+    except ValueError:
+        return JsonResponse({"success": False, "error": "Invalid request"}, status=400)
+
+    entries = list(
+        BartenderCocktailListCocktail.objects.filter(bartender_list=bartender_list, id__gt=after)
+        .select_related("cocktail")
+        .order_by("id")[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    return JsonResponse({
+        "success": True,
+        "cocktails": [
+            {
+                "id": entry.cocktail.id,
+                "name": entry.cocktail.name,
+                "url": reverse("cocktail-detail", args=[entry.cocktail.id]),
+            }
+            for entry in entries
+        ],
+        "next": entries[-1].id if has_more else None,
+    })
+
+
 @login_required
+@bartender_required
 def bartender_lists(request):
     """
     View to display all bartender-created lists.
     """
-    if not request.user.groups.filter(name="bartender").exists():
-        messages.error(request, "You must be a bartender to access this page.")
-        return redirect("cocktail-list")  # Redirect regular users
-
-    user_lists = BartenderCocktailList.objects.filter(owner=request.user.profile)
+    entries = BartenderCocktailListCocktail.objects.select_related("cocktail").order_by("id")
+    user_lists = (
+        BartenderCocktailList.objects.filter(owner=request.user.profile)
+        .select_related("owner__user")
+        .prefetch_related(Prefetch("bartendercocktaillistcocktail_set", queryset=entries))
+    )
+    paginator = KeysetPaginator(user_lists, 10, ordering=("name", "id"))
 
     context = {
-        "user_lists": user_lists,
+        "user_lists": paginator.get_page(request.GET.get("cursor")),
     }
     return render(request, "cocktails/bartender_lists.html", context)
 
 
 @login_required
+@bartender_required(message="You must be a bartender to create a list.")
 def create_bartender_list(request):
     """
     View for bartenders to create a new cocktail list.
     """
-    if not request.user.groups.filter(name="bartender").exists():
-        messages.error(request, "You must be a bartender to create a list.")
-        return redirect("cocktail-list")
-
     if request.method == "POST":
         form = BartenderListForm(request.POST)
         if form.is_valid():
@@ -132,8 +317,13 @@ def add_cocktail_to_list(request, list_id):
         form = AddCocktailToListForm(request.POST)
         if form.is_valid():
             selected_cocktail = form.cleaned_data["cocktail"]
-            BartenderCocktailListCocktail.objects.create(bartender_list=cocktail_list, cocktail=selected_cocktail)
-            messages.success(request, "Cocktail added successfully!")
+            _, created = BartenderCocktailListCocktail.objects.get_or_create(
+                bartender_list=cocktail_list, cocktail=selected_cocktail
+            )
+            if created:
+                messages.success(request, "Cocktail added successfully!")
+            else:
+                messages.warning(request, "This cocktail is already in the list.")
             return redirect("bartender-lists")
     else:
         form = AddCocktailToListForm()
@@ -146,31 +336,20 @@ def add_cocktail_to_list(request, list_id):
 def remove_cocktail_from_list(request, list_id, cocktail_id):
     """
     Allows bartenders to remove a cocktail from their own list.
-    If the cocktail is not in any other list and is not a classic, it gets deleted.
+    Custom cocktails left in no list are deleted later by the `gc_catalogue` job.
     """
     bartender_list = get_object_or_404(BartenderCocktailList, id=list_id, owner=request.user.profile)
-    cocktail_entry = get_object_or_404(BartenderCocktailListCocktail, bartender_list=bartender_list,
-                                       cocktail_id=cocktail_id)
-
-    cocktail = cocktail_entry.cocktail
+    cocktail_entry = get_object_or_404(BartenderCocktailListCocktail.objects.select_related("cocktail"),
+                                       bartender_list=bartender_list, cocktail_id=cocktail_id)
 
     if request.method == "POST":
         cocktail_entry.delete()
-
-        is_in_other_lists = BartenderCocktailListCocktail.objects.filter(cocktail=cocktail).exists()
-        is_in_favorites = UserCocktailList.objects.filter(cocktail=cocktail).exists()
-
-        if not cocktail.is_classic and not is_in_other_lists and not is_in_favorites:
-            cocktail.delete()
-            messages.success(request, "Cocktail removed from list and deleted permanently.")
-        else:
-            messages.success(request, "Cocktail removed from your list.")
-
+        messages.success(request, "Cocktail removed from your list.")
         return redirect("bartender-lists")
 
     context = {
         "bartender_list": bartender_list,
-        "cocktail": cocktail
+        "cocktail": cocktail_entry.cocktail
     }
     return render(request, "cocktails/remove_cocktail_confirm.html", context)
 
@@ -195,30 +374,32 @@ def customize_cocktail(request, cocktail_id):
         ingredient_formset = IngredientFormSet(request.POST)
 
         if form.is_valid() and ingredient_formset.is_valid():
-            # Create a new custom cocktail (copy of the classic one)
-            new_cocktail = form.save(commit=False)
-            new_cocktail.is_classic = False
-            new_cocktail.original_cocktail = original_cocktail
-            new_cocktail.bartender = request.user
-
-            # Ensure category is saved properly
-            new_cocktail.category = form.cleaned_data.get("category", original_cocktail.category)
+            # One transaction: no half-saved cocktail, and its similar cocktails are refreshed once on commit
+            with transaction.atomic():
+                # Create a new custom cocktail (copy of the classic one)
+                new_cocktail = form.save(commit=False)
+                new_cocktail.is_classic = False
+                new_cocktail.original_cocktail = original_cocktail
+                new_cocktail.bartender = request.user
 
-            new_cocktail.save()
+                # Ensure category is saved properly
+                new_cocktail.category = form.cleaned_data.get("category", original_cocktail.category)
 
-            # Preserve old image if no new one is uploaded
-            if not request.FILES.get("image"):
-                new_cocktail.image = old_image
                 new_cocktail.save()
 
-            # Assign the new cocktail instance to the formset before saving
-            ingredient_formset.instance = new_cocktail
-            ingredient_formset.save()
+                # Preserve old image if no new one is uploaded
+                if not request.FILES.get("image"):
+                    new_cocktail.image = old_image
+                    new_cocktail.save()
+
+                # Assign the new cocktail instance to the formset before saving
+                ingredient_formset.instance = new_cocktail
+                ingredient_formset.save()
 
-            # Add to bartender's list if selected
-            bartender_list = form.cleaned_data.get("add_to_list")
-            if bartender_list:
-                bartender_list.bartendercocktaillistcocktail_set.create(cocktail=new_cocktail)
+                # Add to bartender's list if selected
+                bartender_list = form.cleaned_data.get("add_to_list")
+                if bartender_list:
+                    bartender_list.bartendercocktaillistcocktail_set.create(cocktail=new_cocktail)
 
             messages.success(request, "Cocktail saved successfully!")
             return redirect("cocktail-detail", cocktail_id=new_cocktail.id)
@@ -231,7 +412,7 @@ def customize_cocktail(request, cocktail_id):
 
         # Pre-fill the formset with the existing ingredients from the classic cocktail
         ingredient_formset = IngredientFormSet(queryset=ingredient_queryset, initial=[
-            {"ingredient": ing.ingredient, "amount": ing.amount} for ing in ingredient_queryset
+            {"ingredient": ing.ingredient_id, "amount": ing.amount} for ing in ingredient_queryset
         ])
 
         # Create the form using the classic cocktail's data
@@ -256,19 +437,20 @@ def create_cocktail(request):
         ingredient_formset = IngredientFormSet(request.POST)
 
         if form.is_valid() and ingredient_formset.is_valid():
-            new_cocktail = form.save(commit=False)
-            new_cocktail.is_classic = False
-            new_cocktail.bartender = request.user
-            new_cocktail.save()
+            with transaction.atomic():
+                new_cocktail = form.save(commit=False)
+                new_cocktail.is_classic = False
+                new_cocktail.bartender = request.user
+                new_cocktail.save()
 
-            # Save the ingredients
-            ingredient_formset.instance = new_cocktail
-            ingredient_formset.save()
+                # Save the ingredients
+                ingredient_formset.instance = new_cocktail
+                ingredient_formset.save()
 
-            # Save to bartender's list
-            bartender_list = form.cleaned_data.get("add_to_list")
-            if bartender_list:
-                bartender_list.bartendercocktaillistcocktail_set.create(cocktail=new_cocktail)
+                # Save to bartender's list
+                bartender_list = form.cleaned_data.get("add_to_list")
+                if bartender_list:
+                    bartender_list.bartendercocktaillistcocktail_set.create(cocktail=new_cocktail)
 
             messages.success(request, "Cocktail created successfully!")
             return redirect("cocktail-detail", cocktail_id=new_cocktail.id)
@@ -318,7 +500,9 @@ def delete_list(request, list_id):
 def user_favorite_list(request):
     """View the user's favorite cocktail list"""
     favorite_list, created = UserFavoriteList.objects.get_or_create(owner=request.user.profile)
-    favorite_cocktails = UserCocktailList.objects.filter(user_list=favorite_list)
+    favorites = UserCocktailList.objects.filter(user_list=favorite_list).select_related("cocktail")
+    paginator = KeysetPaginator(favorites, 20, ordering=("cocktail__name", "id"))
+    favorite_cocktails = paginator.get_page(request.GET.get("cursor"))
 
     return render(request, "cocktails/user_favorite_list.html", {
         "favorite_list": favorite_list,
@@ -326,6 +510,26 @@ def user_favorite_list(request):
     })
 
 
+@login_required
+def recommended_cocktails(request):
+    """
+    "Recommended for you": the suggestions precomputed by the build_recommendations command,
+    read in one query. Cocktails not matching the current drink preference are left out, in case
+    it changed since the last build.
+    """
+    # Same rule as Cocktail.is_alcoholic
+    alcoholic = Q(cocktail__category__is_alcoholic=True) & ~Q(cocktail__alcoholic_strength="None")
+    recommendations = Recommendation.objects.filter(
+        Q(profile__preferred_drink_type="Alcoholic") & alcoholic
+        | Q(profile__preferred_drink_type="Non-Alcoholic") & ~alcoholic
+        | Q(profile__preferred_drink_type="Both"),
+        profile__user=request.user,
+    ).select_related("cocktail").order_by("rank")
+
+    context = {"recommendations": recommendations}
+    return render(request, "cocktails/recommendations.html", context)
+
+
 @login_required
 def add_to_favorites(request, cocktail_id):
     """Add a Classic or Public Cocktail to User's Favorite List"""
@@ -337,12 +541,12 @@ def add_to_favorites(request, cocktail_id):
         messages.error(request, "You can only add Classic Cocktails or Public Cocktails!")
         return redirect("cocktail-detail", cocktail_id=cocktail.id)
 
-    # Check if the cocktail is already in favorites
-    if UserCocktailList.objects.filter(user_list=favorite_list, cocktail=cocktail).exists():
-        messages.warning(request, "This cocktail is already in your favorites.")
-    else:
-        UserCocktailList.objects.create(user_list=favorite_list, cocktail=cocktail)
+    # A unique constraint backs this, so concurrent requests cannot add the cocktail twice
+    _, created = UserCocktailList.objects.get_or_create(user_list=favorite_list, cocktail=cocktail)
+    if created:
         messages.success(request, "Cocktail added to favorites!")
+    else:
+        messages.warning(request, "This cocktail is already in your favorites.")
 
     return redirect("cocktail-detail", cocktail_id=cocktail.id)
 
@@ -417,58 +621,198 @@ def get_user_profile(request):
 
 def export_cocktail_pdf(request, cocktail_id):
     """
-    Generates a PDF file with the cocktail's details and serves it as a downloadable file.
+    Serves the cocktail's details as a downloadable PDF file.
+    The PDF is rendered once per cocktail version and then served from the disk cache;
+    clients that already have the current version get a 304 through ETag/Last-Modified.
     """
-    cocktail = get_object_or_404(Cocktail, id=cocktail_id)
-    ingredients = CocktailIngredient.objects.filter(cocktail=cocktail)
-
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{cocktail.name}.pdf"'
-
-    # Create PDF
-    p = canvas.Canvas(response, pagesize=letter)
-    width, height = letter
-    y_position = height - 50
-
-    # Title
-    p.setFont("Helvetica-Bold", 18)
-    p.drawString(50, y_position, f"Cocktail: {cocktail.name}")
-    y_position -= 30
-
-    # Category & Alcoholic Status
-    p.setFont("Helvetica", 12)
-    p.drawString(50, y_position, f"Category: {cocktail.category.name if cocktail.category else 'Not Assigned'}")
-    y_position -= 20
-
-    alcohol_status = "Yes" if cocktail.is_alcoholic else "No"
-    p.drawString(50, y_position, f"Alcoholic: {alcohol_status}")
-    y_position -= 20
-
-    # Add Classic/Customized Status
-    cocktail_type = "Classic" if cocktail.is_classic else "Customized"
-    p.drawString(50, y_position, f"Type: {cocktail_type}")
-    y_position -= 30
-
-    # Ingredients
-    p.setFont("Helvetica-Bold", 14)
-    p.drawString(50, y_position, "Ingredients:")
-    y_position -= 20
-    p.setFont("Helvetica", 12)
-
-    for ingredient_entry in ingredients:
-        p.drawString(60, y_position, f"- {ingredient_entry.ingredient.name}: {ingredient_entry.amount}")
-        y_position -= 20
-
-    # Instructions
-    y_position -= 20
-    p.setFont("Helvetica-Bold", 14)
-    p.drawString(50, y_position, "Instructions:")
-    y_position -= 20
-    p.setFont("Helvetica", 12)
-    p.drawString(60, y_position, cocktail.instructions)
-
-    # Save PDF
-    p.showPage()
-    p.save()
+    cocktail = get_object_or_404(Cocktail.objects.select_related("category"), id=cocktail_id)
+    pdf_file, version = open_cocktail_pdf(cocktail)
+
+    etag = f'"{version}"'
+    last_modified = int(os.fstat(pdf_file.fileno()).st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = FileResponse(pdf_file, as_attachment=True, filename=f"{cocktail.name}.pdf",
+                                content_type="application/pdf")
+    else:
+        pdf_file.close()
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def export_list_pdf(request, list_id):
+    """
+    Serves a whole bartender list as one PDF booklet with a table of contents.
+    Public lists can be exported by anyone, private ones only by their owner.
+    """
+    bartender_list = get_object_or_404(BartenderCocktailList.objects.select_related("owner"), id=list_id)
+    if not bartender_list.is_public and bartender_list.owner.user_id != request.user.id:
+        raise Http404("No BartenderCocktailList matches the given query.")
+
+    cocktails = Cocktail.objects.filter(
+        bartendercocktaillistcocktail__bartender_list=bartender_list
+    ).order_by("bartendercocktaillistcocktail__id")
 
+    return FileResponse(open_booklet(bartender_list.name, cocktails), as_attachment=True,
+                        filename=f"{bartender_list.name}.pdf", content_type="application/pdf")
+
+
+PREP_SHEET_FORMATS = ("html", "csv", "pdf")
+
+
+def prep_sheet(request, list_id):
+    """
+    Total quantity of each ingredient needed for a bartender list, scaled by the number of serves
+    of each cocktail (`serves` for all of them, `serves_<cocktail id>` for single ones).
+    Rendered as a page, or downloaded with `format=csv` or `format=pdf`.
+    Public lists are open to anyone, private ones only to their owner.
+    """
+    bartender_list = get_object_or_404(BartenderCocktailList.objects.select_related("owner"), id=list_id)
+    if not bartender_list.is_public and bartender_list.owner.user_id != request.user.id:
+        raise Http404("No BartenderCocktailList matches the given query.")
+    output_format = request.GET.get("format", "html")
+    if output_format not in PREP_SHEET_FORMATS:
+        return JsonResponse(
+            {"success": False, "error": f"format must be one of {', '.join(PREP_SHEET_FORMATS)}"}, status=400,
+        )
+
+    cocktails = Cocktail.objects.filter(
+        bartendercocktaillistcocktail__bartender_list=bartender_list
+    ).order_by("bartendercocktaillistcocktail__id").only("id", "name")
+    params = request.GET.copy()
+    params.pop("format", None)
+    form = PrepSheetForm(cocktails, params or None)
+
+    rows = None
+    if not form.is_bound or form.is_valid():
+        serves = form.cocktail_serves()
+        default_serves = form.default_serves()
+        rows = ingredient_totals(bartender_list, serves, default_serves)
+        total_serves = sum(serves.get(cocktail.id, default_serves) for cocktail in cocktails)
+    elif output_format != "html":
+        return JsonResponse({"success": False, "error": form.errors}, status=400)
+
+    if output_format == "csv":
+        response = HttpResponse(content_type="text/csv")
+        response["Content-Disposition"] = f'attachment; filename="{bartender_list.name} prep.csv"'
+        write_csv(rows, response)
+        return response
+    if output_format == "pdf":
+        response = HttpResponse(content_type="application/pdf")
+        response["Content-Disposition"] = f'attachment; filename="{bartender_list.name} prep.pdf"'
+        render_prep_sheet(bartender_list.name, rows, total_serves, response)
+        return response
+
+    context = {
+        "bartender_list": bartender_list,
+        "form": form,
+        "rows": rows,
+        "total_serves": total_serves if rows is not None else None,
+        "query": params.urlencode(),
+    }
+    return render(request, "cocktails/prep_sheet.html", context)
+
+
+@login_required
+def export_favorites_pdf(request):
+    """Serves the user's favorite cocktails as one PDF booklet with a table of contents."""
+    cocktails = Cocktail.objects.filter(
+        usercocktaillist__user_list__owner=request.user.profile
+    ).order_by("usercocktaillist__id")
+
+    return FileResponse(open_booklet("Favorite Cocktails", cocktails), as_attachment=True,
+                        filename="favorite-cocktails.pdf", content_type="application/pdf")
+
+
+def pantry(request):
+    """
+    "What can I make?" page: pick the ingredients in stock and get every cocktail that can be
+    made from them, plus near misses that lack only one or two ingredients.
+    """
+    form = PantryForm(request.GET or None)
+    results = None
+
+    if form.is_valid():
+        ingredient_ids = [ingredient.id for ingredient in form.cleaned_data["ingredients"]]
+        results = find_makeable(ingredient_ids, form.cleaned_data["max_missing"])
+
+    context = {"form": form, "results": results}
+    return render(request, "cocktails/pantry.html", context)
+
+
+def pantry_api(request):
+    """
+    JSON version of the pantry matcher.
+    Takes `ingredients` (repeated or comma separated ingredient ids) and `max_missing`.
+    """
+    try:
+        ingredient_ids = {
+            int(value)
+            for param in request.GET.getlist("ingredients")
+            for value in param.split(",") if value
+        }
+        max_missing = int(request.GET.get("max_missing", 0))
+    except ValueError:
+        return JsonResponse({"success": False, "error": "Invalid request"}, status=400)
+    if not 0 <= max_missing <= MAX_MISSING:
+        return JsonResponse({"success": False, "error": f"max_missing must be 0-{MAX_MISSING}"}, status=400)
+
+    results = find_makeable(ingredient_ids, max_missing)
+
+    return JsonResponse({
+        "success": True,
+        "cocktails": [
+            {
+                "id": result["cocktail"].id,
+                "name": result["cocktail"].name,
+                "url": reverse("cocktail-detail", args=[result["cocktail"].id]),
+                "missing": [{"id": ingredient.id, "name": ingredient.name} for ingredient in result["missing"]],
+            }
+            for result in results
+        ],
+    })
+
+
+def ingredient_autocomplete(request):
+    """
+    JSON endpoint suggesting ingredients for the cocktail forms.
+    Takes `q`, the start of any word of the name, and `limit`.
+    """
+    try:
+        limit = int(request.GET.get("limit", autocomplete.SUGGESTION_LIMIT))
+        limit = max(1, min(limit, autocomplete.MAX_SUGGESTION_LIMIT))
+    except ValueError:
+        return JsonResponse({"success": False, "error": "Invalid request"}, status=400)
+
+    suggestions = autocomplete.index.suggest(request.GET.get("q", ""), limit)
+
+    return JsonResponse({
+        "success": True,
+        "ingredients": [{"id": ingredient_id, "name": name} for ingredient_id, name in suggestions],
+    })
+
+
+@staff_member_required
+def export_dataset(request, dataset):
+    """
+    Staff-only download of a whole dataset, streamed row by row as NDJSON (default) or CSV.
+    Takes `format` and an optional `since` date to only export recent changes.
+    """
+    if dataset not in DATASETS:
+        raise Http404("Unknown dataset.")
+    output_format = request.GET.get("format", "ndjson")
+    if output_format not in FORMATS:
+        return JsonResponse({"success": False, "error": f"format must be one of {', '.join(FORMATS)}"}, status=400)
+    since = None
+    if request.GET.get("since"):
+        try:
+            since = parse_since(request.GET["since"])
+        except ValueError as e:
+            return JsonResponse({"success": False, "error": str(e)}, status=400)
+
+    content_type = "text/csv" if output_format == "csv" else "application/x-ndjson"
+    response = StreamingHttpResponse(export_lines(dataset, output_format, since), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{dataset}.{output_format}"'
     return response
@@ -39,11 +39,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'cocktails.middleware.TimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'cocktails.middleware.RolesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -52,7 +54,7 @@ ROOT_URLCONF = 'mainproject.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'cocktails.instrumentation.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -61,6 +63,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'cocktails.context_processors.roles',
+                'cocktails.context_processors.catalogue',
             ],
         },
     },
@@ -78,6 +82,17 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# LocMemCache is per process; use a shared backend (Redis, Memcached) with several workers,
+# so invalidations made by one worker are seen by the others.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -118,6 +133,21 @@ MEDIA_URL = '/media/'
 
 LOGIN_REDIRECT_URL = "/cocktails/"
 
+# threads for background image processing (0 runs the jobs inline)
+COCKTAILS_BACKGROUND_WORKERS = 2
+
+# seconds cached catalogue pages and fragments are kept (they are invalidated on change anyway)
+COCKTAILS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# share of requests measured by TimingMiddleware (0 = off, 1 = all); measured requests get a
+# Server-Timing header and are logged to "cocktails.timing" when slower than COCKTAILS_SLOW_REQUEST_MS
+COCKTAILS_TIMING_SAMPLE_RATE = 0
+COCKTAILS_SLOW_REQUEST_MS = 500
+COCKTAILS_SLOW_REQUEST_TOP_QUERIES = 5
+
+# rendered cocktail PDFs are cached here
+COCKTAILS_PDF_CACHE_DIR = BASE_DIR / 'cache' / 'pdf'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 